@@ -24,12 +24,12 @@ except NameError:
     def dummy(s): return s
     _ = dummy
 
-from os import stat
 from hashlib import new, algorithms
 from time import time
 from fractions import gcd
 
-from thebops.shtools import GlobFileGenerator, FilenameGenerator, get_console
+from thebops.shtools import GlobFileGenerator, FilenameGenerator, \
+        FileRecord, get_console
 from thebops.termwot import generate_caterpillars
 from thebops.errors import err, check_errors
 from thebops.opo import add_glob_options, add_help_option, add_version_option, \
@@ -41,6 +41,8 @@ p = OptionParser(usage='%prog [Options]',
 p.set_description(_('Compute cryptographic hashes, especially for large'
     ' files; during calculation, some screen output is displayed'
     ' (unless switched off via --quiet).'
+    ' Arguments @FILE read the file names from FILE (one per line,'
+    ' or NUL-delimited), @- from standard input.'
     ))
 g = OptionGroup(p, _("Available algorithms"))
 g.add_option('--algorithm',
@@ -55,6 +57,12 @@ p.add_option_group(g)
 
 g = OptionGroup(p, _("Argument evaluation"))
 add_glob_options(g)
+g.add_option('--disk-order',
+             action='store_const',
+             dest='order',
+             const='disk',
+             help=_('process the files in (approximate) disk order, which'
+             ' reduces seeks on rotating disks (with --glob)'))
 p.add_option_group(g)
 
 h = OptionGroup(p, "hidden options")
@@ -127,10 +135,12 @@ if option.verbose >= 1:
     fancy = generate_caterpillars(width=FANCYWIDTH).__iter__()
 else:
     fancy = None
-gen = (option.glob
-       and GlobFileGenerator
-       or  FilenameGenerator
-       )(*args).__iter__()
+if option.glob:
+    gen = GlobFileGenerator(*args, records=True, argfiles=True,
+                            recursive=True,
+                            order=option.order).__iter__()
+else:
+    gen = FilenameGenerator(*args, records=True, argfiles=True).__iter__()
 fo = None
 try:
     ptime = start = time()
@@ -138,14 +148,22 @@ try:
     while 1:
         if fo is None:
             try:
-                fn = next(gen)
-                total = stat(fn).st_size
-                fo = open(fn, 'rb')
-                HASH = new(algo)
-                pos = 0.0
-                eof = 0
+                rec = next(gen)
             except StopIteration:
                 break
+            if not isinstance(rec, FileRecord):  # a pattern without matches
+                err(_('%s: not found') % rec)
+                continue
+            fn = rec.path
+            try:
+                total = rec.size
+                fo = open(fn, 'rb')
+            except (IOError, OSError) as e:
+                err('%s: %s' % (fn, e))
+                continue
+            HASH = new(algo)
+            pos = 0.0
+            eof = 0
         if fancy is not None:
             now = time()
             lap = now - ptime
@@ -181,4 +199,5 @@ except KeyboardInterrupt:
                                    _('... aborted.')
                                    ), end=' ', file=console)
     raise SystemExit(99)
+check_errors()
 
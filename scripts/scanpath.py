@@ -15,7 +15,9 @@ __version__ = (0,
                'rev-%s' % '$Rev: 681 $'[6:-2],
                )
 import sys, os
-from thebops.errors import err, check_errors, progname, errline, fatal, warn, info
+from thebops.errors import err, check_errors, progname, errline, fatal, warn, info, \
+        set_infodevice
+from thebops.anyos import ProbeStats, PathIndex
 try:
     from thebops.enhopa import OptionParser, OptionGroup
 except:
@@ -41,6 +43,88 @@ COMMAND = None
 
 import pdb
 if 0:pdb.set_trace()
+class RecordWriter(object):
+    """
+    the one buffered writer for --print0 and --json: the records are
+    collected and written in chunks, but no record waits longer than
+    <interval> seconds (if no further record arrives in time, e.g. while
+    a slow directory is read, a timer thread writes it), so consumers can
+    start working while the scan is still running
+    """
+    def __init__(self, mode, bufsize=1 << 16, interval=0.25):
+        from time import time
+        from threading import Lock
+        self.mode = mode
+        self.bufsize = bufsize
+        self.interval = interval
+        self.clock = time
+        self.out = getattr(sys.stdout, 'buffer', sys.stdout)
+        self.buf = []
+        self.size = 0
+        self.flushed = time()
+        self.lock = Lock()
+        self.timer = None
+
+    def emit(self, path, **record):
+        """
+        add a record; for --print0, only the path is written (and nothing,
+        if it is None); with --stat, the size and mtime are added
+        """
+        if self.mode == 'print0':
+            if path is None:
+                return
+            encode = getattr(os, 'fsencode', None)
+            if encode is not None:
+                path = encode(path)
+            data = path + b'\0'
+        else:
+            import json
+            if path is not None:
+                record['path'] = path
+                if option.stat:
+                    try:
+                        st = os.stat(path)
+                        record['size'] = st.st_size
+                        record['mtime'] = st.st_mtime
+                    except OSError:
+                        pass
+            data = (json.dumps(record, sort_keys=True) + '\n'
+                    ).encode('ascii')
+        self.lock.acquire()
+        try:
+            self.buf.append(data)
+            self.size += len(data)
+            if (self.size >= self.bufsize
+                or self.clock() - self.flushed >= self.interval):
+                self._flush()
+            elif self.timer is None:
+                from threading import Timer
+                self.timer = Timer(self.interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        finally:
+            self.lock.release()
+
+    def flush(self):
+        self.lock.acquire()
+        try:
+            self._flush()
+        finally:
+            self.lock.release()
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.buf:
+            self.out.write(b''.join(self.buf))
+            self.buf = []
+            self.size = 0
+        self.out.flush()
+        self.flushed = self.clock()
+
+WRITER = None   # a RecordWriter, for --print0 and --json
+
 def isUnix():
     import os
     return 'x' in os.name
@@ -141,7 +225,36 @@ if not WHICH:
     group_.add_option('--check-dirs', '-C', '-c',
                       action='store_true',
                       help=_('check directories in PATH for existence'
+                      '; with -v, the time needed to read each directory '
+                      'is shown, and the slowest one is named'
+                      '. The entries are checked concurrently'
                       ))
+    group_.add_option('--timeout',
+                      action='store',
+                      type='float',
+                      default=5.0,
+                      metavar='5[seconds]',
+                      help=_('--check-dirs: entries which don\'t answer'
+                      ' within this time (e.g. dead network mounts) are '
+                      'reported as timed out; default: %default'))
+    group_.add_option('--shadowed',
+                      action='store_const',
+                      dest='report',
+                      const='shadowed',
+                      help=_('report the names which are found in more than '
+                      'one directory (the first one wins; honours --exten'
+                      'sions), and the directories which contribute nothing'
+                      ))
+    group_.add_option('--duplicates',
+                      action='store_const',
+                      dest='report',
+                      const='duplicates',
+                      help=_('like --shadowed, but report only the shadowed '
+                      'files which have the same contents as the winner'))
+    group_.add_option('--compare',
+                      action='store_true',
+                      help=_('--shadowed: compare the contents of the shadowed'
+                      ' files to the winner (by size, then by checksum)'))
     parser.add_option_group(group_)
 
 def add_all_option(g):
@@ -159,24 +272,106 @@ if not LISTMODE:
         """
         from os.path import abspath, isdir, sep
         if isdir(fn):
-            if option.verbose:
+            if option.verbose and WRITER is None:
                 print(abspath(fn)+sep)
             return 0
+        if WRITER is not None:
+            name, index, ext = MATCH
+            WRITER.emit(abspath(fn), name=name, index=index, ext=ext,
+                        status='found')
+            return 1
         print(abspath(fn))
         return 1
 
-    def list_with_md5sum(fn):
+    CHUNKSIZE = 1 << 20     # bytes read at a time for checksums
+
+    def file_checksums(fn):
+        """
+        return the hex digests of the given file for all --algorithm
+        values, reading it once and chunk by chunk
+        """
+        from hashlib import new
+        hashes = [new(alg) for alg in option.algorithm]
+        fo = open(fn, 'rb')
+        try:
+            while 1:
+                chunk = fo.read(CHUNKSIZE)
+                if not chunk:
+                    break
+                for h in hashes:
+                    h.update(chunk)
+        finally:
+            fo.close()
+        return [h.hexdigest() for h in hashes]
+
+    def print_checksums(fn, digests):
+        """
+        one algorithm: like md5sum; several: like BSD md5 and friends
+        """
+        from os.path import abspath
+        if len(digests) == 1:
+            print('%s  %s' % (digests[0], abspath(fn)))
+        else:
+            for alg, dig in zip(option.algorithm, digests):
+                print('%s (%s) = %s' % (alg.upper(), abspath(fn), dig))
+
+    def _checksum_settings():
+        global POOL, PENDING
+        from collections import deque
+        PENDING = deque()
+        POOL = None
+        if option.jobs > 1:
+            try:
+                from concurrent.futures import ThreadPoolExecutor
+                POOL = ThreadPoolExecutor(option.jobs)
+            except ImportError:
+                pass
+
+    def flush_checksums(keep=0):
+        """
+        print the checksums of the oldest pending files (waiting for them
+        as necessary), until at most <keep> files are pending
+        """
+        global POOL, PENDING
+        try:
+            POOL, PENDING
+        except NameError:
+            return
+        while len(PENDING) > keep:
+            fn, future = PENDING.popleft()
+            try:
+                digests = future.result()
+            except Exception as e:  # don't lose the other results
+                err('%s: %s' % (fn, e))
+            else:
+                print_checksums(fn, digests)
+        if not keep and POOL is not None:
+            POOL.shutdown()
+            POOL = None
+
+    def list_with_checksums(fn):
         """
-        show the md5 checksum and filename
+        show the checksum(s) and filename.  With --jobs > 1, several files
+        are hashed concurrently; the output keeps the order of discovery.
         """
-        from hashlib import md5
-        from os.path import abspath, isdir
+        global POOL, PENDING
+        from os.path import isdir
         if isdir(fn):
             return 0
-        thisfile = open(fn, 'rb')
-        dig = md5(thisfile.read()).hexdigest()
-        thisfile.close()
-        print('%s  %s' % (dig, abspath(fn)))
+        try:
+            POOL, PENDING
+        except NameError:
+            _checksum_settings()
+        if POOL is None:
+            try:
+                digests = file_checksums(fn)
+            except Exception as e:
+                err('%s: %s' % (fn, e))
+            else:
+                print_checksums(fn, digests)
+            return 1
+        PENDING.append((fn, POOL.submit(file_checksums, fn)))
+        flush_checksums(2 * option.jobs)
         return 1
 
     def _edit_settings():
@@ -198,22 +393,6 @@ if not LISTMODE:
         FILES = []
         DUPES = {}
 
-    def gen_lines(fo):
-        n = 0
-        buf = None
-        prev = None
-        # import pdb; pdb.set_trace()
-        for z in fo:
-            if n is 1:
-                yield buf.rstrip()
-            prev, buf = buf, z
-            if prev is not None:
-                yield buf.rstrip()
-            n += 1
-        if n == 1 and not isinstance(fo, (tuple, list)):
-            for z in buf.split('\n'):
-                yield z.rstrip()
-
     def edit_files(fn):
         """
         edit, using the environment vars VISUAL and EDITOR
@@ -235,133 +414,208 @@ if not LISTMODE:
             FILES.append(fn)
         return 1
 
-    def _show_settings():
-        global DUPES, TEXTUAL
-        from os.path import normcase
-        DUPES = dict()
-        TEXTUAL = set(['.'+e
-                       for e in normcase('txt TXT py BAT CMD bat cmd '
-                           'rex REX pl '
-                           'php php4 php5 '
-                           'html xhtml xml'
-                           'phtml xsl xslt'
-                           ).split()])
+    BLOCKSIZE = 1 << 16     # for sniffing, copying and tail reading
+    # bytes which occur in text files (besides those >= 0x80):
+    TEXTCHARS = bytes(bytearray([7, 8, 9, 10, 12, 13, 27]
+                                + list(range(0x20, 0x7f))
+                                + list(range(0x80, 0x100))))
 
-    def show_files(fn):
+    def looks_textual(block):
         """
-        show textual files
+        sniff the first block of a file: text contains no NUL bytes,
+        and only few other control characters
         """
-        global DUPES, TEXTUAL
-        from os.path import isdir, normpath, abspath, normcase, splitext
-        if isdir(fn):
-            return 0
+        if not block:
+            return True
+        if b'\0' in block:
+            return False
+        return len(block.translate(None, TEXTCHARS)) * 10 < len(block) * 3
+
+    def binary_stdout():
+        """
+        return the standard output for writing bytes, after flushing the
+        text buffer
+        """
+        sys.stdout.flush()
+        return getattr(sys.stdout, 'buffer', sys.stdout)
+
+    def first_visit(fn):
+        """
+        show, head and tail process each file only once
+        """
+        global DUPES
+        from os.path import normpath, abspath, normcase
         try:
-            DUPES, TEXTUAL
+            DUPES
         except NameError:
-            _show_settings()
+            DUPES = dict()
         name = normcase(normpath(abspath(fn)))
+        if name in DUPES:
+            return 0
+        DUPES[name] = 1
+        return 1
+
+    def open_textual(fn):
+        """
+        open the given file and read the first block; return both,
+        if the file looks textual, and (None, None) otherwise
+        """
         try:
-            DUPES[name]
-        except KeyError:
-            DUPES[name] = 1
-            ext = splitext(name)[1]
-            if ext in TEXTUAL:
+            fo = open(fn, 'rb')
+            block = fo.read(BLOCKSIZE)
+        except (IOError, OSError) as e:
+            print('!! %s: nicht lesbar (%s)' % (fn, e))
+            return None, None
+        if looks_textual(block):
+            print('**', fn+':')
+            return fo, block
+        fo.close()
+        print('?? %s: keine Textdatei (Binaerdaten)' % fn)
+        return None, None
+
+    def terminate_line(out, last):
+        if last and last != b'\n':
+            out.write(b'\n')
+        out.flush()
+
+    def copy_file(fo, block):
+        """
+        copy the rest of the file to standard output; use os.sendfile
+        if possible, copyfileobj otherwise
+        """
+        from shutil import copyfileobj
+        out = binary_stdout()
+        out.write(block)
+        out.flush()
+        pos = fo.tell()
+        try:
+            sendfile = os.sendfile
+            ofd = out.fileno()
+            while 1:
+                sent = sendfile(ofd, fo.fileno(), pos, BLOCKSIZE * 16)
+                if not sent:
+                    break
+                pos += sent
+        except (AttributeError, ValueError, OSError):
+            fo.seek(pos)
+            copyfileobj(fo, out, BLOCKSIZE)
+        fo.seek(0, 2)
+        last = block[-1:]
+        if fo.tell() > len(block):
+            fo.seek(-1, 2)
+            last = fo.read(1)
+        terminate_line(out, last)
+
+    def copy_head(fo, block, n):
+        """
+        copy the first n lines to standard output
+        """
+        out = binary_stdout()
+        last = b''
+        while block:
+            found = block.count(b'\n')
+            if found >= n:
+                pos = -1
+                for i in range(n):
+                    pos = block.index(b'\n', pos+1)
+                block = block[:pos+1]
+            out.write(block)
+            last = block[-1:]
+            if found >= n:
+                break
+            n -= found
+            block = fo.read(BLOCKSIZE)
+        terminate_line(out, last)
+
+    def tail_lines(fo, n):
+        """
+        return the last n lines of the given (binary) file, reading blocks
+        backwards from the end (the cost depends on the size of the lines,
+        not of the file)
+        """
+        fo.seek(0, 2)
+        pos = fo.tell()
+        blocks = []
+        found = 0
+        while pos > 0 and found <= n:   # the last newline ends the last line
+            size = min(BLOCKSIZE, pos)
+            pos -= size
+            fo.seek(pos)
+            block = fo.read(size)
+            blocks.insert(0, block)
+            found += block.count(b'\n')
+        data = b''.join(blocks)
+        start = len(data) - data.endswith(b'\n')
+        for i in range(n):
+            start = data.rfind(b'\n', 0, start)
+            if start < 0:
+                break
+        return data[start+1:]
+
+    def show_files(fn):
+        """
+        show textual files
+        """
+        from os.path import isdir
+        if isdir(fn):
+            return 0
+        if first_visit(fn):
+            fo, block = open_textual(fn)
+            if fo is not None:
                 try:
-                    fo = open(fn, 'r')
-                    print('**', fn+':')
-                    for z in gen_lines(fo):
-                        print(z)
+                    copy_file(fo, block)
+                finally:
                     fo.close()
-                except OSError as e:
-                    print('!! %s: nicht lesbar (%s)' % (fn, e))
-            else:
-                print('?? %s: keine (bekannte) Textdatei-Erweiterung (%s)' \
-                        % (fn, ext))
         return 1
 
     def file_heads(fn):
         """
         show textual files (like head commandline utility)
         """
-        global DUPES, TEXTUAL
-        from os.path import isdir, normpath, abspath, normcase, splitext
+        from os.path import isdir
         if isdir(fn):
             return 0
-        try:
-            DUPES, TEXTUAL
-        except NameError:
-            _show_settings()
-        name = normcase(normpath(abspath(fn)))
-        try:
-            DUPES[name]
-        except KeyError:
-            DUPES[name] = 1
-            ext = splitext(name)[1]
-            if ext in TEXTUAL:
+        if first_visit(fn):
+            fo, block = open_textual(fn)
+            if fo is not None:
                 try:
-                    fo = open(fn, 'r')
-                    print('**', fn+':')
-                    n = 1
-                    for z in gen_lines(fo):
-                        if n > option.lines:
-                            break
-                        print(z)
-                        n += 1
+                    copy_head(fo, block, option.lines)
+                finally:
                     fo.close()
-                except OSError as e:
-                    print('!! %s: nicht lesbar (%s)' % (fn, e))
-            else:
-                print('?? %s: keine (bekannte) Textdatei-Erweiterung (%s)' \
-                        % (fn, ext))
         return 1
 
     def file_tails(fn):
         """
         show textual files (like tail commandline utility)
         """
-        global DUPES, TEXTUAL
-        from os.path import isdir, normpath, abspath, normcase, splitext
+        from os.path import isdir
         if isdir(fn):
             return 0
-        try:
-            DUPES, TEXTUAL
-        except NameError:
-            _show_settings()
-        name = normcase(normpath(abspath(fn)))
-        try:
-            DUPES[name]
-        except KeyError:
-            DUPES[name] = 1
-            ext = splitext(name)[1]
-            if ext in TEXTUAL:
+        if first_visit(fn):
+            fo, block = open_textual(fn)
+            if fo is not None:
                 try:
-                    fo = open(fn, 'r')
-                    from collections import deque
-                    deq = deque([None] * option.lines)
-                    print('**', fn+':')
-                    for z in gen_lines(fo):
-                        deq.append(z)
-                        deq.popleft()
+                    data = tail_lines(fo, option.lines)
+                finally:
                     fo.close()
-                    for z in deq:
-                        if z is not None:
-                            print(z)
-                except OSError as e:
-                    print('!! %s: nicht lesbar (%s)' % (fn, e))
-            else:
-                print('?? %s: keine (bekannte) Textdatei-Erweiterung (%s)' \
-                        % (fn, ext))
+                out = binary_stdout()
+                out.write(data)
+                terminate_line(out, data[-1:])
         return 1
 
     FILEFUNC = {}
     FILEFUNC['list'] = list_full_path
-    FILEFUNC['md5'] = list_with_md5sum
+    FILEFUNC['md5'] = list_with_checksums
+    FILEFUNC['checksum'] = list_with_checksums
     FILEFUNC['edit'] = edit_files
     FILEFUNC['show'] = show_files
     FILEFUNC['head'] = file_heads
     FILEFUNC['tail'] = file_tails
     action_keys = list(FILEFUNC.keys())
     action_keys.sort()
+    FINISHFUNC = {}     # for actions which need to finish their work
+    FINISHFUNC['md5'] = flush_checksums
+    FINISHFUNC['checksum'] = flush_checksums
 
     group_ = OptionGroup(parser,
                          WHICH and _('Operation details')
@@ -374,15 +628,14 @@ if not LISTMODE:
                       ' (see below); default: list (unless --editor'
                       ' specified)'))
     del action_keys
-    if 0:\
     group_.add_option('--order',
                       metavar='file',
                       choices=('file','dir'), default='file',
-                      help=_('results order (in case of more than one file to '
+                      help=_('search strategy (in case of more than one file to '
                       'seek): "file" (default; go through the files and seek '
                       'each one in the PATH) or "dir" (go through the PATH on'
-                      'ce and look for every given file). Currently only the '
-                      'default is implemented.'))
+                      'ce, reading each directory once, and look for every '
+                      'given file). The results are the same.'))
     group_.add_option('--which', '-1',
                       action='store_true',
                       default=WHICH,
@@ -400,13 +653,12 @@ if not LISTMODE:
                       default=True,
                       dest='doit',
                       help=_('don\'t execute (edit) command, just print it'))
-    if 0:\
     group_.add_option('--regex',
                       action='store_true',
-                      help=_('allow regular expressions for the file names specifi'
-                      'cations'
-                      ' (NOT YET IMPLEMENTED)'
-                      '.'))
+                      help=_('the arguments are regular expressions, which '
+                      'must match whole file names (--extensions are not '
+                      'applied). The directory listings are cached as long '
+                      'as the directories are unchanged.'))
     group_.add_option('-n', '--lines',
                       action='store',
                       type='int',
@@ -416,6 +668,19 @@ if not LISTMODE:
                       'are allowed for --head (implying --tail), '
                       'and 0 auto-switches head, tail and show to list.'
                       ))
+    group_.add_option('--algorithm',
+                      action='append',
+                      metavar='md5[,sha256...]',
+                      help=_('the hashlib algorithm(s) for --action=checksum'
+                      ' (implied); several algorithms are computed in one '
+                      'pass. Default: md5'))
+    group_.add_option('--jobs', '-j',
+                      action='store',
+                      type='int',
+                      default=4,
+                      metavar='4',
+                      help=_('number of files to compute checksums for '
+                      'concurrently, default: %default'))
     parser.add_option_group(group_)
 
 if not WHICH:
@@ -526,6 +791,12 @@ if not LISTMODE:
                       const='md5',
                       help=_('abbr. for --action=md5'
                       ' (show md5 checksums and filenames)'))
+    group_.add_option('--checksum',
+                      action='store_const',
+                      dest='action',
+                      const='checksum',
+                      help=_('abbr. for --action=checksum'
+                      ' (show checksums and filenames; see --algorithm)'))
     group_.add_option('--edit',
                       action='store_const',
                       dest='action',
@@ -537,22 +808,51 @@ if not LISTMODE:
                       help=_('tell the program to seek itself'))
 parser.add_option_group(group_)
 
+group_ = OptionGroup(parser, _('Machine-readable output'))
+group_.add_option('--print0', '-0',
+                  action='store_const',
+                  dest='output',
+                  const='print0',
+                  help=_('write the paths found (or the valid directories'
+                  ', with -L) terminated by NUL characters, e.g. for '
+                  'xargs -0 (--action=list only)'))
+group_.add_option('--json',
+                  action='store_const',
+                  dest='output',
+                  const='json',
+                  help=_('write one JSON record per line, with path, status,'
+                  ' directory index and, when seeking files, the requested '
+                  'name and the extension appended'))
+group_.add_option('--stat',
+                  action='store_true',
+                  help=_('--json: add the size and mtime of each path'))
+parser.add_option_group(group_)
+
 parser.add_option('--verbose', '-v',
                   action='count',
+                  default=0,
                   help=_('be verbose (-vv: even more verbose)'))
 try:
     parser.set_collecting_group()
 except AttributeError:
     pass
 option, args = parser.parse_args()
-option.order = 'file'
+try:
+    option.order
+except AttributeError:
+    option.order = 'file'
 if WHICH:
     option.listpathonly = 0
+    option.report = None
 
 errors = 0
 if option.self:
     args.append(_PN)
-if option.listpathonly:
+if option.report:
+    option.listpathonly = 0
+    if args:
+        err('--%s supports no further arguments' % option.report)
+elif option.listpathonly:
     if option.action is not None:
         warn('--list-path-only: action ("%s") is ignored' % option.action)
     if args:
@@ -576,7 +876,7 @@ elif option.lines == 0:
         option.action = 'list'
     elif option.verbose > (option.action == 'list'):
         warn('--action=%s: --lines=%d are ignored' % option.lines)
-if option.lines < 0:
+if option.lines is not None and option.lines < 0:
     if option.action == 'head':
         option.action = 'tail'
         if option.verbose:
@@ -606,6 +906,29 @@ except AttributeError:
     option.extensions = ()
 
 try:
+    if option.algorithm:
+        from hashlib import new
+        algorithms = []
+        for a in option.algorithm:
+            for alg in a.lower().split(','):
+                alg = alg.strip()
+                if not alg or alg in algorithms:
+                    continue
+                try:
+                    h = new(alg)
+                except ValueError:
+                    err('--algorithm: %r is not supported' % alg)
+                else:
+                    if h.digest_size:
+                        algorithms.append(alg)
+                    else:   # e.g. shake_128: the length must be given
+                        err('--algorithm: %r is not supported '
+                            '(variable digest length)' % alg)
+        option.algorithm = algorithms
+        if option.action is None:
+            option.action = 'checksum'
+    else:
+        option.algorithm = ['md5']
     if option.action is None:
         if option.editor:
             option.action = 'edit'
@@ -618,6 +941,19 @@ try:
 except AttributeError:
     pass
 
+if option.output:
+    # keep the standard output machine-readable (also the infos of
+    # check_errors, for the errors below):
+    set_infodevice(sys.stderr)
+    if getattr(option, 'action', 'list') != 'list':
+        err('--%s: only supported for --action=list' % option.output)
+    elif getattr(option, 'report', None):
+        err('--%s: not supported for --%s' % (option.output, option.report))
+    else:
+        WRITER = RecordWriter(option.output)
+        import atexit
+        atexit.register(WRITER.flush)
+
 def ext_info():
     if option.verbose:
         if option.extensions:
@@ -625,15 +961,12 @@ def ext_info():
         else:
             errline('No extensions!')
 
-def seek_single_file(f):
+def candidate_names(f):
     """
-    seek the given file in the PATH
+    return the list of names to look for, in order of precedence
+    (the given name with the extensions appended, if applicable,
+    and the given name itself)
     """
-    if option.verbose:
-        errline('Seeking %s...' % f)
-    if 0:
-        import pdb
-        pdb.set_trace()
     if option.extensions:
         fext = os.path.split(f)[1]
         if not fext:
@@ -644,44 +977,233 @@ def seek_single_file(f):
             a_ext = 1
     else:
         a_ext = 0
+    if a_ext:
+        return [f+e for e in option.extensions] + [f]
+    return [f]
+
+MATCH = None
+def process_found(fi, f, index, ext):
+    """
+    call the --action function for the given match; the details (the
+    requested name, the index of the directory, the extension appended)
+    are available in the MATCH global, for --json
+    """
+    global MATCH
+    MATCH = (f, index, ext)
+    return FILEFUNC[option.action](fi)
+
+def seek_single_file(f):
+    """
+    seek the given file in the PATH
+    """
+    if option.verbose:
+        errline('Seeking %s...' % f)
+    dirs = os.environ[option.varname].split(os.path.pathsep)
+    if option.include_curdir:
+        dirs.insert(0, os.path.curdir)
+    names = candidate_names(f)
+    lfound = 0
+    for index, d in enumerate(dirs):
+        for name in names:
+            fi = os.path.join(d, name)
+            if os.path.exists(fi):
+                if process_found(fi, f, index, name[len(f):]):
+                    lfound = 1
+                    if option.which:
+                        return lfound
+    return lfound
+
+def scan_dirs(liz):
+    """
+    go through the PATH once, reading each directory once, and return a
+    dictionary which maps each of the given files to the list of matches,
+    in order of precedence (as seek_single_file would find them), as
+    (path, directory index, extension) tuples
+    """
+    from os.path import join, isdir, normcase, split
     dirs = os.environ[option.varname].split(os.path.pathsep)
     if option.include_curdir:
         dirs.insert(0, os.path.curdir)
+    wanted = []         # (file, [(normcased name, name), ...])
+    hits = {}
+    for f in liz:
+        if f in hits:
+            continue
+        hits[f] = []
+        wanted.append((f, [(normcase(name), name)
+                           for name in candidate_names(f)]))
+    pending = len(wanted)   # for --which: files without a match
+    for index, d in enumerate(dirs):
+        if option.verbose:
+            errline('Scanning %s...' % d)
+        try:
+            present = set([normcase(name)
+                           for name in os.listdir(d or os.path.curdir)])
+        except OSError:
+            continue
+        for f, names in wanted:
+            found = hits[f]
+            if option.which and found and not isdir(found[-1][0]):
+                continue
+            for key, name in names:
+                if not split(name)[0] and key not in present:
+                    continue        # (sub/prog is not in the listing)
+                fi = join(d, name)
+                if not os.path.exists(fi):  # e.g. a dangling symlink
+                    continue
+                found.append((fi, index, name[len(f):]))
+                if option.which and not isdir(fi):
+                    pending -= 1
+                    break
+        if option.which and not pending:
+            break
+    return hits
+
+def listing_cache():
+    """
+    return the persistent cache for directory listings (for --regex)
+    """
+    from thebops.anyos import PersistentCache
+    return PersistentCache('scanpath-listings-py%d.pickle'
+                           % sys.version_info[0],
+                           maxentries=200)
+
+def cached_listing(d, cache):
+    """
+    return the sorted names in the given directory; the cached listing is
+    used if the modification time of the directory hasn't changed
+    """
+    from os.path import abspath
+    d = d or os.path.curdir
+    try:
+        st = os.stat(d)
+    except OSError:
+        return []
+    stamp = getattr(st, 'st_mtime_ns', st.st_mtime)
+    key = abspath(d)
+    try:
+        oldstamp, names = cache[key]
+        if oldstamp == stamp:
+            return names
+    except KeyError:
+        pass
+    try:
+        names = sorted(os.listdir(d))
+    except OSError:
+        return []
+    cache[key] = (stamp, names)
+    return names
+
+def compile_regexes(liz):
+    """
+    compile the given expressions once into a single alternation (with one
+    named group per expression, to tell which one matched), and each one
+    for itself (an entry might match more than one); return both.
+    Errors are reported.
+
+    If any expression contains groups of its own, the alternation is None:
+    back references (\\1) would refer to the wrong groups, and group names
+    might be used in more than one expression.
+    """
+    import re
+    from os.path import normcase
+    flags = 0
+    if normcase('A') != 'A':
+        flags = re.IGNORECASE
+    single = []
+    for expr in liz:
+        try:
+            single.append(re.compile('(?:%s)\\Z' % expr, flags))
+        except re.error as e:
+            err('--regex: invalid expression %r (%s)' % (expr, e))
+    check_errors()
+    for rx in single:
+        if rx.groups:
+            return None, single
+    try:
+        combined = re.compile('(?:%s)\\Z'
+                              % '|'.join(['(?P<r%d>%s)' % (i, liz[i])
+                                          for i in range(len(liz))]),
+                              flags)
+    except re.error:
+        combined = None
+    return combined, single
+
+def scan_regex(liz):
+    """
+    for --regex: go through the PATH once, testing every entry of each
+    directory against the compiled expressions; return a dictionary
+    which maps each expression to the list of matches (like scan_dirs)
+    """
+    from os.path import join
+    exprs = []
+    for expr in liz:
+        if expr not in exprs:
+            exprs.append(expr)
+    combined, single = compile_regexes(exprs)
+    cache = listing_cache()
+    hits = {}
+    for expr in exprs:
+        hits[expr] = []
+    for index, d in enumerate(getpathdirs()):
+        if option.verbose:
+            errline('Scanning %s...' % d)
+        for name in cached_listing(d, cache):
+            if combined is None:
+                first = 0
+            else:
+                mo = combined.match(name)
+                if mo is None:
+                    continue
+                first = int(mo.lastgroup[1:])
+            tup = (join(d, name), index, '')
+            for i in range(first, len(exprs)):
+                if single[i].match(name) is not None:
+                    hits[exprs[i]].append(tup)
+    return hits
+
+def seek_listed_file(f, hits):
+    """
+    process the matches for the given file, as found by scan_dirs()
+    """
     lfound = 0
-    for d in dirs:
-        if 0:
-            import pdb
-            pdb.set_trace()
-        if a_ext:
-            for e in option.extensions:
-                fi = os.path.join(d, f+e)
-                if os.path.exists(fi):
-                    if FILEFUNC[option.action](fi):
-                        lfound = 1
-                        if option.which:
-                            return lfound
-        fi = os.path.join(d, f)
-        if os.path.exists(fi):
-            if FILEFUNC[option.action](fi):
-                lfound = 1
-                if option.which:
-                    return lfound
+    for fi, index, ext in hits[f]:
+        if process_found(fi, f, index, ext):
+            lfound = 1
+            if option.which:
+                break
     return lfound
 
 def seek_files(liz):
     """
-    seek the given files in the PATH by calling seek_single_file();
-    for each file iterate the PATH anew
+    seek the given files in the PATH; with --order=file, by calling
+    seek_single_file() for each file (iterating the PATH anew),
+    with --order=dir by reading each directory once (see scan_dirs);
+    with --regex, the arguments are regular expressions (see scan_regex)
     """
     found = 0
     notfound = 0
     ext_info()
+    if option.regex:
+        hits = scan_regex(liz)
+        def seek(fn):
+            return seek_listed_file(fn, hits)
+    elif option.order == 'dir':
+        hits = scan_dirs(liz)
+        def seek(fn):
+            return seek_listed_file(fn, hits)
+    else:
+        seek = seek_single_file
     for fn in liz:
-        if seek_single_file(fn):
+        if seek(fn):
             found += 1
         else:
             notfound += 1
             err('%s not found in %s' % (fn, option.varname))
+            if WRITER is not None:
+                WRITER.emit(None, name=fn, status='notfound')
+    if option.action in FINISHFUNC:
+        FINISHFUNC[option.action]()
 
     if notfound and option.verbose > 1:
         errline('%s is:' % option.varname)
@@ -729,50 +1251,218 @@ def getpathdirs():
 def verbose_status():
     return option.verbose > 1
 
-def getpathdirs_checking():
+def check_path_entries(dirs, timeout, stats=None):
+    """
+    check the given PATH entries concurrently, and generate (kind, dirname)
+    tuples in PATH order; kind is 'dir', 'other' (not a directory),
+    'missing' or 'timeout' (no result after <timeout> seconds, e.g. because
+    of a dead network mount).  Every entry is checked in a daemon thread,
+    since such a check might block for a long time.
+
+    If a ProbeStats object is given, the time needed to read each directory
+    is recorded (see -v); this is part of the check.
+    """
+    import threading
+    from os.path import normpath
+    from stat import S_ISDIR
+    try:
+        from time import monotonic as clock
+    except ImportError:     # Python < 3.3
+        from time import time as clock
+    results = {}
+    events = {}
+    def check(nd, event):
+        try:
+            try:
+                st = os.stat(nd)
+            except OSError:
+                results[nd] = 'missing'
+            else:
+                if S_ISDIR(st.st_mode):
+                    if stats is not None:
+                        stats.probe(nd)
+                    results[nd] = 'dir'
+                else:
+                    results[nd] = 'other'
+        finally:
+            event.set()
+    names = [normpath(d) for d in dirs]
+    for nd in names:
+        if nd in events:
+            continue
+        event = events[nd] = threading.Event()
+        thread = threading.Thread(target=check, args=(nd, event))
+        thread.daemon = True
+        thread.start()
+    deadline = clock() + timeout
+    for nd in names:
+        event = events[nd]
+        event.wait(max(deadline - clock(), 0))
+        if event.is_set():
+            yield results.get(nd, 'missing'), nd
+        else:
+            yield 'timeout', nd
+
+def getpathdirs_checking(stats=None):
     """
     Verwendung:
-    for isdir, status, dirname, suffix in getpathdirs_checking:
+    for isdir, status, dirname, suffix in getpathdirs_checking():
         print status, dirname+suffix
+
+    isdir ist None, wenn die Pruefung nicht rechtzeitig fertig wurde
+    (--timeout)
     """
-    from os.path import isdir, exists, normpath, sep
+    from os.path import sep
     vinfo = (verbose_status()
              and ('\t(not found!)',
-                  '\t(not a directory!)')
-             or ('', ''))
+                  '\t(not a directory!)',
+                  '\t(timed out!)')
+             or ('', '', ''))
 
-    for d in getpathdirs():
-        if isdir(d):
-            yield 1, 'OK:  ', normpath(d), sep
-        elif exists(d):
-            yield 0, 'Err2:', normpath(d), vinfo[1]
+    for kind, d in check_path_entries(getpathdirs(), option.timeout, stats):
+        if kind == 'dir':
+            yield 1, 'OK:  ', d, sep
+        elif kind == 'other':
+            yield 0, 'Err2:', d, vinfo[1]
+        elif kind == 'timeout':
+            yield None, 'Err3:', d, vinfo[2]
         else:
-            yield 0, 'Err1:', normpath(d), vinfo[0]
+            yield 0, 'Err1:', d, vinfo[0]
 
 
 def listpath_checking():
     """
     Verzeichnisse ausgeben, sofern gefunden
     """
-    from os.path import isdir, exists, normpath, sep
-    for d in getpathdirs():
-        if isdir(d):
-            print('OK:', normpath(d)+sep)
-        elif exists(d):
-            print('(2)', normpath(d)+'\t(not a directory!)')
+    from os.path import sep
+    for kind, d in check_path_entries(getpathdirs(), option.timeout):
+        if kind == 'dir':
+            print('OK:', d+sep)
+        elif kind == 'other':
+            print('(2)', d+'\t(not a directory!)')
+        elif kind == 'timeout':
+            print('(3)', d+'\t(timed out!)')
         else:
-            print('(1)', normpath(d)+'\t(not found!)')
+            print('(1)', d+'\t(not found!)')
+
+def content_checker():
+    """
+    return a function which compares the contents of two files:
+    by identity, then by size, then by (cached) md5 checksums
+    """
+    from hashlib import md5
+    digests = {}
+    def digest(fn):
+        try:
+            return digests[fn]
+        except KeyError:
+            pass
+        h = md5()
+        fo = open(fn, 'rb')
+        try:
+            while 1:
+                chunk = fo.read(1 << 20)
+                if not chunk:
+                    break
+                h.update(chunk)
+        finally:
+            fo.close()
+        digests[fn] = res = h.digest()
+        return res
+    def compare(fn1, fn2):
+        """
+        return 'same file', 'same contents' or None
+        """
+        st1 = os.stat(fn1)
+        st2 = os.stat(fn2)
+        if (st1.st_dev, st1.st_ino) == (st2.st_dev, st2.st_ino):
+            return 'same file'
+        if st1.st_size != st2.st_size:
+            return None
+        if digest(fn1) == digest(fn2):
+            return 'same contents'
+        return None
+    return compare
+
+def report_shadowed():
+    """
+    --shadowed, --duplicates: read each directory once (see
+    anyos.PathIndex), and report the shadowed names as they come
+    """
+    ix = PathIndex(option.varname, option.extensions,
+                   curdir=option.include_curdir)
+    duplicates_only = option.report == 'duplicates'
+    compare = None
+    if duplicates_only or option.compare:
+        compare = content_checker()
+    count = 0
+    for name, paths in ix.shadowed():
+        winner = paths[0]
+        lines = []
+        for fn in paths[1:]:
+            if compare is None:
+                lines.append('\tshadows %s' % fn)
+                continue
+            try:
+                same = compare(winner, fn)
+            except (IOError, OSError) as e:
+                err('%s: %s' % (fn, e))
+                continue
+            if same:
+                lines.append('\tshadows %s\t(%s)' % (fn, same))
+            elif not duplicates_only:
+                lines.append('\tshadows %s\t(different)' % fn)
+        if lines:
+            count += 1
+            print(winner)
+            for line in lines:
+                print(line)
+    if option.verbose:
+        info('%d shadowing name%s' % (count, count != 1 and 's' or ''))
+    empty = set(ix.empty_dirs())
+    for d in ix.idle_dirs():
+        if d in empty:
+            info('%s: no files' % d)
+        else:
+            info('%s: contributes nothing (all names shadowed)' % d)
 
 def listpath():
     """
     Verzeichnisse ausgeben
     """
+    if WRITER is not None:
+        for index, d in enumerate(getpathdirs()):
+            WRITER.emit(d, index=index, status='unchecked')
+        return
     for d in getpathdirs():
         print(d)
 
+CHECK_STATUS = {'OK:  ': 'ok',
+                'Err1:': 'missing',
+                'Err2:': 'notdir',
+                'Err3:': 'timeout',
+                }
+def emit_checked(index, isdir, status, dirname, stats=None):
+    """
+    --check-dirs with --print0 or --json; for --print0, only valid
+    directories are written (all entries with -v)
+    """
+    if WRITER.mode == 'print0':
+        if isdir or option.verbose:
+            WRITER.emit(dirname)
+        return
+    record = {'index': index,
+              'status': CHECK_STATUS[status],
+              }
+    if stats is not None and dirname in stats:
+        record['ms'] = round(stats[dirname][2] * 1000, 3)
+    WRITER.emit(dirname, **record)
+
 check_errors()
 
-if option.listpathonly:
+if option.report:
+    report_shadowed()
+elif option.listpathonly:
     import pdb
     # pdb.set_trace()
     mask = None
@@ -785,19 +1475,38 @@ if option.listpathonly:
                 from os.path import isdir
                 for d in filter(isdir, getpathdirs()):
                     print(d)
-    if option.prefix:
+    if option.prefix and WRITER is None:
         mask = mask or '%(dirname)s'
         mask = option.prefix + mask
     if mask:
         no = 0
         skipped = 0
         invalid = 0
+        timedout = 0
+        stats = None
+        if option.check_dirs and option.verbose:
+            stats = ProbeStats()
         try:
             if option.check_dirs:
-                for isdir, status, dirname, suffix in getpathdirs_checking():
+                for isdir, status, dirname, suffix \
+                        in getpathdirs_checking(stats):
                     no += 1
+                    if WRITER is not None:
+                        emit_checked(no - 1, isdir, status, dirname, stats)
+                        if isdir is None:
+                            timedout += 1
+                        continue
                     if isdir:
+                        if stats is not None:
+                            suffix += '\t(%s)' % stats.format(dirname,
+                                                              '%(ms).3f ms')
                         print(mask % locals())
+                    elif isdir is None:
+                        if option.verbose:
+                            print(mask % locals())
+                        warn('%s: no answer within %g seconds'
+                             % (dirname, option.timeout))
+                        timedout += 1
                     elif option.verbose:
                         print(mask % locals())
                         invalid += 1
@@ -812,6 +1521,14 @@ if option.listpathonly:
                     info('%d invalid entr%s'
                          % (invalid,
                             invalid > 1 and 'ies' or 'y'))
+                if timedout:
+                    warn('%d entr%s timed out'
+                         % (timedout,
+                            timedout > 1 and 'ies' or 'y'))
+                if stats:
+                    slowest = stats.slowest(1)[0][0]
+                    info('slowest directory: %s (%s)'
+                         % (slowest, stats.format(slowest, '%(ms).3f ms')))
             else:
                 for dirname in getpathdirs():
                     no += 1
@@ -820,8 +1537,6 @@ if option.listpathonly:
             fatal('--prefix %r: Variable %r unknown' % (option.prefix, e.args[0]))
     else:
         listpath()
-elif option.order == 'file':
+else:
     seek_files(args)
-elif option.order == 'dir':
-    raise NotImplementedError('search_dirs')
 
@@ -50,6 +50,9 @@ on the system, using a smart strategy:
    (Of course, this is way faster than searching an entire harddisk.)
    If is even possible to specify versioned directories (e.g. C:\...\vim73)
    and automatically get the highest version.
+   Finally, whole directory trees can be searched (inroots, with a depth
+   limit); the hits are generated level by level, so the search can stop
+   at the first one.
 2. Searches the PATH.
    When doing this, some directories can be excluded (the xroots argument)
    which very likely contain programs which don't behave like the desired
@@ -64,6 +67,16 @@ located in a small set of directories (/bin, /usr/bin and the like).
 The PATH search (active by default) should take care of that;
 it has not been thoroughly tested yet, though.
 
+Programs which call find_progs (or the likeix wrappers) very often can use a
+persistent cache (see the ProgsCache class; cache argument, or USE_PROGS_CACHE
+for all calls): hits and misses are stored on disk, and an entry is discarded
+as soon as one of the directories involved in the search is changed.
+With probe='listdir', each directory is read once (instead of checking every
+name/extension combination separately), which helps with long PATHEXT lists
+and slow network drives.
+For asyncio-based programs, async_find_progs and async_get_1st probe the
+directories concurrently in an executor, without changing the result.
+
 Prerequisites
 -------------
 Python 2.4 is needed because of the subprocess module;
@@ -77,6 +90,7 @@ from __future__ import print_function
 from six.moves import map
 import six
 from six.moves import range
+from six import text_type as six_text_type
 __author__ = "Tobias Herp <tobias.herp@gmx.net>"
 VERSION = (0,
            4, # Bugfix fuer Linux (keine PATHEXT-Variable)
@@ -126,13 +140,54 @@ except ImportError:
 # _hier_ wird importiert:
 from os.path import isfile, isdir, \
         sep, join, split, dirname, splitext, \
-        normcase, normpath, abspath, \
-        pathsep
-from os import utime, stat, environ
+        normcase, normpath, abspath, isabs, \
+        expanduser, pathsep
+from os import utime, stat, environ, getcwd, getpid, makedirs, \
+        rename, remove, listdir
+from errno import ENOENT, ENOTDIR
+from bisect import bisect_left, insort
+from functools import partial
 from time import time
-from sys import platform
+try:
+    from time import perf_counter as _clock
+except ImportError:
+    _clock = time
+from sys import platform, version_info, modules
 from string import digits, punctuation
-from glob import glob
+from glob import glob, has_magic
+import atexit
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    from threading import Lock
+except ImportError:
+    from dummy_threading import Lock
+try:
+    from os import scandir      # Python 3.5+
+except ImportError:
+    scandir = None
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+try:
+    from os import replace as _replace
+except ImportError:
+    def _replace(src, dst):
+        """
+        os.rename doesn't overwrite existing files on Windows(tm) systems
+        """
+        try:
+            rename(src, dst)
+        except OSError:
+            remove(dst)
+            rename(src, dst)
 
 try: _
 except NameError:
@@ -144,6 +199,21 @@ __all__ = ['link', 'symlink',
            'quoted_seq',
            # see the likeix module for wrappers and a demo:
            'find_progs',
+           'find_many_progs',
+           'async_find_progs',
+           'async_get_1st',
+           # persistent caching:
+           'cache_dir',
+           'progs_cache',
+           'PersistentCache',
+           'ProgsCache',
+           'USE_PROGS_CACHE',
+           'PROBE_METHOD',
+           'ProbeStats',
+           'TRACE_PROBES',
+           'INROOTS_MAXDEPTH',
+           # PATH lookups:
+           'PathIndex',
            # parse version info from directory names:
            'vsplit_digits', 'vdir_digits',
            'vsplit_delim',  'vdir_delim',
@@ -370,7 +440,6 @@ def quoted_seq(seq):
     and return a string which could be given to a shell for execution.
     """
     assert not isinstance(seq, (str, six_text_type))
-from six import text_type as six_text_type
     for elem in seq:
         if elem in SHELL_SINGLETONS:
             yield SHELL_ESCAPE + elem
@@ -411,7 +480,12 @@ def find_progs(progname,
                vdirs=None,
                vfunc=None,
                inroots=None,
-               verbose=None):
+               verbose=None,
+               cache=None,
+               probe=None,
+               listings=None,
+               maxdepth=None,
+               trace=None):
     r"""
     Finde ein geeignetes Programm, das moeglicherweise im PATH steht -
     vielleicht aber auch nicht! ;-)
@@ -450,11 +524,48 @@ def find_progs(progname,
 
     pathvar -- ueblicherweise PATH (default)
 
-    inroots -- Sequenz von Wurzelverzeichnissen, deren Unterverzeichnisse
-               durchsucht werden (noch nicht implementiert)
+    inroots -- Sequenz von Wurzelverzeichnissen, die mitsamt ihren
+               Unterverzeichnissen durchsucht werden (nach den vdirs und
+               vor dem PATH); die Treffer werden ebenenweise geliefert
+               (zuerst die Wurzeln, dann deren Unterverzeichnisse usw.,
+               innerhalb einer Ebene nach Namen sortiert), so dass die
+               Suche nach dem ersten Treffer abgebrochen werden kann.
+               Verzeichnisse unterhalb der xroots werden ausgelassen,
+               ebenso symbolische Links auf bereits besuchte Verzeichnisse
+
+    maxdepth -- die maximale Tiefe fuer die inroots-Suche
+                (0: nur die Wurzelverzeichnisse selbst);
+                Default: INROOTS_MAXDEPTH
+
+    trace -- ein ProbeStats-Objekt, das fuer jedes durchsuchte Verzeichnis
+             die Anzahl der Proben und Treffer sowie die benoetigte Zeit
+             sammelt (um langsame PATH-Eintraege zu finden);
+             Default: TRACE_PROBES (None, also keine Statistik)
 
     verbose -- ignored
 
+    cache -- ein ProgsCache-Objekt, oder True fuer den Standard-Cache
+             (progs_cache()); Treffer *und* Fehlschlaege werden dann auf der
+             Platte gespeichert und verwendet, solange sich keines der
+             beteiligten Verzeichnisse geaendert hat.
+             Default: USE_PROGS_CACHE (kein Cache).
+             Achtung: beim ersten (ungecachten) Aufruf wird die Suche
+             vollstaendig ausgefuehrt, auch wenn nur der erste Treffer
+             benoetigt wird.
+
+    probe -- Suchstrategie je Verzeichnis:
+             'isfile' -- fuer jede Extension wird os.path.isfile aufgerufen
+             'listdir' -- jedes Verzeichnis wird nur einmal gelesen (mit
+                          os.scandir, sofern verfuegbar), und der Inhalt mit
+                          den gesuchten Namen verglichen; lohnt sich bei
+                          vielen Extensions (PATHEXT) oder Netzlaufwerken
+             Default: PROBE_METHOD ('isfile').
+             Die Reihenfolge der Treffer ist in jedem Fall dieselbe.
+
+    listings -- ein Dictionary, in dem die gelesenen Verzeichnisinhalte
+                fuer weitere Aufrufe aufbewahrt werden (impliziert
+                probe='listdir'); siehe auch find_many_progs
+
     Die ...dirs- und ...roots-Argumente sind Sequenzen von Strings, die
     die Namen von Umgebungsvariablen enthalten duerfen, z.B. '%(windir)s'
     anstelle von r'c:\Windows'
@@ -464,7 +575,290 @@ def find_progs(progname,
     inroots = inroots and list(gen_expanded_strings(inroots, environ)) or []
     xroots = xroots and list(gen_expanded_strings(xroots, environ)) or []
     vdirs = vdirs and list(gen_expanded_strings(vdirs, environ)) or []
+    if vfunc is None:
+        vfunc = vsplit_digits
+    if maxdepth is None:
+        maxdepth = INROOTS_MAXDEPTH
+    if cache is None:
+        cache = USE_PROGS_CACHE
+    probe = _probe_function(probe, listings, trace)
+
+    key = None
+    if isinstance(cache, ProgsCache) or cache:
+        key = _progs_cache_key(progname, parentsof, indirs, scanpath, xroots,
+                               pathvar, vdirs, vfunc, inroots, maxdepth)
+    if key is None:     # no cache, or a vfunc which can't be identified
+        for fn in _gen_progs(progname, parentsof, indirs, scanpath,
+                             xroots, pathvar, vdirs, vfunc, inroots,
+                             probe, maxdepth=maxdepth):
+            yield fn
+        return
+    if not isinstance(cache, ProgsCache):
+        cache = progs_cache()
+    hits = cache.lookup(key)
+    if hits is None:
+        stamps = []
+        hits = list(_gen_progs(progname, parentsof, indirs, scanpath, xroots,
+                               pathvar, vdirs, vfunc, inroots,
+                               probe, stamps, maxdepth))
+        cache.store(key, hits, stamps)
+    for fn in hits:
+        yield fn
+
+def find_many_progs(names,
+                    parentsof=None,
+                    indirs=None,
+                    scanpath=None,
+                    xroots=None,
+                    pathvar='PATH',
+                    vdirs=None,
+                    vfunc=None,
+                    inroots=None,
+                    verbose=None,
+                    listings=None,
+                    maxdepth=None,
+                    trace=None):
+    """
+    Seek several programs at once, using the same search arguments (see
+    find_progs); the search directories are determined and read only once
+    for all of them.
 
+    Returns a dictionary which maps each of the given names to the list of
+    hits (the same which find_progs would yield for it).
+
+    listings -- an optional dictionary to store the directory listings
+                (e.g. to share them with subsequent find_progs calls)
+
+    trace -- a ProbeStats object (default: TRACE_PROBES), see find_progs
+    """
+    indirs = indirs and list(gen_expanded_strings(indirs, environ)) or []
+    inroots = inroots and list(gen_expanded_strings(inroots, environ)) or []
+    xroots = xroots and list(gen_expanded_strings(xroots, environ)) or []
+    vdirs = vdirs and list(gen_expanded_strings(vdirs, environ)) or []
+    if vfunc is None:
+        vfunc = vsplit_digits
+    if maxdepth is None:
+        maxdepth = INROOTS_MAXDEPTH
+    if listings is None:
+        listings = {}
+    probe = _probe_function('listdir', listings, trace)
+    plan = list(_gen_search_dirs(parentsof, indirs, scanpath, xroots,
+                                 pathvar, vdirs, vfunc, inroots,
+                                 maxdepth=maxdepth))
+    res = {}
+    for progname in names:
+        if progname not in res:
+            res[progname] = list(_gen_hits(plan, progname, probe))
+    return res
+
+def async_find_progs(progname, loop=None, executor=None, first=0,
+                     **kwargs):
+    """
+    asyncio variant of find_progs: return a future which resolves to the
+    list of hits (the same list find_progs would yield, in the same order),
+    without blocking the event loop.
+
+    The search directories are determined in the executor (default: the
+    one of the loop); then every directory is probed there as well,
+    concurrently.
+
+    first -- if true, the future resolves as soon as the first hit (in the
+             order of precedence of find_progs) is confirmed, i.e. when all
+             directories of higher precedence have been probed in vain;
+             the remaining probes are cancelled, and the list contains the
+             one hit (or nothing).
+
+    loop -- the event loop (default: the running loop; thus, without it,
+            the function must be called from a coroutine or callback)
+
+    All other keyword arguments are those of find_progs; if the cache is
+    used, the whole find_progs call is run in the executor.
+    """
+    if loop is None:
+        loop = _running_loop()
+    result = loop.create_future()
+    cache = kwargs.get('cache')
+    if cache is None:
+        cache = USE_PROGS_CACHE
+    if isinstance(cache, ProgsCache) or cache:
+        if first:
+            def call():
+                return list(find_progs(progname, **kwargs))[:1]
+        else:
+            def call():
+                return list(find_progs(progname, **kwargs))
+        _chain_future(loop.run_in_executor(executor, call), result)
+        return result
+
+    probe = _probe_function(kwargs.pop('probe', None),
+                            kwargs.pop('listings', None),
+                            kwargs.pop('trace', None))
+    kwargs.pop('verbose', None)
+    kwargs.pop('cache', None)
+
+    def search_plan():
+        return list(_gen_search_dirs(*_search_args(**kwargs)))
+
+    def plan_done(fut):
+        if result.done():
+            return
+        try:
+            plan = fut.result()
+        except Exception as e:
+            result.set_exception(e)
+            return
+        _race_probes(loop, executor, plan, progname, probe, first, result)
+    loop.run_in_executor(executor, search_plan).add_done_callback(plan_done)
+    return result
+
+def async_get_1st(progname, loop=None, executor=None, **kwargs):
+    """
+    asyncio variant of likeix.get_1st for find_progs: return a future which
+    resolves to the first hit of find_progs, or raises ProgramNotFound.
+    See async_find_progs (first=1).
+    """
+    if loop is None:
+        loop = _running_loop()
+    result = loop.create_future()
+
+    def found(fut):
+        if result.done():
+            return
+        try:
+            hits = fut.result()
+        except Exception as e:
+            result.set_exception(e)
+            return
+        if hits:
+            result.set_result(hits[0])
+        else:
+            result.set_exception(ProgramNotFound(progname))
+    async_find_progs(progname, loop, executor, first=1,
+                     **kwargs).add_done_callback(found)
+    return result
+
+def _running_loop():
+    """
+    return the running event loop; Python versions without
+    asyncio.get_running_loop (< 3.7) use get_event_loop instead
+    """
+    if asyncio is None:
+        raise ImportError('asyncio is not available')
+    try:
+        get_running_loop = asyncio.get_running_loop
+    except AttributeError:
+        return asyncio.get_event_loop()
+    return get_running_loop()
+
+def _chain_future(source, target):
+    """
+    transfer the outcome of the <source> future to the <target> future
+    """
+    def done(fut):
+        if target.done():
+            return
+        try:
+            target.set_result(fut.result())
+        except Exception as e:
+            target.set_exception(e)
+    source.add_done_callback(done)
+
+def _search_args(parentsof=None,
+                 indirs=None,
+                 scanpath=None,
+                 xroots=None,
+                 pathvar='PATH',
+                 vdirs=None,
+                 vfunc=None,
+                 inroots=None,
+                 maxdepth=None):
+    """
+    expand the find_progs arguments which determine the search directories,
+    and return them as a tuple of positional arguments for _gen_search_dirs
+    """
+    indirs = indirs and list(gen_expanded_strings(indirs, environ)) or []
+    inroots = inroots and list(gen_expanded_strings(inroots, environ)) or []
+    xroots = xroots and list(gen_expanded_strings(xroots, environ)) or []
+    vdirs = vdirs and list(gen_expanded_strings(vdirs, environ)) or []
+    if vfunc is None:
+        vfunc = vsplit_digits
+    if maxdepth is None:
+        maxdepth = INROOTS_MAXDEPTH
+    return (parentsof, indirs, scanpath, xroots,
+            pathvar, vdirs, vfunc, inroots, None, maxdepth)
+
+def _race_probes(loop, executor, plan, progname, probe, first, result):
+    """
+    probe all directories of the plan concurrently in the executor, and
+    resolve the <result> future with the hits in order of precedence
+    (see async_find_progs)
+    """
+    names = [progname+e for e in _split_progname(progname)[1]]
+    probed = [None] * len(plan)
+    futures = []
+    # the hits are sorted by _gen_hits, probing the (already probed)
+    # plan indexes:
+    iplan = [(i, tup[1]) for (i, tup) in enumerate(plan)]
+
+    def settled():
+        """
+        return the length of the plan prefix which has been completely
+        probed; a group of versioned directories counts as a whole
+        """
+        k = 0
+        for k, found in enumerate(probed):
+            if found is None:
+                break
+        else:
+            return len(probed)
+        while k > 0 and plan[k][1] is not None and plan[k-1][1] is not None:
+            k -= 1
+        return k
+
+    def probed_hits(i, names):
+        return probed[i]
+
+    def check(i, fut):
+        if result.done():
+            return
+        try:
+            probed[i] = fut.result()
+        except Exception as e:
+            cancel()
+            result.set_exception(e)
+            return
+        k = settled()
+        if first:
+            for fn in _gen_hits(iplan[:k], progname, probed_hits):
+                cancel()
+                result.set_result([fn])
+                return
+        if k == len(plan):
+            result.set_result(list(_gen_hits(iplan, progname, probed_hits)))
+
+    def cancel(fut=None):
+        for fut in futures:
+            if not fut.done():
+                fut.cancel()
+
+    if not plan:
+        result.set_result([])
+        return
+    for d, ver in plan:
+        futures.append(loop.run_in_executor(executor,
+                                            _probed_list, probe, d, names))
+    for i, fut in enumerate(futures):
+        fut.add_done_callback(partial(check, i))
+    result.add_done_callback(cancel)    # e.g. if cancelled by the caller
+
+def _probed_list(probe, d, names):
+    return list(probe(d, names))
+
+def _split_progname(progname):
+    """
+    split the given program name into the stem and the list of extensions
+    to try (from PATHEXT, unless given)
+    """
     progname, extensions = splitext(progname)
     if not extensions:
         try:
@@ -475,42 +869,327 @@ def find_progs(progname,
             extensions = ['']
     else:
         extensions = [extensions or '']
+    return progname, extensions
+
+def _gen_progs(progname, parentsof, indirs, scanpath, xroots,
+               pathvar, vdirs, vfunc, inroots,
+               probe=None, stamps=None, maxdepth=None):
+    """
+    the worker generator for find_progs, which expects the ...dirs and
+    ...roots arguments already expanded.
+
+    probe -- a function (directory, names) which yields the existing files;
+             by default, _probe_isfile
+
+    stamps -- if a list is given, a (directory, _dir_stamp(directory)) tuple
+              is appended for each directory which is involved in the search
+              (for the ProgsCache)
+
+    maxdepth -- the depth limit for the inroots search
+    """
+    return _gen_hits(_gen_search_dirs(parentsof, indirs, scanpath, xroots,
+                                      pathvar, vdirs, vfunc, inroots,
+                                      stamps, maxdepth),
+                     progname, probe)
+
+def _gen_hits(plan, progname, probe=None):
+    """
+    generate the hits for the given program name
+
+    plan -- a sequence of (directory, version) tuples, see _gen_search_dirs
+    probe -- a function (directory, names) which yields the existing files;
+             by default, _probe_isfile
+    """
+    if probe is None:
+        probe = _probe_isfile
+    progname, extensions = _split_progname(progname)
+    names = [progname+e for e in extensions]
+    vfound = []
+    for d, ver in plan:
+        if ver is not None:
+            for fn in probe(d, names):
+                vfound.append((ver, fn))
+            continue
+        if vfound:
+            for fn in _sorted_vfound(vfound):
+                yield fn
+            del vfound[:]
+        for fn in probe(d, names):
+            yield fn
+    if vfound:
+        for fn in _sorted_vfound(vfound):
+            yield fn
+
+def _sorted_vfound(found):
+    """
+    sort the (version, filename) tuples found in versioned directories,
+    and return the filenames (higher versions first)
+    """
+    found.sort()
+    found.reverse() # hoehere Versionen zuerst
+    return [tup[1] for tup in found]
+
+def _probe_isfile(d, names):
+    """
+    yield the existing files of the given names in directory <d>
+    """
+    for name in names:
+        fn = join(d, name)
+        if isfile(fn):
+            yield fn
+
+def _dir_entries(d):
+    """
+    read the given directory once and return a dictionary which maps the
+    normcased names to functions which tell whether the entry is a file
+    (following symbolic links, like os.path.isfile).
+
+    Returns an empty dictionary for non-existing directories,
+    and None if the directory can't be read (but might be searchable).
+    """
+    try:
+        if scandir is not None:
+            return dict([(normcase(entry.name), entry.is_file)
+                         for entry in scandir(d)])
+        return dict([(normcase(name), partial(isfile, join(d, name)))
+                     for name in listdir(d)])
+    except OSError as e:
+        if e.errno in (ENOENT, ENOTDIR):
+            return {}
+        return None
+
+def _probe_listing(d, names, listings=None):
+    """
+    yield the existing files of the given names in directory <d>, reading
+    the directory once instead of probing each name (see _dir_entries).
+
+    listings -- an optional dictionary to store the directory listings,
+                to be reused for further names
+    """
+    if listings is None:
+        entries = _dir_entries(d)
+    else:
+        try:
+            entries = listings[d]
+        except KeyError:
+            entries = listings[d] = _dir_entries(d)
+    if entries is None:     # not readable; try the hard way
+        for fn in _probe_isfile(d, names):
+            yield fn
+        return
+    for name in names:
+        try:
+            is_file = entries[normcase(name)]
+        except KeyError:
+            continue
+        try:
+            if is_file():
+                yield join(d, name)
+        except OSError:
+            pass
+
+PROBE_METHOD = 'isfile' # default for the probe argument of find_progs
+_PROBES = {'isfile': _probe_isfile,
+           'listdir': _probe_listing,
+           }
+
+def _probe_function(probe, listings=None, trace=None):
+    """
+    return the probe function for the given name (default: PROBE_METHOD);
+    if a listings dictionary is given, the listings are stored there.
+
+    trace -- a ProbeStats object to record the probes (default:
+             TRACE_PROBES; False: no tracing)
+    """
+    if listings is not None:
+        probe = partial(_probe_listing, listings=listings)
+    else:
+        if probe is None:
+            probe = PROBE_METHOD
+        try:
+            probe = _PROBES[probe]
+        except KeyError:
+            raise ValueError('unknown probe method %r (choose one of %s)'
+                             % (probe, ', '.join(sorted(_PROBES.keys()))))
+    if trace is None:
+        trace = TRACE_PROBES
+    if trace is None or trace is False:
+        return probe
+    return trace.wrap(probe)
+
+class ProbeStats(object):
+    """
+    Per-directory statistics of the probes of find_progs (see the trace
+    argument): for each directory, the number of probes (i.e., checked
+    names), the number of hits and the cumulative time in seconds.
+
+    >>> stats = ProbeStats()
+    >>> stats.record('/usr/bin', 2, 1, 0.5)
+    >>> stats.record('/usr/bin', 2, 0, 0.25)
+    >>> stats.record('/bin', 2, 0, 0.125)
+    >>> list(stats)
+    [('/usr/bin', 4, 1, 0.75), ('/bin', 2, 0, 0.125)]
+    >>> stats['/bin']
+    (2, 0, 0.125)
+    >>> stats.slowest(1)
+    [('/usr/bin', 4, 1, 0.75)]
+
+    The same object can be used by several threads.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._stats = {}
+        self._order = []
+        self._lock = Lock()
+
+    def record(self, d, probes, hits, seconds):
+        """
+        add the given numbers to the statistics for directory <d>
+        """
+        self._lock.acquire()
+        try:
+            try:
+                val = self._stats[d]
+            except KeyError:
+                val = self._stats[d] = [0, 0, 0.0]
+                self._order.append(d)
+            val[0] += probes
+            val[1] += hits
+            val[2] += seconds
+        finally:
+            self._lock.release()
+
+    def wrap(self, probe):
+        """
+        return a probe function (see _gen_hits) which calls the given one
+        and records the statistics
+        """
+        def traced_probe(d, names):
+            start = _clock()
+            found = list(probe(d, names))
+            self.record(d, len(names), len(found), _clock() - start)
+            return found
+        return traced_probe
+
+    def probe(self, d, names=(), method='listdir'):
+        """
+        probe the given directory for the given names (by default: none,
+        which measures the time needed to read the directory, using the
+        'listdir' method), record the statistics and return the hits
+        """
+        probe = self.wrap(_probe_function(method, trace=False))
+        return probe(d, list(names))
+
+    def __getitem__(self, d):
+        return tuple(self._stats[d])
+
+    def __contains__(self, d):
+        return d in self._stats
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        """
+        generate (directory, probes, hits, seconds) tuples, in order of
+        the first probe
+        """
+        for d in self._order[:]:
+            yield (d,) + tuple(self._stats[d])
+
+    def slowest(self, n=None):
+        """
+        return the (directory, probes, hits, seconds) tuples with the
+        greatest cumulative time first (all, or the first <n>)
+        """
+        res = [(tup[3], i, tup) for (i, tup) in enumerate(self)]
+        res.sort(key=lambda t: (-t[0], t[1]))
+        res = [t[2] for t in res]
+        if n is not None:
+            return res[:n]
+        return res
+
+    def format(self, d,
+               mask='%(ms)9.3f ms, %(probes)d probes, %(hits)d hits'):
+        """
+        format the statistics of the given directory; the mask may use the
+        keys probes, hits, seconds and ms (milliseconds)
+
+        >>> stats = ProbeStats()
+        >>> stats.record('/bin', 3, 1, 0.0125)
+        >>> stats.format('/bin')
+        '   12.500 ms, 3 probes, 1 hits'
+        """
+        probes, hits, seconds = self._stats[d]
+        ms = seconds * 1000
+        return mask % locals()
+
+TRACE_PROBES = None # default ProbeStats object for the trace argument
+
+def _gen_search_dirs(parentsof, indirs, scanpath, xroots,
+                     pathvar, vdirs, vfunc, inroots, stamps=None,
+                     maxdepth=None):
+    """
+    generate (directory, version) tuples in the order of precedence of
+    find_progs; the version is None for all but the versioned directories
+    (vdirs), which are generated consecutively
+    """
+    if stamps is None:
+        def watch(d):
+            pass
+    else:
+        def watch(d):
+            stamps.append((d, _dir_stamp(d)))
+
     # parents of (fuer lokale Konfigurationsdateien):
     if parentsof:
+        watch(abspath(parentsof))
         for d in gen_parents(parentsof):
-            for e in extensions:
-                fn = join(d, progname+e)
-                if isfile(fn):
-                    yield fn
+            watch(d)
+            yield d, None
 
     # direkt angegebene Verzeichnisse:
     for d in indirs:
+        watch(d)
         if not isdir(d):
             continue
-        d = normpath(d)
-        for e in extensions:
-            fn = join(d, progname+e)
-            if isfile(fn):
-                yield fn
+        yield normpath(d), None
 
     # Versionsverzeichnisse
-    if vdirs:
-        if vfunc is None:
-            vfunc = vsplit_digits
-        found = []
-        for vdir in vdirs:
-            for d in glob(vdir):
-                ver = vfunc(d)
-                if ver is not None:
-                    for e in extensions:
-                        fn = join(d, progname+e)
-                        if isfile(fn):
-                            found.append((ver, fn))
-        if found:
-            found.sort()
-            found.reverse() # hoehere Versionen zuerst
-            for tup in found:
-                yield tup[1]
+    for vdir in vdirs:
+        # a new directory shows up in the modification time of its parent;
+        # for wildcard parents, watch the directories they match, up to
+        # the first parent without wildcards:
+        parent = dirname(vdir)
+        while parent and has_magic(parent):
+            for d in glob(parent):
+                watch(d)
+            parent = dirname(parent)
+        if parent:
+            watch(parent)
+        for d in glob(vdir):
+            ver = vfunc(d)
+            if ver is not None:
+                watch(d)
+                yield d, ver
+
+    if xroots:
+        xroots_dic = {}
+        list(_gen_absdir_tuples(xroots, xroots_dic))
+        xroots_trie = _DirTrie(xroots_dic)
+    else:
+        xroots_trie = None
+
+    # Wurzelverzeichnisse, ebenenweise:
+    if inroots:
+        if maxdepth is None:
+            maxdepth = INROOTS_MAXDEPTH
+        for d in _gen_walked_dirs(inroots, maxdepth, xroots_trie):
+            watch(d)
+            yield d, None
 
     oricase = {}
     # PATH:
@@ -529,24 +1208,652 @@ def find_progs(progname,
         if not path_tups:
             scanpath = 0
     if scanpath:
-        if xroots:
-            xroots_dic = {}
-            list(_gen_absdir_tuples(xroots, xroots_dic))
-            for t in path_tups:
-                if stored_below_any_dirtup(t, xroots_dic):
+        for t in path_tups:
+            if xroots_trie and stored_below_any_dirtup(t, xroots_trie):
+                continue
+            d = _rejoin(t)
+            watch(d)
+            yield d, None
+
+INROOTS_MAXDEPTH = 3 # default for the maxdepth argument of find_progs
+INROOTS_WORKERS = 4  # threads to read the subdirectories of a level
+
+def _dir_ident(d):
+    """
+    return a (st_dev, st_ino) tuple which identifies the given directory
+    (following symbolic links), or None
+    """
+    try:
+        st = stat(d)
+    except OSError:
+        return None
+    if st.st_ino:
+        return (st.st_dev, st.st_ino)
+    return normcase(abspath(d))     # no inode numbers available
+
+def _list_subdirs(d):
+    """
+    return a list of (path, ident) tuples for the subdirectories of <d>
+    (including symbolic links to directories), sorted by name; ident is
+    the _dir_ident value.  Unreadable directories yield an empty list.
+    """
+    res = []
+    try:
+        if scandir is not None:
+            for entry in scandir(d):
+                try:
+                    if not entry.is_dir():
+                        continue
+                    st = entry.stat()
+                except OSError:
                     continue
-                for e in extensions:
-                    t2 = t + (progname+e,)
-                    fn = _rejoin(t2)
-                    if isfile(fn):
-                        yield fn
+                if st.st_ino:
+                    ident = (st.st_dev, st.st_ino)
+                else:
+                    ident = normcase(abspath(entry.path))
+                res.append((normcase(entry.name), entry.path, ident))
         else:
-            for t in path_tups:
-                for e in extensions:
-                    t2 = t + (progname+e,)
-                    fn = _rejoin(t2)
-                    if isfile(fn):
-                        yield fn
+            for name in listdir(d):
+                path = join(d, name)
+                if not isdir(path):
+                    continue
+                ident = _dir_ident(path)
+                if ident is not None:
+                    res.append((normcase(name), path, ident))
+    except OSError:
+        return []
+    res.sort()
+    return [tup[1:] for tup in res]
+
+def _gen_walked_dirs(roots, maxdepth, xroots_trie=None, workers=None):
+    """
+    generate the given root directories and their subdirectories, up to
+    the given depth, level by level (breadth first); within each level,
+    the order of the parents is kept, and subdirectories are sorted by
+    name.
+
+    Directories below the excluded roots (a _DirTrie) are pruned, and
+    directories which have been visited already (e.g. via symbolic
+    links, which might create loops) are skipped.
+
+    While the directories of one level are generated (and probed by the
+    consumer), their subdirectories are read by a small thread pool
+    (workers, default: INROOTS_WORKERS), if available.
+    """
+    if workers is None:
+        workers = INROOTS_WORKERS
+    seen = set()
+    level = []
+    for d in roots:
+        if not isdir(d):
+            continue
+        d = normpath(d)
+        ident = _dir_ident(d)
+        if ident is None or ident in seen:
+            continue
+        seen.add(ident)
+        if xroots_trie and _pruned(d, xroots_trie):
+            continue
+        level.append(d)
+
+    pool = None
+    pending = []
+    if ThreadPoolExecutor is not None and workers > 1 and maxdepth > 0:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        depth = 0
+        while level:
+            if depth >= maxdepth:
+                for d in level:
+                    yield d
+                return
+            if pool is not None:
+                pending = [pool.submit(_list_subdirs, d) for d in level]
+            for d in level:
+                yield d
+            if pool is not None:
+                results = [f.result() for f in pending]
+                pending = []
+            else:
+                results = [_list_subdirs(d) for d in level]
+            level = []
+            for subdirs in results:
+                for path, ident in subdirs:
+                    if ident in seen:
+                        continue
+                    seen.add(ident)
+                    if xroots_trie and _pruned(path, xroots_trie):
+                        continue
+                    level.append(path)
+            depth += 1
+    finally:
+        if pool is not None:
+            for f in pending:
+                f.cancel()
+            pool.shutdown(wait=False)
+
+def _pruned(d, xroots_trie):
+    """
+    is the given directory stored below one of the excluded roots?
+    """
+    return xroots_trie.below(tuple(normcase(abspath(d)).split(sep)))
+
+## -----------------------------------------[ persistent caching ... [
+
+USE_PROGS_CACHE = 0 # default for the cache argument of find_progs
+
+def cache_dir():
+    """
+    return the directory for the persistent caches of thebops modules:
+    the value of the THEBOPS_CACHE_DIR environment variable, if set,
+    or a 'thebops' subdirectory of the usual place for such things
+    """
+    try:
+        return environ['THEBOPS_CACHE_DIR']
+    except KeyError:
+        pass
+    for varname in ('XDG_CACHE_HOME',   # *x
+                    'LOCALAPPDATA',     # Windows(tm) Vista+
+                    'APPDATA',          # Windows(tm) XP
+                    ):
+        if environ.get(varname):
+            return join(environ[varname], 'thebops')
+    return join(expanduser('~'), '.cache', 'thebops')
+
+class PersistentCache(object):
+    """
+    A small dictionary-like cache which is stored in a pickle file
+    (by default in the cache_dir()).
+
+    Changes are written when the program terminates, or when the save method
+    is called; if the cache can't be read or written, it simply starts empty.
+    If there are more than <maxentries> entries, the oldest ones are dropped
+    when saving.
+    """
+    format_version = 1
+
+    def __init__(self, name, maxentries=1000, filename=None):
+        if filename is None:
+            filename = join(cache_dir(), name)
+        self.filename = filename
+        self.maxentries = maxentries
+        self._data = None
+        self._serial = 0
+        self._dirty = 0
+        self._registered = 0
+        self._lock = Lock()
+
+    def _signature(self):
+        return (self.__class__.__name__, self.format_version)
+
+    def _load(self):
+        """
+        load the data (if not done yet); to be called with the lock acquired
+        """
+        if self._data is None:
+            data = {}
+            try:
+                fo = open(self.filename, 'rb')
+                try:
+                    signature, stored = pickle.load(fo)
+                finally:
+                    fo.close()
+                if signature == self._signature():
+                    data = stored
+            except Exception:   # missing, unreadable or outdated
+                pass
+            self._data = data
+            if data:
+                self._serial = max([tup[0] for tup in data.values()]) + 1
+        return self._data
+
+    def __getitem__(self, key):
+        self._lock.acquire()
+        try:
+            return self._load()[key][1]
+        finally:
+            self._lock.release()
+
+    def __setitem__(self, key, value):
+        self._lock.acquire()
+        try:
+            self._load()[key] = (self._serial, value)
+            self._serial += 1
+            self._changed()
+        finally:
+            self._lock.release()
+
+    def __contains__(self, key):
+        self._lock.acquire()
+        try:
+            return key in self._load()
+        finally:
+            self._lock.release()
+
+    def __len__(self):
+        self._lock.acquire()
+        try:
+            return len(self._load())
+        finally:
+            self._lock.release()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def discard(self, key):
+        self._lock.acquire()
+        try:
+            data = self._load()
+            if key in data:
+                del data[key]
+                self._changed()
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._data = {}
+            self._changed()
+        finally:
+            self._lock.release()
+
+    def _changed(self):
+        self._dirty = 1
+        if not self._registered:
+            atexit.register(self.save)
+            self._registered = 1
+
+    def save(self):
+        """
+        write the cache file, if anything has changed
+        """
+        self._lock.acquire()
+        try:
+            if not self._dirty:
+                return
+            data = self._data
+            surplus = len(data) - self.maxentries
+            if surplus > 0:
+                keys = sorted(data.keys(), key=lambda k: data[k][0])
+                for k in keys[:surplus]:
+                    del data[k]
+            tmpname = '%s.%d.tmp' % (self.filename, getpid())
+            try:
+                parent = dirname(self.filename)
+                if parent and not isdir(parent):
+                    makedirs(parent)
+                fo = open(tmpname, 'wb')
+                try:
+                    pickle.dump((self._signature(), data), fo, 2)
+                finally:
+                    fo.close()
+                _replace(tmpname, self.filename)
+                self._dirty = 0
+            except (IOError, OSError):
+                pass    # a cache is no reason to fail
+        finally:
+            self._lock.release()
+
+def _dir_stamp(d):
+    """
+    return the modification stamp of the given directory, or None
+    """
+    try:
+        st = stat(d)
+    except OSError:
+        return None
+    return getattr(st, 'st_mtime_ns', st.st_mtime)
+
+class ProgsCache(PersistentCache):
+    """
+    A persistent cache for find_progs results (hits and misses).
+
+    Each entry remembers the modification stamps of the directories involved
+    in the search; if any of them has changed (e.g. because a program was
+    installed or removed), the entry is discarded.  Thus, a cached lookup
+    takes one stat call per directory, instead of one per directory and
+    extension.
+    """
+
+    def lookup(self, key):
+        """
+        return the list of cached hits (possibly empty), or None
+        """
+        try:
+            hits, stamps = self[key]
+        except KeyError:
+            return None
+        for d, stamp in stamps:
+            if _dir_stamp(d) != stamp:
+                self.discard(key)
+                return None
+        return list(hits)
+
+    def store(self, key, hits, stamps):
+        """
+        store the hits, together with the (directory, stamp) tuples
+        """
+        seen = set()
+        unique = []
+        for tup in stamps:
+            if tup[0] not in seen:
+                seen.add(tup[0])
+                unique.append(tup)
+        self[key] = (tuple(hits), tuple(unique))
+
+_PROGS_CACHE = None
+def progs_cache():
+    """
+    return the default ProgsCache (one file per major Python version)
+    """
+    global _PROGS_CACHE
+    if _PROGS_CACHE is None:
+        _PROGS_CACHE = ProgsCache('find_progs-py%d.pickle' % version_info[0])
+    return _PROGS_CACHE
+
+def _progs_cache_key(progname, parentsof, indirs, scanpath, xroots,
+                     pathvar, vdirs, vfunc, inroots, maxdepth=None):
+    """
+    create the ProgsCache key for the given (expanded) find_progs arguments;
+    return None if the result must not be cached (see _func_key)
+    """
+    if vdirs:
+        vkey = _func_key(vfunc)
+        if vkey is None:
+            return None
+    else:
+        vkey = None     # vfunc is not used
+    pathval = pathvar and environ.get(pathvar) or None
+    relative = [s for s in ([parentsof or '/'] + indirs + vdirs + inroots
+                            + (pathval or '').split(pathsep))
+                if s and not isabs(s)]
+    return (progname,
+            parentsof, tuple(indirs), scanpath, tuple(xroots),
+            pathvar, pathval, environ.get('PATHEXT'),
+            tuple(vdirs), vkey,
+            tuple(inroots), inroots and (maxdepth,) or (),
+            relative and getcwd() or None,
+            )
+
+def _func_key(func):
+    """
+    identify the given function by its module and name, for a persistent
+    key; lambdas, nested functions (closures) and other callables which
+    can't be found by module and name yield None
+
+    >>> _func_key(vsplit_digits)
+    ('thebops.anyos', 'vsplit_digits')
+    >>> _func_key(lambda s: s) is None
+    True
+    """
+    modname = getattr(func, '__module__', None)
+    name = getattr(func, '__name__', None)
+    try:
+        if getattr(modules[modname], name) is func:
+            return (modname, name)
+    except (KeyError, AttributeError, TypeError):
+        pass
+    return None
+
+## -----------------------------------------] ... persistent caching ]
+
+## ----------------------------------------------[ PathIndex class ... [
+
+def _list_files(d):
+    """
+    return the names of the files (not: directories) in directory <d>;
+    an empty list if it can't be read
+    """
+    try:
+        if scandir is not None:
+            return [entry.name
+                    for entry in scandir(d)
+                    if entry.is_file()]
+        return [name
+                for name in listdir(d)
+                if isfile(join(d, name))]
+    except OSError:
+        return []
+
+class PathIndex(object):
+    """
+    An inverted index of the files in the directories of a PATH-like
+    environment variable: maps the (normcased) names to the full paths,
+    in the order of the variable.
+
+    The directories are read on first use; refresh() re-reads only those
+    directories whose modification time has changed (or all of them, if the
+    variable itself has changed).
+
+    If the extensions (by default: from PATHEXT) are not empty, programs can
+    be looked up by their stems, like find_progs does: 'sed' finds sed.exe,
+    sed.bat etc.; a name with an extension is looked up as it is.
+    """
+
+    def __init__(self, varname='PATH', extensions=None, curdir=False,
+                 env=None):
+        """
+        varname -- the name of the environment variable (default: PATH)
+        extensions -- a sequence of extensions (including the dots); by
+                      default, the PATHEXT environment variable is used
+        curdir -- search the current directory first (like Windows(tm)
+                  does for the PATH)
+        env -- the environment dictionary (default: os.environ)
+        """
+        if env is None:
+            env = environ
+        if extensions is None:
+            try:
+                extensions = env['PATHEXT'].split(pathsep)
+            except KeyError:
+                extensions = []
+        self.varname = varname
+        self.extensions = [normcase(e) for e in extensions]
+        self.curdir = curdir
+        self.env = env
+        self.value = None
+        self._built = 0
+        self.dirs = []
+        self._listings = []
+        self._files = {}
+        self._commands = {}
+        self._shadowed = set()
+        self._sorted = None
+
+    def _gen_dirs(self):
+        """
+        generate the unique directories of the variable
+        """
+        seen = set()
+        specs = [s for s in (self.value or '').split(pathsep) if s]
+        if self.curdir:
+            specs.insert(0, '.')
+        for s in specs:
+            n = np(s)
+            if n not in seen:
+                seen.add(n)
+                yield s
+
+    def refresh(self):
+        """
+        (re-) read the directories which have changed since the last call;
+        returns the number of directories which were read
+        """
+        value = self.env.get(self.varname)
+        if value != self.value or not self._built:
+            self._built = 1
+            self.value = value
+            self.dirs = list(self._gen_dirs())
+            self._listings = [None] * len(self.dirs)
+            self._files = {}
+            self._commands = {}
+            self._shadowed = set()
+            self._sorted = None
+        count = 0
+        for pos in range(len(self.dirs)):
+            d = self.dirs[pos]
+            stamp = _dir_stamp(d)
+            listing = self._listings[pos]
+            if listing is not None and listing[0] == stamp:
+                continue
+            if listing is not None:
+                for name in listing[1]:
+                    self._remove(pos, name)
+            names = stamp is not None and _list_files(d) or []
+            for name in names:
+                self._add(pos, d, name)
+            self._listings[pos] = (stamp, names)
+            count += 1
+        return count
+
+    def _ensure(self):
+        if not self._built:
+            self.refresh()
+
+    def _command_keys(self, name):
+        """
+        generate (key, rank) tuples for the commands the given file name
+        provides
+        """
+        if not self.extensions:
+            return
+        stem, ext = splitext(name)
+        ext = normcase(ext)
+        if ext in self.extensions:
+            yield normcase(stem), self.extensions.index(ext)
+        if '' in self.extensions:
+            yield normcase(name), self.extensions.index('')
+
+    def _add(self, pos, d, name):
+        fn = join(d, name)
+        key = normcase(name)
+        liz = self._files.setdefault(key, [])
+        insort(liz, (pos, fn))
+        if not self.extensions:
+            self._note(key, liz)
+        for key, rank in self._command_keys(name):
+            liz = self._commands.setdefault(key, [])
+            insort(liz, (pos, rank, fn))
+            self._note(key, liz)
+
+    def _remove(self, pos, name):
+        fn = join(self.dirs[pos], name)
+        key = normcase(name)
+        liz = self._files[key]
+        liz.remove((pos, fn))
+        if not liz:
+            del self._files[key]
+        if not self.extensions:
+            self._note(key, liz)
+        for key, rank in self._command_keys(name):
+            liz = self._commands[key]
+            liz.remove((pos, rank, fn))
+            if not liz:
+                del self._commands[key]
+            self._note(key, liz)
+
+    def _note(self, key, liz):
+        """
+        keep track of the shadowed names (and of the sorted keys)
+        """
+        if len(liz) > 1:
+            self._shadowed.add(key)
+        else:
+            self._shadowed.discard(key)
+        if len(liz) <= 1:
+            self._sorted = None
+
+    def _names(self):
+        """
+        the dictionary of command names
+        """
+        if self.extensions:
+            return self._commands
+        return self._files
+
+    def lookup(self, name):
+        """
+        return the full paths for the given name, in order of precedence
+        (an empty list if not found)
+
+        Names are looked up by their stem (see the extensions) if they don't
+        contain an extension themselves
+        """
+        self._ensure()
+        if self.extensions and not splitext(name)[1]:
+            return [tup[-1] for tup in self._commands.get(normcase(name), [])]
+        return [tup[-1] for tup in self._files.get(normcase(name), [])]
+
+    def __contains__(self, name):
+        return bool(self.lookup(name))
+
+    def first(self, name):
+        """
+        return the first full path for the given name, or None
+        """
+        for fn in self.lookup(name):
+            return fn
+        return None
+
+    def names(self):
+        """
+        return the sorted list of known (normcased) command names
+        """
+        self._ensure()
+        if self._sorted is None:
+            self._sorted = sorted(self._names().keys())
+        return self._sorted
+
+    def startingwith(self, prefix):
+        """
+        return the sorted list of command names which start with the given
+        prefix
+        """
+        keys = self.names()
+        prefix = normcase(prefix)
+        pos = bisect_left(keys, prefix)
+        res = []
+        for key in keys[pos:]:
+            if not key.startswith(prefix):
+                break
+            res.append(key)
+        return res
+
+    def shadowed(self):
+        """
+        generate (name, paths) tuples for the command names which are found
+        more than once; the first path wins, the others are shadowed
+        """
+        self._ensure()
+        names = self._names()
+        for key in sorted(self._shadowed):
+            yield key, [tup[-1] for tup in names[key]]
+
+    def empty_dirs(self):
+        """
+        return the directories which contribute no files at all
+        """
+        self._ensure()
+        return [self.dirs[pos]
+                for pos in range(len(self.dirs))
+                if not self._listings[pos][1]]
+
+    def idle_dirs(self):
+        """
+        return the directories which contribute no command: they are empty,
+        or all of their names are shadowed by earlier directories
+        """
+        self._ensure()
+        winners = set([liz[0][0] for liz in self._names().values()])
+        return [self.dirs[pos]
+                for pos in range(len(self.dirs))
+                if pos not in winners]
+
+## ----------------------------------------------] ... PathIndex class ]
 
 def vsplit_digits(s):
     r"""
@@ -712,12 +2019,70 @@ def _rejoin(tup):
     return sep.join(tup)
 
 
+class _DirTrie(object):
+    """
+    a path component trie of directory tuples (as generated by
+    _gen_absdir_tuples and normcased); checking whether a path is stored
+    below any of them costs O(depth of the path), regardless of the
+    number of directories
+
+    >>> trie = _DirTrie([('', 'usr', 'local'), ('', 'opt')])
+    >>> trie.below(('', 'usr', 'local', 'bin'))
+    1
+    >>> trie.below(('', 'usr', 'bin'))
+    0
+    >>> trie.below(('', 'opt'))
+    1
+    >>> len(trie)
+    2
+    """
+    __slots__ = ('root', 'count')
+
+    def __init__(self, tupsequence=()):
+        self.root = {}
+        self.count = 0
+        for t in tupsequence:
+            self.add(t)
+
+    def add(self, tup):
+        node = self.root
+        for part in tup:
+            node = node.setdefault(part, {})
+        if None not in node:
+            node[None] = 1
+            self.count += 1
+
+    def below(self, s):
+        """
+        s -- a normcased tuple
+        """
+        node = self.root
+        if None in node:
+            return 1
+        for part in s:
+            try:
+                node = node[part]
+            except KeyError:
+                return 0
+            if None in node:
+                return 1
+        return 0
+
+    def __len__(self):
+        return self.count
+
+
 def stored_below_any_dirtup(s, tupsequence):
     """
     normalize the path, given as tuple/list/string, and look for it
     in the given sequence of tuples (which may be a dictionary with
-    tuple keys as well)
+    tuple keys as well, or a _DirTrie, which is the fastest option
+    when checking many paths against the same directories)
 
+    >>> stored_below_any_dirtup(('', 'usr', 'bin'), [('', 'usr')])
+    1
+    >>> stored_below_any_dirtup(('', 'opt', 'bin'), {('', 'usr'): 1})
+    0
     """
     if isinstance(s, tuple):
         s = tuple(map(normcase, s))
@@ -725,10 +2090,9 @@ def stored_below_any_dirtup(s, tupsequence):
         s = tuple(map(normcase, s))
     else:
         s = tuple(normcase(s).split(sep))
-    for t in tupsequence:
-        if _stored_below_dirtup(s, t):
-            return 1
-    return 0
+    if not isinstance(tupsequence, _DirTrie):
+        tupsequence = _DirTrie(tupsequence)
+    return tupsequence.below(s)
 
 def np(s):
     """
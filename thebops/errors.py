@@ -72,12 +72,23 @@ def set_progname(name=None):
 
 set_progname('errors')
 
+_INFOTO = None
+def set_infodevice(to=None):
+    """
+    setze das Ausgabegeraet fuer Infos ohne explizites Ziel (auch die von
+    fatal und check_errors), z. B. stderr, wenn die Standardausgabe
+    maschinenlesbar bleiben muss; None: die Standardausgabe
+    """
+    global _INFOTO
+    _INFOTO = to
+
 def info(text, to=None):
     """
     gib die uebergebene Info aus, per Default zur Standardausgabe
+    (siehe set_infodevice)
     """
     if to is None:
-        to = stdout
+        to = _INFOTO or stdout
     print >> to, _PROGNAME+'i', text
 
 WARNINGS = 0
@@ -57,6 +57,7 @@ VERSION = (0,
 __version__ = '.'.join(map(str, VERSION))
 __all__ = ['ToolsHub',      # smart wrapper for find_progs
            'find_progs',    # from anyos.py
+           'find_many_progs',
            # wrappers for find_progs:
            'find_diff',
            'find_find',
@@ -90,6 +91,9 @@ __all__ = ['ToolsHub',      # smart wrapper for find_progs
            # wrap them all and take the 1st/best:
            'get_1st',
            'get_best',
+           # version_func for get_best:
+           'VersionProber',
+           'python_version',
            # indirs generation:
            'ProgramDirs',
            'PosixToolsDirs',
@@ -103,10 +107,33 @@ __all__ = ['ToolsHub',      # smart wrapper for find_progs
            'VersionConstrained',
            ]
 
-from os import environ
-from os.path import abspath, join
-from thebops.anyos import find_progs, ProgramNotFound, vdir_digits, \
-        VersionsUnknown, VersionConstrained
+import re
+from os import environ, stat
+from os.path import abspath, join, realpath
+from sys import version_info
+from subprocess import Popen, PIPE, STDOUT
+try:
+    from os import setsid, killpg
+    from signal import SIGKILL
+except ImportError:     # Windows(tm)
+    setsid = killpg = None
+from functools import partial
+try:
+    from threading import Lock, Event, Timer, Thread
+except ImportError:
+    from dummy_threading import Lock, Event, Timer, Thread
+try:
+    from queue import Queue, Empty
+except ImportError:     # Python 2
+    from Queue import Queue, Empty
+try:
+    from concurrent.futures import ThreadPoolExecutor  # Python 3.2+
+except ImportError:
+    ThreadPoolExecutor = None
+from thebops.anyos import find_progs, find_many_progs, \
+        ProgramNotFound, vdir_digits, \
+        VersionsUnknown, VersionConstrained, \
+        PersistentCache, ProbeStats
 
 try:    # i18n-Dummy
     _
@@ -155,7 +182,7 @@ def _check_version(v, min_version=None, version_below=None,
     False
     """
     assert onerror in ('return', 'error')
-    if v < min_version:
+    if min_version is not None and v < min_version:
         if onerror == 'error':
             raise VersionConstrained()
         return False
@@ -182,6 +209,8 @@ def get_best(f,
                     for version information and returns e.g. (7, 2) for
                     .../vim72 directories, which is fine e.g. for vim and
                     python installations on Windows systems.
+                    To ask the programs themselves, use a VersionProber
+                    (e.g. python_version); all hits are probed at once then.
 
     version_below -- a version to stay below; e.g. to avoid python 3
                      interpreters, specify (3, 0)
@@ -199,7 +228,12 @@ def get_best(f,
     found = []
     unversioned = []
     mismatch = 0
-    for item in f(**kwargs):
+    items = f(**kwargs)
+    probe_many = getattr(version_func, 'probe_many', None)
+    if probe_many is not None:
+        items = list(items)
+        version_func = probe_many(items).get
+    for item in items:
         ver = version_func(item)
         if ver is None:
             unversioned.append(item)
@@ -224,6 +258,176 @@ def get_best(f,
     else:
         raise ProgramNotFound(progname)
 
+## ----------------------------------------[ version probing ... [
+
+_VERSION_CACHE = None
+def version_cache():
+    """
+    return the persistent cache for probed versions (see VersionProber)
+    """
+    global _VERSION_CACHE
+    if _VERSION_CACHE is None:
+        _VERSION_CACHE = PersistentCache('versions-py%d.pickle'
+                                         % version_info[0])
+    return _VERSION_CACHE
+
+def _probe_output(cmd, timeout=None):
+    """
+    execute the given command and return a tuple (output, timed_out);
+    the output (stdout and stderr) is None if the command couldn't be
+    executed, or if it was killed after <timeout> seconds.
+
+    Where possible, the command gets a process group of its own, which is
+    killed as a whole; otherwise a wrapper script which is killed might leave
+    children which keep the output pipe open.
+    """
+    try:
+        proc = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=STDOUT,
+                     preexec_fn=setsid)
+    except OSError:
+        return (None, False)
+    expired = []
+    def kill():
+        expired.append(1)
+        try:
+            if killpg is not None:
+                killpg(proc.pid, SIGKILL)
+            else:
+                proc.kill()
+        except OSError:     # terminated meanwhile
+            pass
+    timer = None
+    if timeout:
+        timer = Timer(timeout, kill)
+        timer.start()
+    try:
+        output = proc.communicate()[0]
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if expired:
+        return (None, True)
+    return (output, False)
+
+class VersionProber(object):
+    """
+    A version_func for get_best which asks the programs themselves:
+    each candidate is executed with the given arguments, and the first match
+    of the pattern in the output is converted to a version tuple.
+
+    The results are stored in a persistent cache (see version_cache),
+    keyed by the real path, size and modification time of the program;
+    thus, each program is executed only once (unless it is replaced).
+    Probes which time out are not cached.
+
+    >>> VersionProber().parse('GNU sed 4.8')
+    (4, 8)
+    >>> VersionProber().parse(b'Python 2.7.18')
+    (2, 7, 18)
+    >>> VersionProber().parse('no version here') is None
+    True
+    """
+    def __init__(self, args=('--version',),
+                 pattern=r'(\d+)\.(\d+)(?:\.(\d+))?',
+                 timeout=5,
+                 guess=None,
+                 workers=4,
+                 cache=True):
+        """
+        args -- the arguments to give to the program, e.g. ['--version'],
+                or ['-c', 'some code']
+        pattern -- a regular expression; the numeric groups which took part
+                   in the match form the version tuple
+        timeout -- seconds to wait for each probe (None: wait forever)
+        guess -- a cheap function (e.g. vdir_digits) to try first; the
+                 program is executed only if it returns None
+        workers -- number of concurrent probes for probe_many
+        cache -- True (default), False, or a PersistentCache object
+        """
+        self.args = tuple(args)
+        self.pattern = pattern
+        self._rex = re.compile(pattern)
+        self.timeout = timeout
+        self.guess = guess
+        self.workers = workers
+        if cache is True:
+            cache = version_cache()
+        elif cache is False:
+            cache = None
+        self.cache = cache
+
+    def parse(self, output):
+        """
+        extract the version tuple from the given program output (or None)
+        """
+        if not isinstance(output, str):
+            output = output.decode('ascii', 'replace')
+        mo = self._rex.search(output)
+        if mo is None:
+            return None
+        return tuple([int(g)
+                      for g in mo.groups()
+                      if g is not None])
+
+    def _key(self, fn):
+        """
+        return the cache key for the given program, or None
+        """
+        rp = realpath(fn)
+        try:
+            st = stat(rp)
+        except OSError:
+            return None
+        return (rp, st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime),
+                self.args, self.pattern)
+
+    def __call__(self, fn):
+        """
+        return the version tuple of the given program, or None
+        """
+        if self.guess is not None:
+            ver = self.guess(fn)
+            if ver is not None:
+                return ver
+        key = self._key(fn)
+        if key is None:
+            return None
+        if self.cache is not None:
+            try:
+                return self.cache[key]
+            except KeyError:
+                pass
+        output, timed_out = _probe_output([fn] + list(self.args),
+                                          self.timeout)
+        if timed_out:
+            return None
+        ver = output is not None and self.parse(output) or None
+        if self.cache is not None:
+            self.cache[key] = ver
+        return ver
+
+    def probe_many(self, fns):
+        """
+        return a dictionary which maps each of the given programs to its
+        version tuple (or None); the uncached probes are run concurrently
+        """
+        fns = list(fns)
+        if ThreadPoolExecutor is None or self.workers <= 1 or len(fns) < 2:
+            return dict([(fn, self(fn)) for fn in fns])
+        executor = ThreadPoolExecutor(max_workers=min(self.workers,
+                                                      len(fns)))
+        try:
+            return dict(zip(fns, executor.map(self, fns)))
+        finally:
+            executor.shutdown(wait=True)
+
+# for get_best(find_python, version_func=python_version);
+# the directory name is tried first (good for Windows(tm) installations):
+python_version = VersionProber(args=('-V',),
+                               guess=vdir_digits)
+
+## ----------------------------------------] ... version probing ]
+
 ## -------------------------------------------------------[ data ... [
 
 WINDOWS_ROOTS = ['%(windir)s',
@@ -575,7 +779,8 @@ class ToolsHub(dict):
 
     Allows to seek tools only when needed, and seek them only once.
     """
-    def __init__(self, fallback=find_PosixTool, **kwargs):
+    def __init__(self, fallback=find_PosixTool, workers=None, trace=None,
+                 **kwargs):
         """
         Initialization:
 
@@ -590,6 +795,19 @@ class ToolsHub(dict):
 
         The ToolsHub will look for a find_sed function and fallback to
         find_PosixTool by default.
+
+        workers -- if given (a number > 0), all tools given as keyword
+                   arguments are sought in the background right away,
+                   using that many threads (see the prefetch method)
+
+        trace -- True, or an anyos.ProbeStats object: collect per-directory
+                 statistics of the searches (number of probes and hits,
+                 time), available as the stats attribute, e.g.:
+
+                   hub = ToolsHub(trace=True)
+                   hub['tar']
+                   for d, probes, hits, seconds in hub.stats.slowest():
+                       ...
         """
         def interesting_name(s):
             return (s.startswith('__') and
@@ -598,6 +816,12 @@ class ToolsHub(dict):
 
         hintsmap = {}
         self.fallback = fallback
+        if trace is None or trace is False:
+            self.stats = None
+        elif isinstance(trace, ProbeStats):
+            self.stats = trace
+        else:
+            self.stats = ProbeStats()
 
         # old version:
         for k, v in kwargs.items():
@@ -613,6 +837,7 @@ class ToolsHub(dict):
                             'accepted (%r)' % (v,)
                 try:
                     func = v.pop(0)
+                    adic = {}
                 except IndexError:
                     func, adic = self.smartie(k)
                 if v:
@@ -625,6 +850,10 @@ class ToolsHub(dict):
             hintsmap[k] = (func, adic)
         self.hintsmap = hintsmap
         self.sequences = {}
+        self._pending = {}
+        self._lock = Lock()
+        if workers:
+            self.prefetch(workers=workers)
         return
         # new version:
         self.hintsmap = hintsmap
@@ -637,24 +866,103 @@ class ToolsHub(dict):
         return self.__iter__.__dict__()
 
     def __getitem__(self, key):
+        event = self._pending.get(key)
+        if event is not None:   # sought in the background
+            event.wait()
         if key not in self.__dict__:
-            try:
-                f, kwargs = self.hintsmap[key]
-            except KeyError:
-                f, kwargs = self.smartie(key)
-            seq = f(**kwargs)
-            if seq:
-                self.sequences[key] = seq.__iter__()
-                val = seq.next()
-                self.__dict__.__setitem__(key, val)
-                return val
-            else:
-                self.__dict__.__setitem__(key, None)
+            return self._resolve(key)
         try:
             return self.__dict__.__getitem__(key)
         except KeyError:
             return None
 
+    def _resolve(self, key, listings=None):
+        """
+        seek the given tool and store the first hit (or None)
+
+        listings -- a dictionary of directory listings, shared by several
+                    tools (see anyos.find_progs)
+        """
+        try:
+            f, kwargs = self.hintsmap[key]
+        except KeyError:
+            f, kwargs = self.smartie(key)
+        seq = None
+        extra = {}
+        if listings is not None:
+            extra['listings'] = listings
+        if self.stats is not None:
+            extra['trace'] = self.stats
+        if extra:
+            try:
+                seq = f(**dict(kwargs, **extra))
+            except TypeError:   # a finder without **kwargs
+                pass
+        if seq is None:
+            seq = f(**kwargs)
+        seq = seq.__iter__()
+        self.sequences[key] = seq
+        val = None
+        for val in seq:
+            break
+        self.__dict__.__setitem__(key, val)
+        return val
+
+    def prefetch(self, *names, **kwargs):
+        """
+        Seek the given tools (by default: all tools given to the
+        constructor) at once, unless already done.
+
+        Each tool is still sought by its own find_... function (or the
+        fallback), but all of them share the directory listings; thus, every
+        directory in the PATH is read only once, instead of once per tool.
+
+        workers -- (keyword argument) if given, the tools are sought
+                   concurrently, using (at most) that many threads; the
+                   method returns immediately, and a later hub[name] access
+                   waits for that very tool only.
+        """
+        workers = kwargs.pop('workers', None)
+        if kwargs:
+            raise TypeError('unsupported keyword arguments: %s'
+                            % ', '.join(kwargs.keys()))
+        if not names:
+            names = sorted(self.hintsmap.keys())
+        listings = {}
+        if not workers:
+            for key in names:
+                if key not in self.__dict__:
+                    self._resolve(key, listings)
+            return
+        todo = []
+        self._lock.acquire()
+        try:
+            for key in names:
+                if key in self.__dict__ or key in self._pending:
+                    continue
+                self._pending[key] = Event()
+                todo.append(key)
+        finally:
+            self._lock.release()
+        if not todo:
+            return
+        _start_workers(partial(self._resolve_pending, listings=listings),
+                       todo, workers)
+
+    def _resolve_pending(self, key, listings):
+        """
+        worker for concurrent prefetching: resolve the tool and release
+        the waiting accessors.  Errors are not stored; the next access will
+        try again (and raise the exception in the accessing thread).
+        """
+        try:
+            try:
+                self._resolve(key, listings)
+            except Exception:
+                pass
+        finally:
+            self._pending[key].set()
+
     def smartie(self, progname):
         # TODO: find better name ...
         """
@@ -675,6 +983,30 @@ class ToolsHub(dict):
     def __str__(self):
         return str(self.__dict__)
 
+def _start_workers(func, items, workers):
+    """
+    call func(item) for each of the given items, in (at most) <workers>
+    daemon threads which take the items from a queue; return the list of
+    threads (without waiting for them)
+    """
+    queue = Queue(len(items))
+    for item in items:
+        queue.put(item)
+    def work():
+        while 1:
+            try:
+                item = queue.get_nowait()
+            except Empty:
+                return
+            func(item)
+    threads = []
+    for i in range(min(workers, len(items))):
+        thread = Thread(target=work)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    return threads
+
 ## ---------------------------------------------] ... ToolsHub class ]
 
 ## ---------------------------------------[ directory generators ... [
@@ -18,7 +18,7 @@ VERSION = (0,
            )
 __version__ = '.'.join(map(str, VERSION))
 # für Module:
-__all__ = ['sleep', 'slept',
+__all__ = ['sleep', 'slept', 'sleep_until',
            'ask',
            'one_of',
            # filename generators:
@@ -37,6 +37,8 @@ __all__ = ['sleep', 'slept',
            'OptionCheckError',
            'OptionConflictError',
            'OptionMissingError',
+           # configuration files:
+           'OptionCascade',
            # e.g. for svn-style commandline interfaces:
            'CommandError',
            'CommandUnknownError',
@@ -277,49 +279,106 @@ def one_of(seq, accept_allfalse=False, use_exceptions=True):
     else:
         raise NotImplementedError
 
+try:
+    from time import monotonic as _monotonic
+except ImportError:     # Python < 3.3
+    _monotonic = time
+
+def sleep_until(deadline, step=1, render=None, device=None, event=None,
+                phase=None):
+    """
+    the sleeping engine of -> sleep and termwot.Sleeper:
+    sleep until the given deadline (a time.monotonic value), optionally
+    playing an animation; return the monotonic time of wakeup.
+
+    step -- the frame budget [seconds, float]: frames are due at
+            <phase> + n * <step>; if a frame is late (e.g. because the
+            process was suspended), the frames missed are skipped rather
+            than drawn in a hurry
+    render -- a function which is given the current monotonic time and
+              returns the text of the frame (or None); it is written to the
+              device in one go.  Without a render function, there is
+              nothing to do until the deadline, thus the process sleeps in
+              one go.
+    event -- a threading.Event which ends the sleep early when set
+    phase -- the time of the first frame (default: now)
+    """
+    from math import floor
+    now = _monotonic()
+    if phase is None:
+        phase = now
+    due = phase
+    if render is not None and device is None:
+        from sys import stdout
+        device = stdout
+    while now < deadline:
+        if render is None:
+            wake = deadline
+        else:
+            if now >= due:
+                text = render(now)
+                if text:
+                    device.write(text)
+                    device.flush()
+                now = _monotonic()
+                due = phase + (floor((now - phase) / step) + 1) * step
+            wake = min(due, deadline)
+        if event is None:
+            _sleep(wake - now)
+        else:
+            event.wait(wake - now)
+            if event.is_set():
+                return _monotonic()
+        now = _monotonic()
+    return now
+
 _SLEPT = 0
-def sleep(secs, compact=True, step=1):
+def sleep(secs, compact=True, step=1, event=None, animate=True):
     """
     sleep the given amount of seconds, counting up visibly on the console.
 
-    secs -- number of seconds [int]
+    secs -- number of seconds [int or float]
     compact -- compact output (don't let the sleep information occupy
                the screen line permanently) [bool:True]
     step -- amount of seconds to sleep between screen output actions
-            ([int:1])
+            ([int:1]; fractions are allowed as well)
+    event -- a threading.Event which ends the sleep early when set
+    animate -- if false, sleep without any screen output
+
+    Return the amount of seconds actually slept.
     """
     # TODO: argument [function] for erasing to eol (Esc[K or similar)
     # TODO: argument [function] for output, avoiding stdout when possible
-    # TODO: time.sleep supports float arguments as well
     global _SLEPT
-    assert isinstance(step, int)
-    assert isinstance(secs, int)
-    assert step >= 1
+    assert step > 0
     if secs <= 0:
-        return
-    stop = int(secs)
-    SLEEPSTART = time()
-    slept = 0
-    msg = _('sleeping %%s/%s seconds ...\r') % stop
-    if compact:
-        eraser = ' ' * len(msg)+'\r'
+        return 0
+    from sys import stdout
+    if isinstance(secs, int) and isinstance(step, int):
+        numfmt = '%d'
+    else:
+        numfmt = '%.1f'
+    msg = _('sleeping %%s/%s seconds ...\r') % (numfmt % secs)
+    start = _monotonic()
+    wakeup = None
+    if animate:
+        def render(now):
+            return msg % (numfmt % min(now - start + step, secs))
+    else:
+        render = None
     try:
-        try:
-            while slept < stop:
-                minitim = max(int(min(step, stop-slept)), 1)
-                disp = int(slept+minitim)
-                print msg % disp,
-                _sleep(minitim)
-                slept = time() - SLEEPSTART
-        except KeyboardInterrupt:
-            slept = time() - SLEEPSTART
-            raise
+        wakeup = sleep_until(start + secs, step, render, stdout, event)
     finally:
-        if compact:
-            print eraser,
-        else:
-            print
+        if wakeup is None:      # KeyboardInterrupt
+            wakeup = _monotonic()
+        slept = wakeup - start
+        if animate:
+            if compact:
+                stdout.write(' ' * len(msg % (numfmt % secs)) + '\r')
+            else:
+                stdout.write('\n')
         _SLEPT += slept
+    return slept
 
 def slept():
     """
@@ -474,6 +533,156 @@ def ask(txt, choices=None, default=None, onbreak=None, onescape=None,
 ) = range(2, 8)
 DEFAULT_UNIQUESPECS = True
 DEFAULT_NOSPECS = RAISE_EXCEPTION   # might change ...
+DEFAULT_RECORDS = False             # yield FileRecord objects?
+DEFAULT_ARGFILES = False            # expand @listfile arguments?
+DEFAULT_UNIQUE_WINDOW = 100000      # streamed specs remembered for unique
+
+class FileRecord(object):
+    """
+    A file (or directory) name, as generated by FilenameGenerator and
+    GlobFileGenerator with records=True.
+
+    If found by reading a directory, the record carries the os.scandir
+    entry, which knows the file type (on most systems) without a further
+    system call; the stat information is read on demand and cached:
+
+    >>> rec = FileRecord('.')
+    >>> rec.path
+    '.'
+    >>> rec.is_dir()
+    True
+    >>> rec.stat() is rec.stat()
+    True
+
+    For functions which need a string, use the path attribute (or str();
+    with Python 3.6+, the record can be given to open() etc. directly).
+    """
+    __slots__ = ('path', '_entry', '_stat')
+
+    def __init__(self, path, entry=None):
+        self.path = path
+        self._entry = entry
+        self._stat = None
+
+    def stat(self):
+        """
+        return the (cached) os.stat result, following symbolic links
+        """
+        if self._stat is None:
+            if self._entry is not None:
+                self._stat = self._entry.stat()
+            else:
+                from os import stat
+                self._stat = stat(self.path)
+        return self._stat
+
+    def is_dir(self):
+        if self._entry is not None:
+            try:
+                return self._entry.is_dir()
+            except OSError:
+                return False
+        return self._check_mode('S_ISDIR')
+
+    def is_file(self):
+        if self._entry is not None:
+            try:
+                return self._entry.is_file()
+            except OSError:
+                return False
+        return self._check_mode('S_ISREG')
+
+    def is_symlink(self):
+        if self._entry is not None:
+            return self._entry.is_symlink()
+        from os.path import islink
+        return islink(self.path)
+
+    def _check_mode(self, funcname):
+        import stat
+        try:
+            return getattr(stat, funcname)(self.stat().st_mode)
+        except OSError:
+            return False
+
+    def size(self):
+        return self.stat().st_size
+    size = property(size, doc='the size in bytes')
+
+    def mtime(self):
+        return self.stat().st_mtime
+    mtime = property(mtime, doc='the modification time (seconds)')
+
+    def inode(self):
+        if self._entry is not None:
+            return self._entry.inode()
+        return self.stat().st_ino
+    inode = property(inode, doc='the inode number')
+
+    def name(self):
+        from os.path import basename
+        return basename(self.path)
+    name = property(name, doc='the last path component')
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+    def __eq__(self, other):
+        if isinstance(other, FileRecord):
+            return self.path == other.path
+        return self.path == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.path)
+
+def _spec_key(spec):
+    """
+    the normalized form of a file spec, to detect duplicates
+    """
+    from os.path import normcase, normpath
+    if not spec:
+        return spec
+    return normcase(normpath(spec))
+
+def _gen_listed(fo, null=None, bufsize=1<<16):
+    """
+    generate the non-empty items from the given file object, delimited by
+    NUL characters (null=True) or line breaks (null=False); if null is None,
+    the delimiter is chosen by looking at the first block read
+    """
+    if null is None:
+        delim = None
+    elif null:
+        delim = '\0'
+    else:
+        delim = '\n'
+    rest = ''
+    while 1:
+        chunk = fo.read(bufsize)
+        if not chunk:
+            break
+        if delim is None:
+            delim = '\0' in chunk and '\0' or '\n'
+        items = (rest + chunk).split(delim)
+        rest = items.pop()
+        for item in items:
+            if delim == '\n':
+                item = item.rstrip('\r')
+            if item:
+                yield item
+    if delim == '\n':
+        rest = rest.rstrip('\r')
+    if rest:
+        yield rest
 
 class FilenameGenerator(object):
     """
@@ -489,11 +698,52 @@ class FilenameGenerator(object):
                         (which is True by default)
 
         nospecs -- what to do if nothing was specified
+
+        records -- if true, FileRecord objects are generated instead of
+                   strings (default: DEFAULT_RECORDS)
+
+        argfiles -- if true, an argument '@name' is replaced by the specs
+                    listed in the file <name>, and '@-' by the specs read
+                    from standard input (default: DEFAULT_ARGFILES).
+                    The lists are read lazily; thus, any number of specs
+                    can be processed (e.g. the output of find), without
+                    hitting the limits of the command line.
+
+        unique_window -- the number of distinct streamed specs remembered
+                         to skip duplicates (default: DEFAULT_UNIQUE_WINDOW;
+                         None: no limit); the least recently seen are
+                         forgotten first, thus a duplicate which follows
+                         its original after more other specs might be
+                         generated again.  With the default, some 20 MB
+                         are used for typical path lengths.
+
+        null -- the delimiter of the specs in such lists:
+                True -- NUL characters (like find -print0, xargs -0)
+                False -- line breaks
+                None -- NUL characters, if the first block read
+                        contains any, line breaks otherwise (default)
+
+        Filters (implying that only existing files are generated; the file
+        information is read once, and the consumer can reuse it by
+        requesting records):
+
+        files_only -- generate regular files only (no directories etc.)
+        min_size, max_size -- size limits in bytes
+        newer_than -- a timestamp (seconds, like time.time()) or the name
+                      of a reference file; only files modified later are
+                      generated
         """
         try:
             unique = kwargs.pop('unique_specs')
         except KeyError:
             unique = DEFAULT_UNIQUESPECS
+        self.records = kwargs.pop('records', DEFAULT_RECORDS)
+        self.argfiles = kwargs.pop('argfiles', DEFAULT_ARGFILES)
+        self.null = kwargs.pop('null', None)
+        self.unique = unique
+        self.unique_window = kwargs.pop('unique_window',
+                                        DEFAULT_UNIQUE_WINDOW)
+        self.init_filters(kwargs)
         try:
             nospecs = kwargs.pop('nospecs')
         except KeyError:
@@ -509,15 +759,112 @@ class FilenameGenerator(object):
             raise UnsupportedKeywordArguments(kwargs)
 
     def __iter__(self):
+        if not (self.records or self._filters):
+            for a in self.gen_specs():
+                yield a
+            return
+        for a in self.gen_specs():
+            rec = FileRecord(a)
+            if self.accepted(rec):
+                if self.records:
+                    yield rec
+                else:
+                    yield a
+
+    def init_filters(self, kwargs):
+        """
+        take the filter options from the given dictionary
+        """
+        filters = []
+        if kwargs.pop('files_only', False):
+            filters.append(FileRecord.is_file)
+        min_size = kwargs.pop('min_size', None)
+        if min_size is not None:
+            filters.append(lambda rec: rec.size >= min_size)
+        max_size = kwargs.pop('max_size', None)
+        if max_size is not None:
+            filters.append(lambda rec: rec.size <= max_size)
+        newer_than = kwargs.pop('newer_than', None)
+        if newer_than is not None:
+            if not isinstance(newer_than, (int, float)):  # a filename
+                from os import stat
+                newer_than = stat(newer_than).st_mtime
+            filters.append(lambda rec: rec.mtime > newer_than)
+        self._filters = filters
+
+    def accepted(self, rec):
+        """
+        apply the filters to the given FileRecord
+        """
+        try:
+            for f in self._filters:
+                if not f(rec):
+                    return 0
+        except OSError:     # e.g. not found
+            return 0
+        return 1
+
+    def gen_specs(self):
+        """
+        generate the specs, expanding @listfile arguments (if enabled),
+        and without duplicates (if enabled)
+        """
+        if self.argfiles:
+            specs = self._gen_expanded_specs()
+        else:
+            specs = self.specs
+        if self.unique and self.argfiles:
+            return self.unique_gen(specs, self.unique_window)
+        return iter(specs)
+
+    def _gen_expanded_specs(self):
+        import sys
         for a in self.specs:
-            yield a
+            if not a.startswith('@') or a == '@':
+                yield a
+            elif a == '@-':
+                for spec in _gen_listed(sys.stdin, self.null):
+                    yield spec
+            else:
+                fo = open(a[1:], 'r')
+                try:
+                    for spec in _gen_listed(fo, self.null):
+                        yield spec
+                finally:
+                    fo.close()
 
     def unique_list(self, seq):
-        res = []
+        return list(self.unique_gen(seq))
+
+    def unique_gen(self, seq, window=None):
+        """
+        generate the items of the given sequence, skipping duplicates;
+        the check uses the normalized names (see _spec_key).
+
+        window -- the number of distinct names to remember (None: all of
+                  them); the least recently seen names are forgotten first
+        """
+        if not window:
+            seen = set()
+            for item in seq:
+                key = _spec_key(item)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield item
+            return
+        from collections import OrderedDict
+        seen = OrderedDict()
         for item in seq:
-            if item not in res:
-                res.append(item)
-        return res
+            key = _spec_key(item)
+            if key in seen:
+                del seen[key]       # recently seen again
+                seen[key] = 1
+                continue
+            seen[key] = 1
+            if len(seen) > window:
+                seen.popitem(last=False)
+            yield item
 
     def nospecs_acceptable(self):
         """
@@ -529,6 +876,590 @@ class FilenameGenerator(object):
 
 DEFAULT_IGNORE = ['*~']
 DEFAULT_NOTFOUND = YIELD_PATTERNS
+DEFAULT_RECURSIVE = False       # '**' matches any number of directories?
+DEFAULT_FOLLOW_SYMLINKS = False # ... when walking trees for '**'
+DEFAULT_WORKERS = 4             # threads to read the directories of a tree
+DEFAULT_ORDER = None            # None (as found), 'disk' or 'extent'
+DEFAULT_ORDER_WINDOW = 1000     # number of files sorted at a time
+DEFAULT_WATCH_INTERVAL = 5.0    # seconds between the rounds of watch()
+DEFAULT_SETTLE_TIME = 2.0       # seconds a file must be unchanged
+
+_GROUPS_PER_REGEX = 90  # Python 2 supports 100 groups per expression
+_SPECS_PER_BATCH = 1000 # streamed specs are globbed in batches
+
+def _translated(pat):
+    """
+    return the regular expression for the given shell-style pattern,
+    without the end anchor added by fnmatch.translate
+    (which changed between Python versions)
+    """
+    from fnmatch import translate
+    from os.path import normcase
+    rx = translate(normcase(pat))
+    if rx.startswith('(?s:') and rx.endswith(')\\Z'):
+        return rx[4:-3]                 # Python 3.6+
+    for tail in ('\\Z(?ms)', '\\Z', '$'):
+        if rx.endswith(tail):
+            return rx[:-len(tail)]
+    return rx
+
+def _compiled_any(patterns):
+    """
+    compile the given shell-style patterns into one regular expression
+    which matches if any of them matches (see fnmatch.fnmatch)
+    """
+    import re
+    return re.compile('(?s)(?:%s)\\Z'
+                      % '|'.join([_translated(pat) for pat in patterns]))
+
+def _compiled_each(patterns):
+    """
+    compile the given shell-style patterns into regular expressions with
+    one named (lookahead) group per pattern (p0, p1, ...), which captures
+    if the pattern matches; thus, a single match call checks many patterns.
+    The groups are named since the translated patterns may contain groups
+    of their own (fnmatch.translate of Python 3.9 and 3.10 does).
+    Returns a list of (offset, compiled, group names) tuples (for more
+    than _GROUPS_PER_REGEX patterns, there are several expressions)
+    """
+    import re
+    res = []
+    for offset in range(0, len(patterns), _GROUPS_PER_REGEX):
+        chunk = patterns[offset:offset+_GROUPS_PER_REGEX]
+        groups = ['p%d' % i for i in range(len(chunk))]
+        res.append((offset,
+                    re.compile('(?s)'+''.join(['(?:(?=(?P<%s>%s\\Z)))?'
+                                               % (grp, _translated(pat))
+                                               for grp, pat
+                                               in zip(groups, chunk)])),
+                    groups))
+    return res
+
+def _list_names(d, listings=None):
+    """
+    read the given directory once and return a tuple (names, entries):
+    the list of names (like glob does: an empty list if it can't be read),
+    and a dictionary which maps the names to the os.scandir entries (empty
+    if os.scandir is not available)
+
+    listings -- a _ListingCache (for the watch mode)
+    """
+    if listings is not None:
+        return listings.get_listing(d, _list_names)
+    from os import curdir, error, listdir
+    try:
+        if _scandir is not None:
+            entries = {}
+            names = []
+            for entry in _scandir(d or curdir):
+                names.append(entry.name)
+                entries[entry.name] = entry
+            return names, entries
+        return listdir(d or curdir), {}
+    except error:
+        return [], {}
+
+try:
+    from os import scandir as _scandir
+except ImportError:
+    try:
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+def _gen_globbed(patterns, recursive=False, follow_symlinks=False,
+                 workers=None, records=False, listings=None):
+    """
+    generate a (pattern, matches) tuple for each of the given glob
+    patterns, in the given order; the matches are the same glob.glob
+    would return, but every directory is read only once, and all patterns
+    for that directory are matched at once.
+
+    recursive -- if true, a '**' path component matches any number of
+                 directories; the matches of such patterns are generated
+                 while the tree is walked (see _gen_recursive)
+
+    records -- if true, the matches are FileRecord objects, which carry
+               the information from the directory listing
+
+    listings -- a _ListingCache, to reuse the listings of directories
+                which didn't change (for the watch mode)
+    """
+    from glob import glob, has_magic
+    from os.path import split, join, normcase, lexists, isdir
+    # plan: where to look for each pattern
+    expanded = {}       # pattern for directories -> directories
+    units = []          # per pattern: list of (dir, basename, index) or None
+    bydir = {}          # directory -> list of (basename, index)
+    index = 0
+    for pat in patterns:
+        if not has_magic(pat):
+            units.append(None)
+            continue
+        if recursive and '**' in _path_parts(pat):
+            units.append('**')
+            continue
+        dirname, basename = split(pat)
+        if has_magic(dirname):
+            try:
+                dirs = expanded[dirname]
+            except KeyError:
+                dirs = expanded[dirname] = glob(dirname)
+        else:
+            dirs = [dirname]
+        these = []
+        for d in dirs:
+            if has_magic(basename):
+                bydir.setdefault(d, []).append((basename, index))
+            these.append((d, basename, index))
+            index += 1
+        units.append(these)
+
+    matched = {}        # index -> list of matches
+    direntries = {}     # directory -> [{name: entry}, patterns] (for records)
+    def match_dir(d):
+        todo = bydir.pop(d)
+        names, entries = _list_names(d, listings)
+        if records:
+            direntries[d] = [entries, len(todo)]
+        found = [[] for tup in todo]
+        basenames = [tup[0] for tup in todo]
+        hidden = [tup[0].startswith('.') for tup in todo]
+        for offset, rx, groups in _compiled_each(basenames):
+            for name in names:
+                mo = rx.match(normcase(name))
+                if mo is None:
+                    continue
+                ishidden = name.startswith('.')
+                i = offset
+                for grp in groups:
+                    if mo.group(grp) is not None \
+                       and (hidden[i] or not ishidden):
+                        found[i].append(name)
+                    i += 1
+        for (basename, idx), names in zip(todo, found):
+            matched[idx] = names
+
+    if records:
+        def make(path, d=None, name=None):
+            if d is None:
+                return FileRecord(path)
+            return FileRecord(path, direntries[d][0].get(name))
+    else:
+        def make(path, d=None, name=None):
+            return path
+
+    for pat, these in zip(patterns, units):
+        if these == '**':
+            yield pat, _gen_recursive(pat, follow_symlinks, workers,
+                                      records, listings)
+            continue
+        if these is None:   # no magic
+            if lexists(pat):
+                yield pat, [make(pat)]
+            else:
+                yield pat, []
+            continue
+        res = []
+        for d, basename, idx in these:
+            if not has_magic(basename):
+                if basename:
+                    if lexists(join(d, basename)):
+                        res.append(make(join(d, basename)))
+                elif isdir(d):
+                    res.append(make(join(d, basename)))
+                continue
+            if idx not in matched:
+                match_dir(d)
+            res.extend([make(join(d, name), d, name)
+                        for name in matched.pop(idx)])
+            if records:
+                direntries[d][1] -= 1
+                if not direntries[d][1]:    # no more patterns for d
+                    del direntries[d]
+        yield pat, res
+
+def _path_parts(pat):
+    """
+    split the given pattern into path components
+    (on all separators, e.g. '/' and '\\' on Windows systems)
+    """
+    from os import sep, altsep
+    if altsep:
+        pat = pat.replace(altsep, sep)
+    return pat.split(sep)
+
+def _gen_recursive(pat, follow_symlinks=False, workers=None, records=False,
+                   listings=None):
+    """
+    generate the matches of a pattern which contains a '**' component,
+    like glob.glob(pat, recursive=True) (Python 3.5+) would return them:
+    the directories below the part before '**' are walked (see _gen_walk),
+    hidden directories excluded, and the rest of the pattern is matched in
+    each of them.  The matches are generated while the tree is walked.
+
+    Unlike glob.glob, a trailing '**' yields the entries of a directory
+    before those of its subdirectories.
+
+    records -- generate FileRecord objects instead of strings
+
+    listings -- a _ListingCache (see _gen_globbed)
+    """
+    from glob import glob, has_magic
+    from os import sep
+    from os.path import join, isdir, normcase
+    parts = _path_parts(pat)
+    pos = parts.index('**')
+    head = sep.join(parts[:pos])
+    if pos == 1 and not parts[0]:   # absolute path, e.g. '/**'
+        head = sep
+    tail = parts[pos+1:]
+    if not head:
+        bases = ['']
+    elif has_magic(head):
+        bases = [d for d in glob(head) if isdir(d)]
+    elif isdir(head):
+        bases = [head]
+    else:
+        bases = []
+    if len(tail) == 1 and tail[0] != '**':
+        rx = has_magic(tail[0]) and _compiled_any([tail[0]]) or None
+        hidden = tail[0].startswith('.')
+        literal = normcase(tail[0])
+    else:
+        rx = None
+    if records:
+        def make(dirpath, name, entries):
+            return FileRecord(join(dirpath, name), entries.get(name))
+    else:
+        def make(dirpath, name, entries):
+            return join(dirpath, name)
+    for base in bases:
+        for dirpath, dirnames, names, entries in _gen_walk(base,
+                                                           follow_symlinks,
+                                                           workers,
+                                                           listings=listings):
+            # '**' doesn't match hidden directories:
+            dirnames[:] = [name for name in dirnames
+                           if not name.startswith('.')]
+            if not tail:            # 'data/**'
+                if dirpath == base and base:
+                    yield make(dirpath, '', {})
+                for name in names:
+                    if not name.startswith('.'):
+                        yield make(dirpath, name, entries)
+            elif tail == ['']:      # 'data/**/'
+                if dirpath:
+                    yield make(dirpath, '', {})
+            elif rx is not None:    # 'data/**/*.bin'
+                for name in names:
+                    if (hidden or not name.startswith('.')) \
+                       and rx.match(normcase(name)):
+                        yield make(dirpath, name, entries)
+            elif len(tail) == 1:    # 'data/**/name'
+                for name in names:
+                    if normcase(name) == literal:
+                        yield make(dirpath, name, entries)
+            else:                   # 'data/**/sub/*.bin'
+                for subpat, hits in _gen_globbed([join(dirpath, *tail)],
+                                                 True, follow_symlinks,
+                                                 workers, records, listings):
+                    for fn in hits:
+                        yield fn
+
+def _list_dir(d, follow_symlinks=False, listings=None):
+    """
+    read the given directory and return a tuple (names, dirs, entries):
+    names -- all names, in directory order
+    dirs -- a list of (name, ident) tuples for the subdirectories, where
+            ident is a (st_dev, st_ino) tuple if follow_symlinks is true
+            (symbolic links to directories are included then)
+    entries -- a dictionary which maps the names to the os.scandir entries
+               (empty if os.scandir is not available)
+
+    listings -- a _ListingCache (see _gen_globbed)
+    """
+    if listings is not None:
+        return listings.get_listing(d, _list_dir, follow_symlinks)
+    from os import curdir, error, listdir, stat
+    from os.path import join, isdir, islink
+    names = []
+    dirs = []
+    entries = {}
+    try:
+        if _scandir is not None:
+            for entry in _scandir(d or curdir):
+                names.append(entry.name)
+                entries[entry.name] = entry
+                try:
+                    if not entry.is_dir(follow_symlinks=follow_symlinks):
+                        continue
+                    ident = None
+                    if follow_symlinks:
+                        st = entry.stat()
+                        ident = (st.st_dev, st.st_ino)
+                except error:
+                    continue
+                dirs.append((entry.name, ident))
+            return names, dirs, entries
+        names = listdir(d or curdir)
+    except error:
+        return [], [], {}
+    for name in names:
+        path = join(d, name)
+        try:
+            if not isdir(path):
+                continue
+            ident = None
+            if follow_symlinks:
+                st = stat(path)
+                ident = (st.st_dev, st.st_ino)
+            elif islink(path):
+                continue
+        except error:
+            continue
+        dirs.append((name, ident))
+    return names, dirs, entries
+
+def _gen_walk(top, follow_symlinks=False, workers=None, maxpending=None,
+              listings=None):
+    """
+    walk the directory tree below <top>, top-down and in directory order
+    (like os.walk), and generate (dirpath, dirnames, names, entries)
+    tuples; names contains all entries (the subdirectories as well),
+    entries maps them to the os.scandir entries (see _list_dir), and the
+    consumer may prune the dirnames list in place.
+
+    While the consumer processes a directory, the next ones are read in
+    advance by a thread pool (workers, default: DEFAULT_WORKERS), but at
+    most <maxpending> at a time (default: 4 per worker).  Without the
+    concurrent.futures module, the directories are read sequentially.
+
+    follow_symlinks -- follow symbolic links to directories; directories
+                       which have been visited already are skipped, which
+                       prevents endless loops
+
+    listings -- a _ListingCache (see _gen_globbed)
+    """
+    from os import error, stat
+    from os.path import join
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    if maxpending is None:
+        maxpending = 4 * workers
+    pool = None
+    if workers > 1 and _ThreadPoolExecutor is not None:
+        pool = _ThreadPoolExecutor(max_workers=workers)
+    pending = {}    # path -> future
+    seen = set()
+    if follow_symlinks:
+        try:
+            st = stat(top or '.')
+            seen.add((st.st_dev, st.st_ino))
+        except error:
+            return
+    stack = [top]
+    try:
+        while stack:
+            path = stack.pop()
+            fut = pending.pop(path, None)
+            if fut is not None:
+                names, dirs, entries = fut.result()
+            else:
+                names, dirs, entries = _list_dir(path, follow_symlinks,
+                                                 listings)
+            dirnames = []
+            for name, ident in dirs:
+                if ident is not None:
+                    if ident in seen:
+                        continue
+                    seen.add(ident)
+                dirnames.append(name)
+            yield path, dirnames, names, entries
+            for name in reversed(dirnames):
+                stack.append(join(path, name))
+            if pool is not None:
+                for sub in reversed(stack[-maxpending:]):
+                    if len(pending) >= maxpending:
+                        break
+                    if sub not in pending:
+                        pending[sub] = pool.submit(_list_dir, sub,
+                                                   follow_symlinks, listings)
+    finally:
+        if pool is not None:
+            for fut in pending.values():
+                fut.cancel()
+            pool.shutdown(wait=False)
+
+try:
+    from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+except ImportError:
+    _ThreadPoolExecutor = None
+
+def _inode_key(item):
+    """
+    sort key for the 'disk' order: (0, st_dev, st_ino) for existing
+    files, (1,) otherwise (e.g. for patterns which yielded nothing)
+    """
+    try:
+        if isinstance(item, FileRecord):
+            st = item.stat()
+        else:
+            from os import stat
+            st = stat(item)
+    except OSError:
+        return (1,)
+    return (0, st.st_dev, st.st_ino)
+
+def _extent_key(item):
+    """
+    sort key for the 'extent' order: (0, st_dev, physical offset) where
+    the position of the first extent can be determined (Linux), and the
+    _inode_key value otherwise
+    """
+    key = _inode_key(item)
+    if key[0]:
+        return key
+    offset = _first_extent(getattr(item, 'path', item))
+    if offset is None:
+        return (0, key[1], -1, key[2])
+    return (0, key[1], offset)
+
+_FS_IOC_FIEMAP = 0xC020660B
+def _first_extent(path):
+    """
+    return the physical position of the first extent of the given file
+    (using the FIEMAP ioctl of Linux), or None
+    """
+    try:
+        from fcntl import ioctl
+    except ImportError:
+        return None
+    from os import open as os_open, close, O_RDONLY
+    from struct import pack, unpack_from
+    try:
+        fd = os_open(path, O_RDONLY)
+    except OSError:
+        return None
+    try:
+        try:
+            # struct fiemap, with room for one struct fiemap_extent:
+            res = ioctl(fd, _FS_IOC_FIEMAP,
+                        pack('=QQLLLL', 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+                        + b'\0' * 56)
+        except (IOError, OSError):
+            return None
+        if not unpack_from('=L', res, 20)[0]:   # fm_mapped_extents
+            return None
+        return unpack_from('=Q', res, 40)[0]    # fe_physical
+    finally:
+        close(fd)
+
+def _mtime_ns(st):
+    """
+    the modification time of the given stat result, in nanoseconds
+    """
+    try:
+        return st.st_mtime_ns
+    except AttributeError:      # Python < 3.3
+        return int(st.st_mtime * 1000000000)
+
+def _dir_key(d):
+    """
+    the normalized name of a directory, as used by the watch mode
+    """
+    from os import curdir
+    from os.path import normpath
+    return normpath(d or curdir)
+
+class _ListingCache(dict):
+    """
+    directory listings (see _list_names and _list_dir) which are reused as
+    long as the modification time of the directory doesn't change.
+    The reread attribute contains the (normalized) names of the directories
+    which have been read (again) since it was cleared last, the listed
+    attribute the names of all directories which have been read.
+    """
+    def __init__(self):
+        dict.__init__(self)
+        self.reread = set()
+        self.listed = set()
+        self._lock = _Lock()
+
+    def get_listing(self, d, func, *args):
+        from os import stat, curdir, error
+        try:
+            stamp = _mtime_ns(stat(d or curdir))
+        except error:
+            stamp = None
+        key = (d, args)
+        try:
+            oldstamp, res = self[key]
+            if stamp is not None and stamp == oldstamp:
+                return res
+        except KeyError:
+            pass
+        res = func(d, *args)
+        self._lock.acquire()
+        try:
+            self[key] = (stamp, res)
+            self.reread.add(_dir_key(d))
+            self.listed.add(_dir_key(d))
+        finally:
+            self._lock.release()
+        return res
+
+try:
+    from threading import Lock as _Lock
+except ImportError:
+    from dummy_threading import Lock as _Lock
+
+_ORDER_KEYS = {'disk': _inode_key,
+               'extent': _extent_key,
+               }
+
+def _is_placeholder(item):
+    """
+    tell whether the given item of GlobFileGenerator._gen_matches(1) is
+    a pattern which yielded nothing (rather than a FileRecord)
+    """
+    return not isinstance(item, FileRecord)
+
+def _gen_ordered(items, key, window, passthrough=None):
+    """
+    generate the given items, sorted by the given key function in windows
+    of the given size (thus, the stream is sorted chunk by chunk, and
+    the memory use is limited).
+
+    passthrough -- a function which tells the items which are not sorted
+                   but keep their position in the stream (e.g. the patterns
+                   which yielded nothing); the items before are generated
+                   first
+    """
+    buf = []
+    try:
+        for item in items:
+            if passthrough is not None and passthrough(item):
+                buf.sort()
+                for tup in buf:
+                    yield tup[2]
+                buf = []
+                yield item
+                continue
+            buf.append((key(item), len(buf), item))
+            if len(buf) >= window:
+                buf.sort()
+                for tup in buf:
+                    yield tup[2]
+                buf = []
+    except NotFound as e:   # yield what was found before
+        buf.sort()
+        for tup in buf:
+            yield tup[2]
+        raise e
+    buf.sort()
+    for tup in buf:
+        yield tup[2]
 
 class GlobFileGenerator(FilenameGenerator):
     """
@@ -551,6 +1482,29 @@ class GlobFileGenerator(FilenameGenerator):
                     hits;  default: YIELD_PATTERNS
                     (NOTE: this is different from YIELD_PATTERN; see the
                     comments in the source above)
+
+        recursive -- if true, a '**' path component matches any number of
+                     directories (like glob.glob(..., recursive=True) in
+                     Python 3.5+), e.g. 'data/**/*.bin';
+                     default: DEFAULT_RECURSIVE (False; otherwise,
+                     '**' is the same as '*', like with glob.glob)
+
+        follow_symlinks -- follow symbolic links to directories when
+                           walking a tree for '**' (with loop detection);
+                           default: DEFAULT_FOLLOW_SYMLINKS (False)
+
+        workers -- the number of threads to read the directories of such
+                   a tree in advance; default: DEFAULT_WORKERS
+
+        order -- None: generate the files as found (default: DEFAULT_ORDER);
+                 'disk': sort them by device and inode number, which is
+                         roughly the order on disk on many filesystems and
+                         reduces seeks for programs which read all files
+                 'extent': sort them by the physical position of their
+                           data, where available (Linux);
+                           this requires opening each file
+                 The files are sorted in windows of DEFAULT_ORDER_WINDOW
+                 files (window option), so the results are still streamed.
         """
         try:
             ignore = kwargs.pop('ignore')   # OK with Python 2.3
@@ -571,31 +1525,173 @@ class GlobFileGenerator(FilenameGenerator):
             notfound = DEFAULT_NOTFOUND
         assert notfound in self.notfound_acceptable()
         self.notfound = notfound
+        self.recursive = kwargs.pop('recursive', DEFAULT_RECURSIVE)
+        self.follow_symlinks = kwargs.pop('follow_symlinks',
+                                          DEFAULT_FOLLOW_SYMLINKS)
+        self.workers = kwargs.pop('workers', DEFAULT_WORKERS)
+        self.order = kwargs.pop('order', DEFAULT_ORDER)
+        assert self.order is None or self.order in _ORDER_KEYS
+        self.window = kwargs.pop('window', DEFAULT_ORDER_WINDOW)
+        self._listings = None   # see the watch method
         FilenameGenerator.__init__(self, *args, **kwargs)
 
     def __iter__(self):
-        from glob import glob
+        if self.order is None:
+            for item in self._gen_matches():
+                yield item
+            return
+        items = _gen_ordered(self._gen_matches(1),
+                             _ORDER_KEYS[self.order], self.window,
+                             _is_placeholder)
+        if self.records:
+            for item in items:
+                yield item
+        else:
+            for item in items:
+                yield getattr(item, 'path', item)
+
+    def watch(self, interval=None, settle=None, rounds=None,
+              snapshot=None, existing=True):
+        """
+        Watch mode: generate the matching regular files which are new or
+        have changed, round after round (e.g. for drop directories which
+        receive files continuously).
+
+        A file is generated when it has not been modified for <settle>
+        seconds (default: DEFAULT_SETTLE_TIME); younger files are checked
+        again in the following rounds.  Then its size and modification
+        time are stored in the snapshot, and it is generated again only
+        if they change.
+
+        Directories are read again only if their modification time has
+        changed; thus, changes of files which have been generated already
+        are noticed when their directory changes (e.g. when files are
+        replaced by renaming, which is good practice anyway).
+        Files which are specified literally (in directories which are not
+        read for any pattern) are checked in every round.
+
+        interval -- seconds to sleep between the rounds
+                    (default: DEFAULT_WATCH_INTERVAL)
+        rounds -- the number of rounds (default: None, i.e. endless)
+        snapshot -- a dictionary {directory: {name: (size, mtime_ns)}},
+                    e.g. an anyos.PersistentCache, to process only new and
+                    changed files in subsequent program runs
+                    (with rounds=1, e.g. in a cron job)
+        existing -- if false, the files which exist in the first round
+                    (and are not in the snapshot) are not generated
+        """
+        import stat
+        from os import stat as os_stat, error
+        from os.path import dirname, basename
+        if interval is None:
+            interval = DEFAULT_WATCH_INTERVAL
+        if settle is None:
+            settle = DEFAULT_SETTLE_TIME
+        if snapshot is None:
+            snapshot = {}
+        listings = self._listings = _ListingCache()
+        pending = set()     # paths of files which are too young
+        first = 1
+        try:
+            while 1:
+                listings.reread.clear()
+                now = time()
+                present = {}    # re-read directory -> set of names
+                for rec in self._gen_matches(1):
+                    if not isinstance(rec, FileRecord):
+                        continue    # a pattern which yielded nothing
+                    path = rec.path
+                    d = _dir_key(dirname(path))
+                    name = basename(path)
+                    if d in listings.reread:
+                        present.setdefault(d, set()).add(name)
+                    elif path not in pending and d in listings.listed:
+                        continue    # known, and directory unchanged
+                    try:
+                        st = os_stat(path)
+                    except error:
+                        pending.discard(path)
+                        continue
+                    if not stat.S_ISREG(st.st_mode):
+                        continue
+                    state = (st.st_size, _mtime_ns(st))
+                    files = snapshot.get(d) or {}
+                    if files.get(name) == state:
+                        pending.discard(path)
+                        continue
+                    if now - st.st_mtime < settle:
+                        pending.add(path)
+                        continue
+                    pending.discard(path)
+                    files[name] = state
+                    snapshot[d] = files     # for persistent dictionaries
+                    if first and not existing:
+                        continue
+                    if self.records:
+                        rec = FileRecord(path)
+                        rec._stat = st
+                        yield rec
+                    else:
+                        yield path
+                # forget the files which vanished:
+                for d in listings.reread:
+                    files = snapshot.get(d)
+                    if files:
+                        names = present.get(d, ())
+                        gone = [name for name in files if name not in names]
+                        if gone:
+                            for name in gone:
+                                del files[name]
+                            snapshot[d] = files
+                first = 0
+                if rounds is not None:
+                    rounds -= 1
+                    if rounds <= 0:
+                        break
+                _sleep(interval)
+        finally:
+            self._listings = None
+
+    def _gen_matches(self, records=0):
+        """
+        the work horse for __iter__
+
+        records -- generate FileRecord objects, even if self.records is
+                   false (the patterns which yielded nothing are still
+                   strings)
+        """
         self.init_ignore()
         notfound = self.notfound
         found_something = 0
         if notfound == YIELD_PATTERNS:
             bogus_patterns = []
-        for pat in self.specs:
+        filters = self._filters
+        keep_records = self.records or records
+        records = keep_records or filters
+        for pat, hits in self._gen_globbed(records):
             found_this = 0
             ignored_here = 0
-            for fn in glob(pat):
+            for fn in hits:
                 if self.is_ignored(fn):
                     if notfound == ERROR_IF_NOT_FOUND:
                         ignored_here += 1
                     continue
+                if filters:
+                    if not self.accepted(fn):
+                        continue
+                    if not keep_records:
+                        fn = fn.path
                 yield fn
                 found_this = 1
             if found_this:
+                if not found_something and notfound == YIELD_PATTERNS:
+                    del bogus_patterns[:]   # won't be needed
                 found_something = 1
             elif notfound == YIELD_PATTERN:
                 yield pat
             elif notfound == YIELD_PATTERNS:
-                bogus_patterns.append(pat)
+                if not found_something:
+                    bogus_patterns.append(pat)
             elif notfound == ERROR_IF_NOT_FOUND:
                 raise NotFound(pat, ignored_here)
         if found_something:
@@ -607,19 +1703,45 @@ class GlobFileGenerator(FilenameGenerator):
             elif notfound == ERROR_IF_NOTHING_FOUND:
                 raise NothingFound(tuple(self.specs), self.count_ignored)
 
+    def _gen_globbed(self, records):
+        """
+        feed the specs to the glob engine (_gen_globbed) in batches of
+        _SPECS_PER_BATCH, to process streamed specs with limited memory
+        """
+        batch = []
+        for spec in self.gen_specs():
+            batch.append(spec)
+            if len(batch) >= _SPECS_PER_BATCH:
+                for tup in _gen_globbed(batch, self.recursive,
+                                        self.follow_symlinks, self.workers,
+                                        records, self._listings):
+                    yield tup
+                batch = []
+        if batch:
+            for tup in _gen_globbed(batch, self.recursive,
+                                    self.follow_symlinks, self.workers,
+                                    records, self._listings):
+                yield tup
+
     def is_ignored(self, fn):
-        from fnmatch import fnmatch
-        for pat in self._ignore:
-            if fnmatch(fn, pat):
-                self.count_ignored += 1
-                return 1
+        from os.path import normcase
+        if isinstance(fn, FileRecord):
+            fn = fn.path
+        if self._ignore_rx is not None and self._ignore_rx.match(normcase(fn)):
+            self.count_ignored += 1
+            return 1
         return 0
 
     def init_ignore(self):
         """
         preparations before the is_ignored method can be used
+        (all ignore patterns are compiled into one regular expression)
         """
         self.count_ignored = 0
+        if self._ignore:
+            self._ignore_rx = _compiled_any(self._ignore)
+        else:
+            self._ignore_rx = None
 
     def notfound_acceptable(self):
         """
@@ -632,28 +1754,229 @@ class GlobFileGenerator(FilenameGenerator):
                 ERROR_IF_NOT_FOUND,
                 )
 
+DEFAULT_CASCADE_CACHE = True    # memoize parsed .ini files on disk?
+
+_INI_PARSED = {}    # (path, mtime_ns, size) -> parsed contents
+_INI_CACHE = None
+def _ini_cache():
+    """
+    return the on-disk cache for parsed .ini files
+    (an anyos.PersistentCache; imported late, since anyos uses this module)
+    """
+    global _INI_CACHE
+    if _INI_CACHE is None:
+        from sys import version_info
+        from thebops.anyos import PersistentCache
+        _INI_CACHE = PersistentCache('optioncascade-py%d.pickle'
+                                     % version_info[0],
+                                     maxentries=200)
+    return _INI_CACHE
+
+def _parse_ini(path):
+    """
+    parse the given .ini file and return a dictionary
+    {section: {option: raw value}}; the defaults are stored as 'DEFAULT'
+    """
+    cp = ConfigParser()
+    if not cp.read([path]):
+        raise IOError('Error reading %s' % path)
+    res = {'DEFAULT': dict(cp.defaults())}
+    for section in cp.sections():
+        res[section] = dict(cp.items(section, True))
+    return res
+
+def _parsed_ini(path, st, cache=None):
+    """
+    return the parsed contents of the given .ini file (see _parse_ini),
+    memoized by (path, mtime_ns, size) for the process and, if given,
+    in the cache
+    """
+    key = (path, _mtime_ns(st), st.st_size)
+    try:
+        return _INI_PARSED[key]
+    except KeyError:
+        pass
+    res = None
+    if cache is not None:
+        res = cache.get(key)
+    if res is None:
+        res = _parse_ini(path)
+        if cache is not None:
+            cache[key] = res
+    _INI_PARSED[key] = res
+    return res
+
 class OptionCascade(object):
     """
-    (NOT IMPLEMENTED YET)
-    reads configuration options from a cascade of .ini files
-
-    IDEAS:
-    - try a local version first,
-      then optionally go up the directory tree,
-      then try the user's preferences,
-      then try the system-wide preferences,
-      then use the implemented default
-    - for writing:
-      - try local only
-      - try the first existing file up the tree
-      - try the system-wide preferences file
-      - try the user's preferences
-      - abort when first attempt / all possibilities failed?
-    - optionally create a local file with all used settings
-      (collected from commandline and cascade)
-
-    (vielleicht nicht noetig; ConfigParser.read liest auch eine Liste!
+    reads configuration options from a cascade of .ini files:
+
+    - the local file <name> in the start directory (default: the current
+      working directory),
+    - optionally the files <name> in all parent directories,
+    - the user's preferences (~/.<name>; on Windows, %APPDATA%\\<name>),
+    - the system-wide preferences (/etc/<name>; on Windows,
+      %ALLUSERSPROFILE%\\<name>)
+
+    The first file which contains an option wins; if none does, the default
+    value given to the get method is used.  Values are raw (no
+    interpolation across files).
+
+    Each file is parsed at most once per process; by default, the parsed
+    contents are memoized in a small on-disk cache as well, keyed by
+    (path, mtime_ns, size), so programs which are run very often don't
+    need to parse unchanged files again (cache=False switches this off;
+    a dictionary-like object can be given instead).
+
+    (Writing is not implemented yet; ConfigParser.write can be used for the
+    local file.)
     """
+    def __init__(self, name, start=None, parents=True, user=True,
+                 system=True, cache=None):
+        self.name = name
+        self.start = start
+        self.parents = parents
+        self.user = user
+        self.system = system
+        if cache is None:
+            cache = DEFAULT_CASCADE_CACHE
+        if cache is True:
+            cache = _ini_cache()
+        elif cache is False:    # an empty dictionary is fine
+            cache = None
+        self._cache = cache
+        self._layers = None
+
+    def _gen_candidates(self):
+        """
+        generate the names of the possible files, most specific first;
+        the directories up the tree are checked by anyos.gen_parents
+        """
+        from os import curdir, environ, name as osname
+        from os.path import join, expanduser
+        from thebops.anyos import gen_parents
+        name = self.name
+        for d in gen_parents(self.start or curdir):
+            yield join(d, name)
+            if not self.parents:
+                break
+        if osname == 'nt':
+            if self.user and environ.get('APPDATA'):
+                yield join(environ['APPDATA'], name)
+            if self.system and environ.get('ALLUSERSPROFILE'):
+                yield join(environ['ALLUSERSPROFILE'], name)
+        else:
+            if self.user:
+                yield expanduser(join('~', '.' + name))
+            if self.system:
+                yield join('/etc', name)
+
+    def _get_layers(self):
+        """
+        return the list of (path, parsed contents) tuples, most specific
+        first; only existing and readable files are considered
+        """
+        if self._layers is None:
+            from os import stat, error
+            from stat import S_ISREG
+            layers = []
+            for path in self._gen_candidates():
+                try:
+                    st = stat(path)
+                    if S_ISREG(st.st_mode):
+                        layers.append((path,
+                                       _parsed_ini(path, st, self._cache)))
+                except (IOError, OSError):
+                    pass        # like ConfigParser.read
+            self._layers = layers
+        return self._layers
+
+    def files(self):
+        """
+        return the list of the files found, most specific first
+        """
+        return [path for path, parsed in self._get_layers()]
+
+    def refresh(self):
+        """
+        forget the files found, to look for them (and changes) again
+        """
+        self._layers = None
+
+    def sections(self):
+        """
+        return the sorted list of sections from all files
+        """
+        found = set()
+        for path, parsed in self._get_layers():
+            found.update(parsed)
+        found.discard('DEFAULT')
+        return sorted(found)
+
+    def where(self, section, option):
+        """
+        return the name of the file which provides the given option,
+        or None
+        """
+        option = option.lower()
+        for path, parsed in self._get_layers():
+            if option in parsed.get(section, ()):
+                return path
+            if option in parsed['DEFAULT']:
+                return path
+        return None
+
+    def has_option(self, section, option):
+        return self.where(section, option) is not None
+
+    def get(self, section, option, default=None):
+        """
+        return the raw value of the given option from the first file which
+        provides it, or the given default
+        """
+        option = option.lower()
+        for path, parsed in self._get_layers():
+            dic = parsed.get(section)
+            if dic is not None and option in dic:
+                return dic[option]
+            dic = parsed['DEFAULT']
+            if option in dic:
+                return dic[option]
+        return default
+
+    def getint(self, section, option, default=None):
+        val = self.get(section, option)
+        if val is None:
+            return default
+        return int(val)
+
+    def getfloat(self, section, option, default=None):
+        val = self.get(section, option)
+        if val is None:
+            return default
+        return float(val)
+
+    _boolean_states = {'1': True, 'yes': True, 'true': True, 'on': True,
+                       '0': False, 'no': False, 'false': False, 'off': False}
+
+    def getboolean(self, section, option, default=None):
+        val = self.get(section, option)
+        if val is None:
+            return default
+        try:
+            return self._boolean_states[val.lower()]
+        except KeyError:
+            raise ValueError('Not a boolean: %s' % val)
+
+    def items(self, section):
+        """
+        return the sorted list of (option, value) tuples of the given
+        section, merged from all files (the DEFAULT values included)
+        """
+        merged = {}
+        for path, parsed in reversed(self._get_layers()):
+            merged.update(parsed['DEFAULT'])
+            merged.update(parsed.get(section, {}))
+        return sorted(merged.items())
 
 def get_console():
     """
@@ -33,7 +33,7 @@ __all__ = [# callable instances:
            ]
 
 from ConfigParser import ConfigParser
-from time import time, sleep as _sleep
+from time import time
 from sys import stderr
 from os import linesep
 from random import choice
@@ -54,7 +54,12 @@ except NameError:
             'by the locale module)')
 
 from thebops.rexxbi import left
-from thebops.shtools import ToolsValueError, Rotor, get_console
+from thebops.shtools import ToolsValueError, Rotor, get_console, \
+        sleep_until
+try:
+    from time import monotonic as _monotonic
+except ImportError:     # Python < 3.3
+    _monotonic = time
 
 class InvalidCharacterPoolError(ToolsValueError):   # RandomChars
     msg_tmpl = 'Invalid characters in pool (%(value)r)'
@@ -74,8 +79,10 @@ class Sleeper:
     def __init__(self, sequence, step, compact=True, tell=True):
         """
         sequence - a strings generator, or a sequence, for an animation
+                   (None: sleep without screen output)
         step - a time (usually a fraction of a second) to sleep between
-               two animation strings
+               two animation strings (the frame budget; late frames are
+               skipped)
         compact - default value for compact argument
         tell - ... about slept seconds
         """
@@ -91,59 +98,58 @@ class Sleeper:
         self.console = get_console()
         self._slept = 0
 
-    def __call__(self, duration, compact=None):
+    def __call__(self, duration, compact=None, event=None):
         """
         sleep the given time while playing an animation (see the constructor)
         duration -- sleeping duration [seconds]
         compact -- unless manually terminated, erase output
+        event -- a threading.Event which ends the sleep early when set
         """
         if duration <= 0:
             return
-        stop = float(duration)
-        SLEEPSTART = time()
-        slept = 0
-        msg = _('sleeping %%d/%d seconds ...\r') % stop
+        start = _monotonic()
+        msg = _('sleeping %%d/%d seconds ...') % duration
         step = self.step
         tell = self.tell
-        sequence = self.sequence
         console = self.console
+        prevtext = ['']
+        if self.sequence is None:
+            render = None
+        else:
+            frames = iter(self.sequence)
+            def render(now):
+                try:
+                    ani = next(frames)
+                except StopIteration:
+                    return None
+                if tell:
+                    prevtext[0] = ' '.join((ani, (msg % (now - start))))
+                else:
+                    prevtext[0] = ani
+                return prevtext[0] + '\r'
+        # keep the pace of the animation when called repeatedly:
+        phase = None
+        if self.prev_wakeup is not None \
+           and start - self.prev_wakeup < step:
+            phase = self.prev_wakeup + step
+        tim = None
         try:
             try:    # nested: Python 2.4- compability
-                first = 1
-                minitim = None
-                for ani in sequence:
-                    tim = time()
-                    slept = tim - SLEEPSTART
-                    if first:
-                        first = 0
-                        if self.prev_wakeup is not None:
-                            minitim = step-(SLEEPSTART-self.prev_wakeup)
-                            if minitim <= 0:
-                                minitim = None
-                                continue
-                    if slept >= stop:
-                        break
-                    if minitim is None:
-                        minitim = min(step, stop-slept)
-                    if tell:
-                        prevtext = ' '.join((ani, (msg % slept)))
-                    else:
-                        prevtext = ani
-                    console.write(prevtext+'\r')
-                    _sleep(minitim)
+                tim = sleep_until(start + duration, step, render, console,
+                                  event, phase)
                 if compact is None:
                     compact = self.compact
-                if compact:
-                    pl = len(prevtext)
+                if compact and prevtext[0]:
+                    pl = len(prevtext[0])
                     console.write(''.join([ch * pl
                                            for ch in ' \b']))
             except KeyboardInterrupt:
-                tim = time()
-                slept = tim - SLEEPSTART
                 console.write(linesep)
                 raise
         finally:
-            self._slept += slept
+            if tim is None:
+                tim = _monotonic()
+            self._slept += tim - start
             self.prev_wakeup = tim
 
     def slept(self):
@@ -0,0 +1,515 @@
+# vim: ts=8 sts=4 sw=4 si et tw=79
+import unittest
+import os
+from os.path import join
+from tempfile import mkdtemp
+from shutil import rmtree
+from thebops.anyos import find_progs, find_many_progs, ProgsCache, \
+        PathIndex, async_find_progs, async_get_1st, ProgramNotFound, \
+        ProbeStats, stored_below_any_dirtup, \
+        _DirTrie, _stored_below_dirtup, _gen_absdir_tuples
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+DEBUG = 1
+
+class ProgsTestCase(unittest.TestCase):
+    """
+    Base class: a temporary directory tree, and a PATH pointing to some
+    of its directories
+    """
+    dirnames = ('bin1', 'bin2', 'bin3')
+    files = (('bin1', 'alpha'),
+             ('bin2', 'alpha'),
+             ('bin2', 'beta'),
+             ('bin3', 'gamma'),
+             )
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.saved_env = dict(os.environ)
+        for d in self.dirnames:
+            os.mkdir(join(self.root, d))
+        for tup in self.files:
+            self.touch(*tup)
+        os.environ['PATH'] = os.pathsep.join([join(self.root, d)
+                                              for d in self.dirnames])
+        os.environ.pop('PATHEXT', None)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.saved_env)
+        rmtree(self.root)
+
+    def touch(self, *tail):
+        fn = join(self.root, *tail)
+        open(fn, 'w').close()
+        return fn
+
+    def path(self, *tail):
+        return join(self.root, *tail)
+
+    def mkdirs(self, *tail):
+        os.makedirs(join(self.root, *tail))
+
+class TestFindProgs(ProgsTestCase):
+    """
+    Tests for the find_progs function
+    """
+
+    def test_path_order(self):
+        """
+        find_progs yields the hits in PATH order
+        """
+        self.assertEqual(list(find_progs('alpha')),
+                         [self.path('bin1', 'alpha'),
+                          self.path('bin2', 'alpha'),
+                          ])
+        self.assertEqual(list(find_progs('delta')), [])
+
+    def test_xroots(self):
+        """
+        find_progs skips PATH entries below the xroots
+        """
+        self.assertEqual(list(find_progs('alpha',
+                                         xroots=[self.path('bin1')])),
+                         [self.path('bin2', 'alpha')])
+
+    def test_indirs_first(self):
+        """
+        find_progs searches the indirs before the PATH
+        """
+        self.assertEqual(list(find_progs('alpha',
+                                         indirs=[self.path('bin2')],
+                                         scanpath=1)),
+                         [self.path('bin2', 'alpha'),
+                          self.path('bin1', 'alpha'),
+                          self.path('bin2', 'alpha'),
+                          ])
+
+class TestInroots(ProgsTestCase):
+    """
+    Tests for the inroots argument of find_progs
+    """
+    dirnames = ('bin1', 'bin2', 'bin3', 'opt',
+                join('opt', 'b'), join('opt', 'b', 'c'), join('opt', 'a'))
+    files = (('bin1', 'alpha'),
+             ('opt', 'b', 'c', 'tool'),
+             ('opt', 'b', 'tool'),
+             ('opt', 'a', 'tool'),
+             )
+
+    def test_depth_first_order(self):
+        """
+        hits are generated by depth, then by directory name
+        """
+        self.assertEqual(list(find_progs('tool', inroots=[self.path('opt')])),
+                         [self.path('opt', 'a', 'tool'),
+                          self.path('opt', 'b', 'tool'),
+                          self.path('opt', 'b', 'c', 'tool'),
+                          ])
+
+    def test_maxdepth(self):
+        """
+        the walk stops at the given depth
+        """
+        self.assertEqual(list(find_progs('tool', inroots=[self.path('opt')],
+                                         maxdepth=1)),
+                         [self.path('opt', 'a', 'tool'),
+                          self.path('opt', 'b', 'tool'),
+                          ])
+        self.assertEqual(list(find_progs('tool', inroots=[self.path('opt')],
+                                         maxdepth=0)),
+                         [])
+
+    def test_pruning(self):
+        """
+        excluded roots and symbolic link loops are pruned
+        """
+        if hasattr(os, 'symlink'):
+            os.symlink(self.path('opt'), self.path('opt', 'a', 'loop'))
+        self.assertEqual(list(find_progs('tool', inroots=[self.path('opt')],
+                                         xroots=[self.path('opt', 'b')],
+                                         scanpath=0)),
+                         [self.path('opt', 'a', 'tool')])
+
+    def test_no_path(self):
+        """
+        unless requested, the PATH is not scanned when inroots are given
+        """
+        self.assertEqual(list(find_progs('alpha',
+                                         inroots=[self.path('opt')])),
+                         [])
+
+class TestAsync(ProgsTestCase):
+    """
+    Tests for async_find_progs and async_get_1st
+    """
+
+    def setUp(self):
+        if asyncio is None:
+            self.skipTest('asyncio is not available')
+        ProgsTestCase.setUp(self)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        ProgsTestCase.tearDown(self)
+
+    def run_future(self, fut):
+        return self.loop.run_until_complete(fut)
+
+    def test_same_hits(self):
+        """
+        async_find_progs yields the same hits as find_progs
+        """
+        for name in ('alpha', 'beta', 'delta'):
+            for kwargs in ({},
+                           {'indirs': [self.path('bin2')], 'scanpath': 1},
+                           {'xroots': [self.path('bin1')]},
+                           ):
+                self.assertEqual(
+                    self.run_future(async_find_progs(name, self.loop,
+                                                     **kwargs)),
+                    list(find_progs(name, **kwargs)))
+
+    def test_first(self):
+        """
+        the winner is the first hit in the order of precedence
+        """
+        self.assertEqual(self.run_future(async_get_1st('alpha', self.loop)),
+                         self.path('bin1', 'alpha'))
+        self.assertEqual(self.run_future(async_get_1st('gamma', self.loop)),
+                         self.path('bin3', 'gamma'))
+        self.assertRaises(ProgramNotFound,
+                          self.run_future,
+                          async_get_1st('delta', self.loop))
+
+    def test_running_loop(self):
+        """
+        without a loop argument, the running loop is used
+        """
+        futures = []
+        def start():
+            futures.append(async_get_1st('alpha'))
+        self.loop.call_soon(start)
+        self.run_future(asyncio.sleep(0))
+        self.assertEqual(self.run_future(futures[0]),
+                         self.path('bin1', 'alpha'))
+        if hasattr(asyncio, 'get_running_loop'):
+            self.assertRaises(RuntimeError, async_find_progs, 'alpha')
+
+class TestProbeStats(ProgsTestCase):
+    """
+    Tests for the trace argument of find_progs
+    """
+
+    def test_trace(self):
+        """
+        the probes, hits and times are recorded per directory
+        """
+        stats = ProbeStats()
+        self.assertEqual(list(find_progs('alpha', trace=stats)),
+                         [self.path('bin1', 'alpha'),
+                          self.path('bin2', 'alpha'),
+                          ])
+        self.assertEqual([tup[:3] for tup in stats],
+                         [(self.path('bin1'), 1, 1),
+                          (self.path('bin2'), 1, 1),
+                          (self.path('bin3'), 1, 0),
+                          ])
+        list(find_progs('beta', trace=stats, probe='listdir'))
+        self.assertEqual(stats[self.path('bin2')][:2], (2, 2))
+        self.assertEqual(len(stats.slowest()), 3)
+
+class TestProbeMethods(ProgsTestCase):
+    """
+    The 'listdir' probe method yields the same as the default 'isfile'
+    """
+    dirnames = ProgsTestCase.dirnames + ('bin4',)
+    files = ProgsTestCase.files + (('bin3', 'alpha.bat'),
+                                   ('bin4', 'alpha.exe'),
+                                   )
+
+    def setUp(self):
+        ProgsTestCase.setUp(self)
+        os.mkdir(self.path('bin1', 'beta'))
+        os.environ['PATH'] = os.pathsep.join([os.environ['PATH'],
+                                              self.path('missing')])
+
+    def assertSameHits(self, name, **kwargs):
+        hits = list(find_progs(name, probe='isfile', **kwargs))
+        self.assertEqual(list(find_progs(name, probe='listdir', **kwargs)),
+                         hits)
+        return hits
+
+    def test_plain(self):
+        """
+        same hits without extensions; directories are not found
+        """
+        for name in ('alpha', 'beta', 'gamma', 'delta'):
+            self.assertSameHits(name)
+        self.assertEqual(self.assertSameHits('beta'),
+                         [self.path('bin2', 'beta')])
+
+    def test_extensions(self):
+        """
+        same hits and order with PATHEXT extensions
+        """
+        os.environ['PATHEXT'] = os.pathsep.join(['.exe', '.bat', ''])
+        self.assertEqual(self.assertSameHits('alpha'),
+                         [self.path('bin1', 'alpha'),
+                          self.path('bin2', 'alpha'),
+                          self.path('bin3', 'alpha.bat'),
+                          self.path('bin4', 'alpha.exe'),
+                          ])
+
+    def test_unknown_method(self):
+        """
+        unknown probe methods are rejected
+        """
+        self.assertRaises(ValueError, list, find_progs('alpha',
+                                                       probe='guess'))
+
+class TestFindManyProgs(ProgsTestCase):
+    """
+    Tests for the find_many_progs function
+    """
+
+    def test_same_as_find_progs(self):
+        """
+        find_many_progs yields the same hits as find_progs for each name
+        """
+        names = ['alpha', 'beta', 'gamma', 'delta', 'alpha']
+        res = find_many_progs(names, xroots=[self.path('bin3')])
+        self.assertEqual(sorted(res.keys()), sorted(set(names)))
+        for name in names:
+            self.assertEqual(res[name],
+                             list(find_progs(name,
+                                             xroots=[self.path('bin3')])))
+
+    def test_shared_listings(self):
+        """
+        the directory listings can be shared with find_progs calls
+        """
+        listings = {}
+        find_many_progs(['alpha'], listings=listings)
+        self.assertEqual(len(listings), len(self.dirnames))
+        self.touch('bin1', 'gamma')
+        # the listing is reused, thus the new file is not seen:
+        self.assertEqual(list(find_progs('gamma', listings=listings)),
+                         [self.path('bin3', 'gamma')])
+
+class TestPathIndex(ProgsTestCase):
+    """
+    Tests for the PathIndex class
+    """
+
+    def test_lookup(self):
+        """
+        PathIndex lookups match find_progs
+        """
+        ix = PathIndex()
+        for name in ('alpha', 'beta', 'gamma', 'delta'):
+            self.assertEqual(ix.lookup(name), list(find_progs(name)))
+
+    def test_stems(self):
+        """
+        with extensions, programs are found by their stems
+        """
+        self.touch('bin3', 'beta.exe')
+        ix = PathIndex(extensions=['.exe', '.bat'])
+        self.assertEqual(ix.lookup('beta'), [self.path('bin3', 'beta.exe')])
+        self.assertEqual(ix.lookup('beta.exe'),
+                         [self.path('bin3', 'beta.exe')])
+        self.assertEqual(ix.lookup('alpha'), [])
+
+    def test_queries(self):
+        """
+        prefix and shadowing queries
+        """
+        self.touch('bin3', 'alphabet')
+        ix = PathIndex()
+        self.assertEqual(ix.startingwith('alp'), ['alpha', 'alphabet'])
+        self.assertEqual(list(ix.shadowed()),
+                         [('alpha', [self.path('bin1', 'alpha'),
+                                     self.path('bin2', 'alpha'),
+                                     ])])
+
+    def test_idle_dirs(self):
+        """
+        directories which contribute nothing are found
+        """
+        self.assertEqual(PathIndex().idle_dirs(), [])
+        os.mkdir(self.path('bin4'))
+        os.mkdir(self.path('bin5'))
+        self.touch('bin4', 'beta')
+        os.environ['PATH'] = os.pathsep.join([os.environ['PATH'],
+                                              self.path('bin4'),
+                                              self.path('bin5')])
+        ix = PathIndex()
+        self.assertEqual(ix.idle_dirs(), [self.path('bin4'),
+                                          self.path('bin5')])
+        self.assertEqual(ix.empty_dirs(), [self.path('bin5')])
+
+    def test_refresh(self):
+        """
+        refresh re-reads the changed directories only
+        """
+        ix = PathIndex()
+        self.assertEqual(ix.lookup('delta'), [])
+        self.assertEqual(ix.refresh(), 0)
+        self.touch('bin3', 'delta')
+        os.utime(self.path('bin3'), (0, 0))
+        self.assertEqual(ix.refresh(), 1)
+        self.assertEqual(ix.lookup('delta'), [self.path('bin3', 'delta')])
+        self.assertEqual(ix.lookup('gamma'), [self.path('bin3', 'gamma')])
+
+class TestProgsCache(ProgsTestCase):
+    """
+    Tests for the persistent ProgsCache
+    """
+
+    def setUp(self):
+        ProgsTestCase.setUp(self)
+        self.cachefile = self.path('progs.cache')
+        self.cache = ProgsCache(None, filename=self.cachefile)
+
+    def test_hits_and_misses(self):
+        """
+        cached hits and misses are the same as without cache
+        """
+        for name in ('alpha', 'beta', 'delta'):
+            self.assertEqual(list(find_progs(name, cache=self.cache)),
+                             list(find_progs(name)))
+        self.assertEqual(len(self.cache), 3)
+
+    def test_invalidation(self):
+        """
+        a change to one of the directories invalidates the entry
+        """
+        self.assertEqual(list(find_progs('gamma', cache=self.cache)),
+                         [self.path('bin3', 'gamma')])
+        self.touch('bin1', 'gamma')
+        # make sure the modification time differs:
+        os.utime(self.path('bin1'), (0, 0))
+        self.assertEqual(list(find_progs('gamma', cache=self.cache)),
+                         [self.path('bin1', 'gamma'),
+                          self.path('bin3', 'gamma'),
+                          ])
+
+    def test_persistence(self):
+        """
+        a saved cache is read by another ProgsCache instance
+        """
+        list(find_progs('beta', cache=self.cache))
+        self.cache.save()
+        other = ProgsCache(None, filename=self.cachefile)
+        self.assertEqual(len(other), 1)
+        self.assertEqual(list(find_progs('beta', cache=other)),
+                         [self.path('bin2', 'beta')])
+
+    def test_vfunc(self):
+        """
+        with vdirs, results for lambdas and closures are not cached (they
+        can't be told apart); module level functions are
+        """
+        self.mkdirs('opt', 'tool-1')
+        self.touch('opt', 'tool-1', 'omega')
+        vdirs = [self.path('opt', 'tool-*')]
+        hit = [self.path('opt', 'tool-1', 'omega')]
+        self.assertEqual(list(find_progs('omega', vdirs=vdirs,
+                                         vfunc=lambda d: (1,),
+                                         cache=self.cache)),
+                         hit)
+        self.assertEqual(list(find_progs('omega', vdirs=vdirs,
+                                         vfunc=lambda d: None,
+                                         cache=self.cache)),
+                         [])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(list(find_progs('omega', vdirs=vdirs,
+                                         vfunc=vfunc_any,
+                                         cache=self.cache)),
+                         hit)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_wildcard_vdirs(self):
+        """
+        new versioned directories invalidate the entry, also below
+        wildcard parents
+        """
+        self.mkdirs('opt', 'tool-1', 'bin')
+        self.mkdirs('opt', 'tool-2')
+        self.touch('opt', 'tool-1', 'bin', 'omega')
+        vdirs = [self.path('opt', 'tool-*', 'bin')]
+        def find():
+            return list(find_progs('omega', vdirs=vdirs, vfunc=vfunc_any,
+                                   cache=self.cache))
+        self.assertEqual(find(), [self.path('opt', 'tool-1', 'bin',
+                                            'omega')])
+        self.mkdirs('opt', 'tool-2', 'bin')
+        self.touch('opt', 'tool-2', 'bin', 'omega')
+        os.utime(self.path('opt', 'tool-2'), (0, 0))
+        self.assertEqual(find(), list(find_progs('omega', vdirs=vdirs,
+                                                 vfunc=vfunc_any)))
+        self.assertEqual(len(find()), 2)
+        self.mkdirs('opt', 'tool-3', 'bin')
+        self.touch('opt', 'tool-3', 'bin', 'omega')
+        os.utime(self.path('opt'), (0, 0))
+        self.assertEqual(len(find()), 3)
+
+class TestDirTrie(unittest.TestCase):
+    """
+    The _DirTrie agrees with the linear check it replaced
+    """
+    paths = ['/a', '/a/b', '/a/bc', '/a/b/c', '/a/bc/d', '/ab', '/',
+             '/b', '/b/a/b']
+
+    def tuples(self, seq):
+        return [tuple(t) for t in _gen_absdir_tuples(seq)]
+
+    def check(self, roots):
+        trie = _DirTrie(roots)
+        for s in self.tuples(self.paths):
+            linear = 0
+            for t in roots:
+                if _stored_below_dirtup(s, t):
+                    linear = 1
+                    break
+            self.assertEqual(trie.below(s), linear,
+                             '%r below any of %r' % (s, roots))
+            self.assertEqual(stored_below_any_dirtup(s, roots), linear)
+        return trie
+
+    def test_prefix(self):
+        """
+        /a/b is not a prefix of /a/bc
+        """
+        trie = self.check(self.tuples(['/a/b']))
+        self.assertEqual(trie.below(tuple('/a/bc'.split('/'))), 0)
+        self.assertEqual(trie.below(tuple('/a/b/c'.split('/'))), 1)
+        self.check(self.tuples(['/a/bc', '/ab']))
+        self.check(self.tuples(['/a/b', '/a']))
+
+    def test_root(self):
+        self.check(self.tuples(['/']))
+        self.check([()])
+        self.check([])
+
+    def test_duplicates(self):
+        roots = [tuple('/a/b'.split('/'))] * 2 + self.tuples(['/b'])
+        trie = self.check(roots)
+        self.assertEqual(len(trie), 2)
+
+
+def vfunc_any(d):
+    """
+    a version function for the tests: every directory has a version
+    """
+    return (len(d),)
+
+
+if __name__ == '__main__':
+    unittest.main()
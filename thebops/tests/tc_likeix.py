@@ -0,0 +1,233 @@
+# vim: ts=8 sts=4 sw=4 si et tw=79
+import unittest
+import threading
+import os
+import sys
+import time
+import shutil
+import tempfile
+from os.path import join, realpath
+from thebops.likeix import ToolsHub, VersionProber, get_best, \
+        _probe_output
+from thebops.anyos import VersionConstrained
+
+DEBUG = 1
+
+class TestToolsHub(unittest.TestCase):
+    """
+    Tests for ToolsHub.prefetch, sequential and concurrent
+    """
+    names = ('alpha', 'beta', 'gamma', 'delta')
+
+    def setUp(self):
+        self.calls = []
+        self.threads = set()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+        self.lock = threading.Lock()
+
+    def find(self, progname, listings=None):
+        """
+        a finder for the tests: 'slow' waits for the gate, 'bad' fails
+        """
+        self.lock.acquire()
+        try:
+            self.calls.append(progname)
+            self.threads.add(threading.current_thread().name)
+        finally:
+            self.lock.release()
+        if progname == 'slow':
+            self.started.set()
+            self.gate.wait(10)
+        elif progname == 'bad':
+            raise RuntimeError('bad tool')
+        return ['/opt/%s/bin/%s' % (progname, progname)]
+
+    def hub(self, *names):
+        return ToolsHub(fallback=self.find,
+                        **dict([(name, {}) for name in names or self.names]))
+
+    def test_sequential(self):
+        hub = self.hub()
+        hub.prefetch()
+        self.assertEqual(sorted(self.calls), sorted(self.names))
+        self.assertEqual(self.threads,
+                         set([threading.current_thread().name]))
+        self.assertEqual(hub['beta'], '/opt/beta/bin/beta')
+        self.assertEqual(len(self.calls), len(self.names))
+
+    def test_concurrent(self):
+        hub = self.hub()
+        hub.prefetch(workers=3)
+        for name in self.names:
+            self.assertEqual(hub[name], '/opt/%s/bin/%s' % (name, name))
+        self.assertEqual(sorted(self.calls), sorted(self.names))
+        self.assertFalse(threading.current_thread().name in self.threads)
+
+    def test_pending(self):
+        """
+        an access to a tool which is being sought waits for the result,
+        without seeking it again
+        """
+        self.gate.clear()
+        hub = self.hub('slow', 'alpha')
+        hub.prefetch(workers=2)
+        self.assertTrue(self.started.wait(10))
+        res = []
+        reader = threading.Thread(target=lambda: res.append(hub['slow']))
+        reader.start()
+        reader.join(0.2)
+        self.assertTrue(reader.is_alive())      # waiting
+        self.assertEqual(res, [])
+        self.gate.set()
+        reader.join(10)
+        self.assertEqual(res, ['/opt/slow/bin/slow'])
+        self.assertEqual(self.calls.count('slow'), 1)
+        # already pending or found: not sought again
+        hub.prefetch(workers=2)
+        self.assertEqual(hub['alpha'], '/opt/alpha/bin/alpha')
+        self.assertEqual(sorted(self.calls), ['alpha', 'slow'])
+
+    def test_errors(self):
+        """
+        errors in the background are swallowed; the access tries again
+        and raises the exception
+        """
+        hub = self.hub('bad', 'alpha')
+        hub.prefetch(workers=2)
+        self.assertRaises(RuntimeError, hub.__getitem__, 'bad')
+        self.assertEqual(hub['alpha'], '/opt/alpha/bin/alpha')
+        self.assertEqual(self.calls.count('bad'), 2)
+
+
+class TestVersionProber(unittest.TestCase):
+    """
+    Tests for VersionProber, and its use by get_best
+    """
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def tool(self, name, version, delay=0):
+        """
+        create a little shell script which tells its version (after <delay>
+        seconds) and counts its calls in <name>.calls
+        """
+        fn = join(self.tmp, name)
+        fo = open(fn, 'w')
+        try:
+            fo.write('#!/bin/sh\n'
+                     'echo x >> "$0.calls"\n')
+            if delay:
+                fo.write('sleep %s\n' % delay)
+            fo.write('echo "%s version %s"\n' % (name, version))
+        finally:
+            fo.close()
+        os.chmod(fn, int('755', 8))
+        return fn
+
+    def calls(self, fn):
+        try:
+            fo = open(fn + '.calls')
+        except IOError:
+            return 0
+        try:
+            return len(fo.readlines())
+        finally:
+            fo.close()
+
+    def test_key(self):
+        fn = self.tool('tool', '1.2.3')
+        prober = VersionProber(cache=False)
+        st = os.stat(fn)
+        key = prober._key(fn)
+        self.assertEqual(key[0], realpath(fn))
+        self.assertEqual(key[1], st.st_size)
+        self.assertEqual(key[3:], (('--version',), prober.pattern))
+        # a symlink has the key of its target:
+        link = join(self.tmp, 'link')
+        os.symlink(fn, link)
+        self.assertEqual(prober._key(link), key)
+        # other arguments, other key:
+        self.assertNotEqual(VersionProber(args=('-V',), cache=False
+                                          )._key(fn), key)
+        # the binary is replaced:
+        self.tool('tool', '1.2.34')
+        self.assertNotEqual(prober._key(fn), key)
+        key = prober._key(fn)
+        os.utime(fn, (st.st_atime, st.st_mtime - 100))
+        self.assertNotEqual(prober._key(fn), key)
+        self.assertEqual(prober._key(join(self.tmp, 'missing')), None)
+
+    def test_cache(self):
+        fn = self.tool('tool', '1.2.3')
+        cache = {}
+        prober = VersionProber(cache=cache)
+        self.assertEqual(prober(fn), (1, 2, 3))
+        self.assertEqual(prober(fn), (1, 2, 3))
+        self.assertEqual(self.calls(fn), 1)
+        self.assertEqual(list(cache.values()), [(1, 2, 3)])
+        # replaced by a newer version:
+        self.tool('tool', '1.3')
+        self.assertEqual(prober(fn), (1, 3))
+        self.assertEqual(self.calls(fn), 2)
+
+    def test_timeout(self):
+        fn = self.tool('slow', '1.0', delay=5)
+        self.assertEqual(_probe_output([fn], 0.3), (None, True))
+        cache = {}
+        prober = VersionProber(timeout=0.3, cache=cache)
+        started = time.time()
+        self.assertEqual(prober(fn), None)
+        self.assertTrue(time.time() - started < 4)
+        # not cached; the next probe might be luckier:
+        self.assertEqual(cache, {})
+        self.assertEqual(VersionProber(timeout=None, cache=False
+                                       )(self.tool('quick', '1.1')), (1, 1))
+
+    def test_probe_many(self):
+        # the first ones take longest:
+        fns = [self.tool('tool%d' % i, '%d.0' % i, delay=(3 - i) * 0.2)
+               for i in range(4)]
+        missing = join(self.tmp, 'missing')
+        expected = dict([(fn, (i, 0)) for (i, fn) in enumerate(fns)])
+        expected[missing] = None
+        for workers in (1, 4):
+            res = VersionProber(workers=workers, cache=False
+                                ).probe_many(fns + [missing])
+            self.assertEqual(res, expected)
+
+    def test_get_best(self):
+        fns = [self.tool('tool%d' % i, '%d.%d' % (i % 3, i))
+               for i in range(5)]
+        probed = []
+        class Prober(VersionProber):
+            def probe_many(self, fns):
+                probed.append(len(fns))
+                return VersionProber.probe_many(self, fns)
+        prober = Prober(cache=False)
+        def find_tool():
+            for fn in fns:
+                yield fn
+        self.assertEqual(get_best(find_tool, version_func=prober,
+                                  min_version=None),
+                         fns[2])                        # 2.2
+        self.assertEqual(probed, [5])
+        self.assertEqual(get_best(find_tool, version_func=prober,
+                                  version_below=(2, 0)),
+                         fns[4])                        # 1.4
+        self.assertRaises(VersionConstrained,
+                          get_best, find_tool, version_func=prober,
+                          min_version=(3, 0))
+
+    def test_python(self):
+        prober = VersionProber(args=('-V',), cache=False)
+        self.assertEqual(prober(sys.executable),
+                         tuple(sys.version_info[:3]))
+
+
+if __name__ == '__main__':
+    unittest.main()
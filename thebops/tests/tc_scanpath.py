@@ -0,0 +1,555 @@
+# vim: ts=8 sts=4 sw=4 si et tw=79
+"""
+Tests for the scanpath script, which is run in a subprocess
+(with a PATH pointing to some directories of a temporary tree)
+"""
+import unittest
+import os
+import sys
+from os.path import join, dirname, abspath, isfile
+from subprocess import Popen, PIPE
+from tempfile import mkdtemp
+from shutil import rmtree
+from hashlib import md5, sha1
+import json
+
+DEBUG = 1
+
+SCRIPT = join(dirname(abspath(__file__)), '..', '..', 'scripts',
+              'scanpath.py')
+TOPDIR = join(dirname(abspath(__file__)), '..', '..')
+
+class ScanpathTestCase(unittest.TestCase):
+    """
+    Base class: a temporary directory tree, and a PATH pointing to some
+    of its directories
+    """
+    dirnames = ('bin1', 'bin2', 'bin3')
+    files = (('bin1', 'alpha'),
+             ('bin2', 'alpha'),
+             ('bin2', 'beta'),
+             ('bin3', 'gamma'),
+             )
+
+    def setUp(self):
+        if not isfile(SCRIPT):
+            self.skipTest('scanpath script not found')
+        self.root = mkdtemp()
+        for d in self.dirnames:
+            os.mkdir(join(self.root, d))
+        for tup in self.files:
+            self.touch(*tup)
+        self.pathvar = os.pathsep.join([join(self.root, d)
+                                        for d in self.dirnames])
+
+    def tearDown(self):
+        rmtree(self.root)
+
+    def touch(self, *tail, **kwargs):
+        """
+        create the given file; the contents can be given as data
+        (bytes)
+        """
+        fn = join(self.root, *tail)
+        d = dirname(fn)
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        fo = open(fn, 'wb')
+        fo.write(kwargs.get('data', b''))
+        fo.close()
+        return fn
+
+    def path(self, *tail):
+        return join(self.root, *tail)
+
+    def scanpath(self, *args, **kwargs):
+        """
+        run scanpath with the given arguments; return a tuple
+        (returncode, standard output, standard error), the output as
+        bytes if binary=True, and as a list of lines otherwise
+        """
+        env = dict(os.environ)
+        env['PATH'] = kwargs.get('pathvar', self.pathvar)
+        env.pop('PATHEXT', None)
+        env['PYTHONPATH'] = os.pathsep.join([TOPDIR]
+                                            + [p for p in
+                                               [env.get('PYTHONPATH')]
+                                               if p])
+        proc = Popen([sys.executable, SCRIPT] + list(args),
+                     stdout=PIPE, stderr=PIPE, env=env, cwd=self.root)
+        out, errout = proc.communicate()
+        if not kwargs.get('binary'):
+            out = out.decode('utf-8').splitlines()
+        return proc.returncode, out, errout.decode('utf-8').splitlines()
+
+class TestOrderDir(ScanpathTestCase):
+    """
+    --order=dir: one pass through the PATH, with the same results
+    """
+    files = ScanpathTestCase.files + (('bin1', 'sub', 'delta'),
+                                      ('bin3', 'sub', 'delta'),
+                                      ('bin3', 'beta'),
+                                      )
+
+    def test_same_results(self):
+        """
+        the results equal those of --order=file
+        """
+        for args in (('alpha', 'beta', 'gamma'),
+                     ('gamma', 'alpha', 'alpha'),
+                     ('beta', 'nothing', 'sub/delta'),
+                     ):
+            for opts in ((), ('--which',)):
+                byfile = self.scanpath(*(opts + args))
+                bydir = self.scanpath(*(opts + ('--order=dir',) + args))
+                self.assertEqual(bydir, byfile)
+
+    def test_results(self):
+        """
+        all matches, in PATH order
+        """
+        rc, out, errout = self.scanpath('--order=dir', 'beta', 'alpha')
+        self.assertEqual(out, [self.path('bin2', 'beta'),
+                               self.path('bin3', 'beta'),
+                               self.path('bin1', 'alpha'),
+                               self.path('bin2', 'alpha')])
+        rc, out, errout = self.scanpath('--order=dir', '-1', 'beta', 'alpha')
+        self.assertEqual(out, [self.path('bin2', 'beta'),
+                               self.path('bin1', 'alpha')])
+
+    def test_dangling(self):
+        """
+        dangling symbolic links are listed, but not reported
+        """
+        if not hasattr(os, 'symlink'):
+            self.skipTest('no symbolic links')
+        os.symlink(self.path('nowhere'), self.path('bin1', 'beta'))
+        for opts in ((), ('--which',)):
+            byfile = self.scanpath(*(opts + ('beta', 'alpha')))
+            bydir = self.scanpath(*(opts + ('--order=dir', 'beta', 'alpha')))
+            self.assertEqual(bydir, byfile)
+            self.assertFalse(self.path('bin1', 'beta') in bydir[1])
+
+class TestChecksums(ScanpathTestCase):
+    """
+    --checksum and --algorithm
+    """
+    files = (('bin1', 'alpha'),
+             ('bin2', 'beta'),
+             ('bin3', 'alpha'),
+             ('bin3', 'beta'),
+             )
+
+    def setUp(self):
+        ScanpathTestCase.setUp(self)
+        self.data = {}
+        for i, tup in enumerate(self.files):
+            data = b'x' * (i * 1000) + tup[0].encode('ascii')
+            self.touch(data=data, *tup)
+            self.data[self.path(*tup)] = data
+
+    def test_md5(self):
+        """
+        one algorithm: like md5sum, in the order of discovery
+        """
+        rc, out, errout = self.scanpath('--md5', 'alpha', 'beta')
+        expected = ['%s  %s' % (md5(self.data[fn]).hexdigest(), fn)
+                    for fn in (self.path('bin1', 'alpha'),
+                               self.path('bin3', 'alpha'),
+                               self.path('bin2', 'beta'),
+                               self.path('bin3', 'beta'))]
+        self.assertEqual(out, expected)
+        for jobs in ('1', '3'):
+            self.assertEqual(self.scanpath('--md5', '-j', jobs,
+                                           'alpha', 'beta')[1],
+                             expected)
+
+    def test_algorithms(self):
+        """
+        several algorithms: like BSD md5, with all digests of a file
+        """
+        fn = self.path('bin2', 'beta')
+        rc, out, errout = self.scanpath('--algorithm=md5,sha1', 'beta', '-1')
+        self.assertEqual(out, ['MD5 (%s) = %s' % (fn,
+                                                  md5(self.data[fn])
+                                                  .hexdigest()),
+                               'SHA1 (%s) = %s' % (fn,
+                                                   sha1(self.data[fn])
+                                                   .hexdigest())])
+
+    def test_unsupported(self):
+        """
+        unknown algorithms and those without a fixed digest size
+        are rejected
+        """
+        for alg in ('nosuchhash', 'shake_128'):
+            rc, out, errout = self.scanpath('--algorithm', alg, 'alpha')
+            self.assertNotEqual(rc, 0)
+            # the error count etc. are info lines on standard output:
+            self.assertEqual([line for line in out if ':i ' not in line],
+                             [])
+            self.assertTrue([line for line in errout if alg in line],
+                            errout)
+
+class TestHeadTail(ScanpathTestCase):
+    """
+    --head, --tail and --show, with some edge cases
+    """
+    LONG = b'y' * 100000    # longer than the blocks read
+    contents = {'lines': b'1\n2\n3\n4\n5\n',
+                'noeol': b'1\n2\n3',
+                'empty': b'',
+                'long': LONG + b'\n' + LONG + b'1\n' + LONG + b'2\n',
+                'crlf': b'1\r\n2\r\n3\r\n',
+                }
+    files = ()
+
+    def setUp(self):
+        ScanpathTestCase.setUp(self)
+        for name, data in self.contents.items():
+            self.touch('bin1', name, data=data)
+        self.touch('bin2', 'binary', data=b'\0\1\2' * 100)
+
+    def run_action(self, name, *args):
+        """
+        return the output for the given file, without the header line
+        """
+        rc, out, errout = self.scanpath(name, binary=True, *args)
+        head = ('** %s:\n' % self.path('bin1', name)).encode('utf-8')
+        self.assertTrue(out.startswith(head), out[:100])
+        return out[len(head):]
+
+    def test_head(self):
+        self.assertEqual(self.run_action('lines', '--head', '-n', '2'),
+                         b'1\n2\n')
+        self.assertEqual(self.run_action('lines', '--head'),
+                         self.contents['lines'])
+        self.assertEqual(self.run_action('noeol', '--head', '-n', '5'),
+                         b'1\n2\n3\n')
+        self.assertEqual(self.run_action('noeol', '--head', '-n', '3'),
+                         b'1\n2\n3\n')
+        self.assertEqual(self.run_action('empty', '--head'), b'')
+        self.assertEqual(self.run_action('long', '--head', '-n', '2'),
+                         self.LONG + b'\n' + self.LONG + b'1\n')
+        self.assertEqual(self.run_action('crlf', '--head', '-n', '1'),
+                         b'1\r\n')
+
+    def test_tail(self):
+        self.assertEqual(self.run_action('lines', '--tail', '-n', '2'),
+                         b'4\n5\n')
+        self.assertEqual(self.run_action('lines', '--tail', '-n', '1'),
+                         b'5\n')
+        self.assertEqual(self.run_action('lines', '--tail', '-n', '99'),
+                         self.contents['lines'])
+        self.assertEqual(self.run_action('noeol', '--tail', '-n', '2'),
+                         b'2\n3\n')
+        self.assertEqual(self.run_action('empty', '--tail'), b'')
+        self.assertEqual(self.run_action('long', '--tail', '-n', '1'),
+                         self.LONG + b'2\n')
+        self.assertEqual(self.run_action('long', '--tail', '-n', '2'),
+                         self.LONG + b'1\n' + self.LONG + b'2\n')
+        # negative numbers switch --head to --tail:
+        self.assertEqual(self.run_action('lines', '--head', '-n', '-2'),
+                         b'4\n5\n')
+
+    def test_show(self):
+        for name, data in self.contents.items():
+            expected = data
+            if data and not data.endswith(b'\n'):
+                expected += b'\n'
+            self.assertEqual(self.run_action(name, '--show'), expected)
+
+    def test_binary(self):
+        """
+        binary files are not shown
+        """
+        rc, out, errout = self.scanpath('binary', '--head')
+        self.assertEqual(len(out), 1)
+        self.assertTrue(out[0].startswith('?? %s:'
+                                          % self.path('bin2', 'binary')))
+
+    def test_once(self):
+        """
+        each file is shown once, even if found twice
+        """
+        rc, out, errout = self.scanpath('lines', 'lines', '--tail', '-n1',
+                                        '--dont-include-curdir',
+                                        pathvar=os.pathsep.join(
+                                            [self.path('bin1')] * 2))
+        self.assertEqual(out, ['** %s:' % self.path('bin1', 'lines'), '5'])
+
+class TestShadowed(ScanpathTestCase):
+    """
+    --shadowed and --duplicates
+    """
+    dirnames = ('bin1', 'bin2', 'bin3', 'empty')
+    files = ()
+
+    def setUp(self):
+        ScanpathTestCase.setUp(self)
+        self.touch('bin1', 'prog', data=b'x')
+        self.touch('bin2', 'prog', data=b'x')
+        self.touch('bin3', 'prog', data=b'y')
+        self.touch('bin2', 'tool', data=b'y')
+        self.touch('bin3', 'tool', data=b'z')
+
+    def report(self, *args):
+        """
+        return the report lines and the information lines
+        """
+        rc, out, errout = self.scanpath(*args)
+        self.assertEqual(rc, 0)
+        lines = [line for line in out if ':i ' not in line]
+        infos = [line.split(':i ', 1)[1] for line in out if ':i ' in line]
+        return lines, infos
+
+    def test_shadowed(self):
+        lines, infos = self.report('--shadowed')
+        self.assertEqual(lines, [self.path('bin1', 'prog'),
+                                 '\tshadows ' + self.path('bin2', 'prog'),
+                                 '\tshadows ' + self.path('bin3', 'prog'),
+                                 self.path('bin2', 'tool'),
+                                 '\tshadows ' + self.path('bin3', 'tool')])
+        self.assertEqual(infos, ['%s: contributes nothing '
+                                 '(all names shadowed)' % self.path('bin3'),
+                                 '%s: no files' % self.path('empty')])
+
+    def test_compare(self):
+        lines, infos = self.report('--shadowed', '--compare')
+        self.assertEqual(lines, [self.path('bin1', 'prog'),
+                                 '\tshadows %s\t(same contents)'
+                                 % self.path('bin2', 'prog'),
+                                 '\tshadows %s\t(different)'
+                                 % self.path('bin3', 'prog'),
+                                 self.path('bin2', 'tool'),
+                                 '\tshadows %s\t(different)'
+                                 % self.path('bin3', 'tool')])
+
+    def test_duplicates(self):
+        lines, infos = self.report('--duplicates')
+        self.assertEqual(lines, [self.path('bin1', 'prog'),
+                                 '\tshadows %s\t(same contents)'
+                                 % self.path('bin2', 'prog')])
+
+    def test_same_file(self):
+        os.remove(self.path('bin3', 'tool'))
+        try:
+            os.link(self.path('bin2', 'tool'), self.path('bin3', 'tool'))
+        except (AttributeError, OSError):
+            self.skipTest('no hard links')
+        lines, infos = self.report('--duplicates')
+        self.assertEqual(lines[-2:], [self.path('bin2', 'tool'),
+                                      '\tshadows %s\t(same file)'
+                                      % self.path('bin3', 'tool')])
+
+    def test_arguments(self):
+        rc, out, errout = self.scanpath('--shadowed', 'prog')
+        self.assertNotEqual(rc, 0)
+
+class TestRegex(ScanpathTestCase):
+    """
+    --regex
+    """
+    files = ScanpathTestCase.files + (('bin3', 'ssh'),
+                                      ('bin3', 'beta'),
+                                      )
+
+    def test_overlapping(self):
+        """
+        an entry which matches several expressions is found for each
+        """
+        rc, out, errout = self.scanpath('--regex', 'al.*', '.*a', 'b.*')
+        self.assertEqual(out, [self.path('bin1', 'alpha'),
+                               self.path('bin2', 'alpha'),
+                               self.path('bin1', 'alpha'),
+                               self.path('bin2', 'alpha'),
+                               self.path('bin2', 'beta'),
+                               self.path('bin3', 'beta'),
+                               self.path('bin3', 'gamma'),
+                               self.path('bin2', 'beta'),
+                               self.path('bin3', 'beta')])
+        rc, out, errout = self.scanpath('--regex', '-1', '.*a', 'b.*')
+        self.assertEqual(out, [self.path('bin1', 'alpha'),
+                               self.path('bin2', 'beta')])
+
+    def test_whole_names(self):
+        """
+        the expressions must match whole names
+        """
+        rc, out, errout = self.scanpath('--regex', 'alph', 'gamma|bet')
+        self.assertEqual(out, [self.path('bin3', 'gamma')])
+        self.assertEqual(len(errout), 1)
+        self.assertTrue('alph' in errout[0])
+
+    def test_groups(self):
+        """
+        expressions with groups: back references, and group names
+        which are used in several expressions
+        """
+        rc, out, errout = self.scanpath('--regex', 'g.*', '(s)\\1h')
+        self.assertEqual(out, [self.path('bin3', 'gamma'),
+                               self.path('bin3', 'ssh')])
+        rc, out, errout = self.scanpath('--regex', '(?P<x>a)lpha',
+                                        '(?P<x>g)amma', '(?P<x>s)(?P=x)h')
+        self.assertEqual(out, [self.path('bin1', 'alpha'),
+                               self.path('bin2', 'alpha'),
+                               self.path('bin3', 'gamma'),
+                               self.path('bin3', 'ssh')])
+
+    def test_invalid(self):
+        rc, out, errout = self.scanpath('--regex', 'alpha', '(beta')
+        self.assertNotEqual(rc, 0)
+        self.assertEqual([line for line in out if ':i ' not in line], [])
+        self.assertTrue([line for line in errout if '(beta' in line],
+                        errout)
+
+class TestCheckDirs(ScanpathTestCase):
+    """
+    -L --check-dirs
+    """
+    dirnames = ('bin1', 'bin2')
+    files = (('bin1', 'alpha'),
+             ('afile',),
+             )
+
+    def setUp(self):
+        ScanpathTestCase.setUp(self)
+        self.pathvar = os.pathsep.join([self.path('bin1'),
+                                        self.path('missing'),
+                                        self.path('afile'),
+                                        self.path('bin2'),
+                                        self.path('bin1')])
+
+    def test_plain(self):
+        """
+        only the valid directories are listed
+        """
+        rc, out, errout = self.scanpath('-L', '-c')
+        self.assertEqual(out, [self.path('bin1') + os.sep,
+                               self.path('bin2') + os.sep,
+                               self.path('bin1') + os.sep])
+        self.assertEqual(len(errout), 1)
+        self.assertTrue(errout[0].endswith('2 entries skipped'), errout)
+        rc, out, errout = self.scanpath('-L', '-c', '-N')
+        self.assertEqual(out, [' 1) %s%s' % (self.path('bin1'), os.sep),
+                               ' 4) %s%s' % (self.path('bin2'), os.sep),
+                               ' 5) %s%s' % (self.path('bin1'), os.sep)])
+
+    def test_verbose(self):
+        """
+        with -v, all entries are listed with their status, in PATH order,
+        and the valid directories with the time needed to read them
+        """
+        rc, out, errout = self.scanpath('-L', '-cvv')
+        lines = [line for line in out if ':i ' not in line]
+        self.assertEqual([line.split('\t')[0] for line in lines],
+                         ['OK:   %s%s' % (self.path('bin1'), os.sep),
+                          'Err1: ' + self.path('missing'),
+                          'Err2: ' + self.path('afile'),
+                          'OK:   %s%s' % (self.path('bin2'), os.sep),
+                          'OK:   %s%s' % (self.path('bin1'), os.sep)])
+        self.assertEqual(lines[1].split('\t')[1], '(not found!)')
+        self.assertEqual(lines[2].split('\t')[1], '(not a directory!)')
+        self.assertTrue(lines[0].endswith(' ms)'), lines[0])
+        infos = [line.split(':i ', 1)[1] for line in out if ':i ' in line]
+        self.assertEqual(infos[0], '2 invalid entries')
+        self.assertTrue(infos[1].startswith('slowest directory: '))
+
+    def test_timeout(self):
+        """
+        entries which don't answer in time are reported, not waited for
+        """
+        rc, out, errout = self.scanpath('-L', '-cvv', '--timeout=0')
+        lines = [line for line in out if ':i ' not in line]
+        self.assertEqual(len(lines), 5)
+        for line in lines:
+            if line.startswith('Err3:'):
+                self.assertTrue(line.endswith('\t(timed out!)'), line)
+
+class TestOutput(ScanpathTestCase):
+    """
+    --json and --print0
+    """
+    def records(self, *args):
+        rc, out, errout = self.scanpath('--json', *args)
+        return [json.loads(line) for line in out]
+
+    def test_json(self):
+        self.assertEqual(self.records('alpha', 'nothing'),
+                         [{'path': self.path('bin1', 'alpha'),
+                           'name': 'alpha', 'index': 0, 'ext': '',
+                           'status': 'found'},
+                          {'path': self.path('bin2', 'alpha'),
+                           'name': 'alpha', 'index': 1, 'ext': '',
+                           'status': 'found'},
+                          {'name': 'nothing', 'status': 'notfound'}])
+        self.touch('bin3', 'beta', data=b'12345')
+        recs = self.records('--stat', '--order=dir', 'beta')
+        self.assertEqual([(rec['path'], rec['size']) for rec in recs],
+                         [(self.path('bin2', 'beta'), 0),
+                          (self.path('bin3', 'beta'), 5)])
+        self.assertEqual(recs[1]['mtime'],
+                         os.stat(self.path('bin3', 'beta')).st_mtime)
+
+    def test_print0(self):
+        rc, out, errout = self.scanpath('-0', 'alpha', 'gamma', binary=True)
+        self.assertEqual(out.split(b'\0'),
+                         [self.path(*tail).encode('utf-8')
+                          for tail in (('bin1', 'alpha'),
+                                       ('bin2', 'alpha'),
+                                       ('bin3', 'gamma'))]
+                         + [b''])
+
+    def test_listpath(self):
+        pathvar = os.pathsep.join([self.path('bin1'), self.path('missing')])
+        rc, out, errout = self.scanpath('-L', '--json', pathvar=pathvar)
+        self.assertEqual([json.loads(line) for line in out],
+                         [{'path': self.path('bin1'), 'index': 0,
+                           'status': 'unchecked'},
+                          {'path': self.path('missing'), 'index': 1,
+                           'status': 'unchecked'}])
+        rc, out, errout = self.scanpath('-L', '-0', binary=True,
+                                        pathvar=pathvar)
+        self.assertEqual(out, pathvar.replace(os.pathsep, '\0')
+                                     .encode('utf-8') + b'\0')
+
+    def test_check_dirs(self):
+        """
+        with --check-dirs, the records tell the status of each entry;
+        --print0 writes the valid directories only (all entries with -v)
+        """
+        self.touch('afile')
+        pathvar = os.pathsep.join([self.path('bin1'), self.path('missing'),
+                                   self.path('afile')])
+        rc, out, errout = self.scanpath('-L', '-cv', '--json',
+                                        pathvar=pathvar)
+        recs = [json.loads(line) for line in out]
+        self.assertEqual([(rec['index'], rec['path'], rec['status'])
+                          for rec in recs],
+                         [(0, self.path('bin1'), 'ok'),
+                          (1, self.path('missing'), 'missing'),
+                          (2, self.path('afile'), 'notdir')])
+        self.assertTrue('ms' in recs[0])
+        rc, out, errout = self.scanpath('-L', '-c', '-0', binary=True,
+                                        pathvar=pathvar)
+        self.assertEqual(out, self.path('bin1').encode('utf-8') + b'\0')
+        rc, out, errout = self.scanpath('-L', '-cv', '-0', binary=True,
+                                        pathvar=pathvar)
+        self.assertEqual(out.count(b'\0'), 3)
+
+    def test_unsupported(self):
+        """
+        the standard output is kept clean, even of the infos of errors
+        """
+        for args in (('--md5', 'alpha'), ('--shadowed',)):
+            rc, out, errout = self.scanpath('--json', *args)
+            self.assertNotEqual(rc, 0)
+            self.assertEqual(out, [])
+            self.assertTrue([line for line in errout if '--json' in line],
+                            errout)
+            self.assertTrue([line for line in errout if ':i ' in line],
+                            errout)
+
+
+if __name__ == '__main__':
+    unittest.main()
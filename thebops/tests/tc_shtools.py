@@ -0,0 +1,723 @@
+# vim: ts=8 sts=4 sw=4 si et tw=79
+import unittest
+import os
+import sys
+import time
+from threading import Event
+from os.path import join
+from glob import glob
+from tempfile import mkdtemp
+from shutil import rmtree
+from thebops.shtools import GlobFileGenerator, FilenameGenerator, \
+        FileRecord, OptionCascade, NotFound, NothingFound, \
+        sleep_until, sleep, slept, \
+        SILENT, YIELD_PATTERN, YIELD_PATTERNS, \
+        ERROR_IF_NOT_FOUND, ERROR_IF_NOTHING_FOUND
+# not public:
+from thebops.shtools import _gen_globbed, _gen_listed, _gen_ordered, \
+        _monotonic
+import thebops.shtools
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+DEBUG = 1
+
+class TreeTestCase(unittest.TestCase):
+    """
+    Base class: a temporary directory tree
+    """
+    files = ()
+
+    def setUp(self):
+        self.root = mkdtemp()
+        for tail in self.files:
+            self.touch(*tail.split('/'))
+
+    def tearDown(self):
+        rmtree(self.root)
+
+    def touch(self, *tail):
+        fn = join(self.root, *tail)
+        d = os.path.dirname(fn)
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        open(fn, 'w').close()
+        return fn
+
+    def path(self, *tail):
+        return join(self.root, *tail)
+
+    def glob(self, *patterns, **kwargs):
+        return sorted(GlobFileGenerator(*[self.path(p) for p in patterns],
+                                        **kwargs), key=str)
+
+class TestGlobEngine(TreeTestCase):
+    """
+    Tests for the shared-listing glob engine (one listing per directory,
+    one regular expression for all patterns of a directory)
+    """
+    files = ('xaxb', 'ab', 'ba', 'b.txt', 'c.bin', '.hidden.txt',
+             'old.txt~')
+
+    def test_attribution(self):
+        """
+        each pattern gets its own matches, even if the translated patterns
+        contain groups of their own (fnmatch of Python 3.9 and 3.10)
+        """
+        patterns = [self.path(p)
+                    for p in ('*a*b*', '*.txt', 'c*', '*a*', 'nomatch*')]
+        res = dict([(pat, sorted(hits))
+                    for pat, hits in _gen_globbed(patterns)])
+        self.assertEqual(res[patterns[0]], [self.path('ab'),
+                                            self.path('xaxb')])
+        self.assertEqual(res[patterns[1]], [self.path('b.txt')])
+        self.assertEqual(res[patterns[2]], [self.path('c.bin')])
+        self.assertEqual(res[patterns[3]], [self.path('ab'),
+                                            self.path('ba'),
+                                            self.path('xaxb')])
+        self.assertEqual(res[patterns[4]], [])
+
+    def test_subdirectory_patterns(self):
+        """
+        patterns with several wildcards in a non-existing subdirectory
+        """
+        self.assertEqual(self.glob('a/*a*b*', notfound=SILENT), [])
+        self.touch('a', 'xab')
+        self.assertEqual(self.glob('a/*a*b*', '*.bin'),
+                         [self.path('a', 'xab'), self.path('c.bin')])
+
+    def test_hidden(self):
+        """
+        leading wildcards don't match hidden files, like glob
+        """
+        self.assertEqual(self.glob('*.txt'), [self.path('b.txt')])
+        self.assertEqual(self.glob('.*.txt'), [self.path('.hidden.txt')])
+
+    def test_notfound(self):
+        """
+        the notfound option
+        """
+        self.assertEqual(self.glob('*.bin', 'no*', notfound=SILENT),
+                         [self.path('c.bin')])
+        self.assertEqual(self.glob('*.bin', 'no*', notfound=YIELD_PATTERN),
+                         [self.path('c.bin'), self.path('no*')])
+        self.assertEqual(self.glob('*.bin', 'no*', notfound=YIELD_PATTERNS),
+                         [self.path('c.bin')])
+        self.assertEqual(self.glob('no*', 'nix*', notfound=YIELD_PATTERNS),
+                         [self.path('nix*'), self.path('no*')])
+        try:
+            self.glob('*.bin', 'no*', notfound=ERROR_IF_NOT_FOUND)
+        except NotFound as e:
+            self.assertEqual(e.pattern, self.path('no*'))
+        else:
+            self.fail('NotFound not raised')
+        self.assertEqual(self.glob('*.bin', 'no*',
+                                   notfound=ERROR_IF_NOTHING_FOUND),
+                         [self.path('c.bin')])
+        self.assertRaises(NothingFound,
+                          self.glob, 'no*', notfound=ERROR_IF_NOTHING_FOUND)
+
+    def test_count_ignored(self):
+        """
+        ignored files are counted
+        """
+        gen = GlobFileGenerator(self.path('*.txt*'))
+        self.assertEqual(list(gen), [self.path('b.txt')])
+        self.assertEqual(gen.count_ignored, 1)
+        gen = GlobFileGenerator(self.path('*.txt*'), ignore=None)
+        self.assertEqual(sorted(gen), [self.path('b.txt'),
+                                       self.path('old.txt~')])
+        self.assertEqual(gen.count_ignored, 0)
+
+class TestRecursive(TreeTestCase):
+    """
+    Tests for '**' patterns (recursive option)
+    """
+    files = ('top.bin', 'data/x.bin', 'data/a/y.bin', 'data/a/b/z.bin',
+             'data/a/.q.bin', 'data/.h/w.bin', 'data/a/b/c/notes.txt')
+    patterns = ('data/**/*.bin', 'data/**', '**/*.bin', 'data/**/b/*',
+                'data/a/**/*', '**/c')
+
+    def test_like_glob(self):
+        """
+        with recursive=True, the results equal glob(..., recursive=True)
+        """
+        try:
+            glob(self.path('*'), recursive=True)
+        except TypeError:
+            self.skipTest('glob.glob has no recursive option')
+        for pat in self.patterns:
+            self.assertEqual(self.glob(pat, recursive=True,
+                                       notfound=SILENT),
+                             sorted(glob(self.path(pat), recursive=True)))
+
+    def test_default(self):
+        """
+        by default, '**' is the same as '*', like with glob.glob
+        """
+        for pat in self.patterns:
+            self.assertEqual(self.glob(pat, notfound=SILENT),
+                             sorted(glob(self.path(pat))))
+
+    def test_symlink_loop(self):
+        """
+        with follow_symlinks, a loop is walked once
+        """
+        try:
+            os.symlink('..', self.path('data', 'a', 'loop'))
+        except (AttributeError, NotImplementedError, OSError):
+            self.skipTest('no symbolic links')
+        self.assertEqual(self.glob('data/**/z.bin', recursive=True,
+                                   follow_symlinks=True),
+                         [self.path('data', 'a', 'b', 'z.bin')])
+
+class TestRecords(TreeTestCase):
+    """
+    Tests for FileRecord objects and the filter options
+    """
+    files = ('small.txt', 'big.txt', 'sub/x.txt')
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        fo = open(self.path('big.txt'), 'w')
+        fo.write('x' * 100)
+        fo.close()
+        os.utime(self.path('small.txt'), (1000000000, 1000000000))
+
+    def test_record(self):
+        """
+        records carry the stat information and compare like strings
+        """
+        rec = FileRecord(self.path('big.txt'))
+        self.assertEqual(rec.size, 100)
+        self.assertTrue(rec.stat() is rec.stat())
+        self.assertTrue(rec.is_file())
+        self.assertFalse(rec.is_dir())
+        self.assertEqual(rec.name, 'big.txt')
+        self.assertEqual(str(rec), self.path('big.txt'))
+        self.assertEqual(rec, self.path('big.txt'))
+        self.assertEqual(rec, FileRecord(self.path('big.txt')))
+        self.assertNotEqual(rec, self.path('small.txt'))
+        self.assertEqual(hash(rec), hash(self.path('big.txt')))
+        self.assertTrue(FileRecord(self.path('sub')).is_dir())
+        self.assertFalse(FileRecord(self.path('missing')).is_file())
+
+    def test_glob_records(self):
+        """
+        GlobFileGenerator(records=True) yields records with a known size
+        """
+        res = self.glob('*', records=True)
+        self.assertTrue([r for r in res if not isinstance(r, FileRecord)]
+                        == [])
+        self.assertEqual(res, [self.path('big.txt'),
+                               self.path('small.txt'),
+                               self.path('sub')])
+        self.assertEqual([r.size for r in res if r.is_file()], [100, 0])
+
+    def test_unmatched_pattern(self):
+        """
+        unmatched patterns are yielded as strings, even with records=True
+        """
+        res = list(GlobFileGenerator(self.path('no*'), records=True))
+        self.assertEqual(res, [self.path('no*')])
+        self.assertFalse(isinstance(res[0], FileRecord))
+
+    def test_filters(self):
+        """
+        the files_only, min_size, max_size and newer_than filters
+        """
+        self.assertEqual(self.glob('*', files_only=True),
+                         [self.path('big.txt'), self.path('small.txt')])
+        self.assertEqual(self.glob('*.txt', min_size=1),
+                         [self.path('big.txt')])
+        self.assertEqual(self.glob('*.txt', max_size=99),
+                         [self.path('small.txt')])
+        self.assertEqual(self.glob('*.txt', newer_than=1000000000),
+                         [self.path('big.txt')])
+        self.assertEqual(self.glob('*.txt',
+                                   newer_than=self.path('small.txt')),
+                         [self.path('big.txt')])
+        self.assertEqual(self.glob('*', files_only=True, max_size=99),
+                         [self.path('small.txt')])
+
+    def test_filename_filters(self):
+        """
+        the FilenameGenerator filters skip missing files
+        """
+        specs = [self.path(p) for p in ('big.txt', 'missing', 'sub')]
+        self.assertEqual(list(FilenameGenerator(*specs)), specs)
+        self.assertEqual(list(FilenameGenerator(files_only=True, *specs)),
+                         specs[:1])
+        recs = list(FilenameGenerator(records=True, min_size=0, *specs))
+        self.assertEqual(recs, [specs[0], specs[2]])
+        self.assertTrue(isinstance(recs[0], FileRecord))
+
+class TestArgfiles(TreeTestCase):
+    """
+    Tests for streamed specs (@listfile, @-) and the removal of duplicates
+    """
+    files = ('a.txt', 'b.txt', 'c.bin')
+
+    def write(self, name, text):
+        fn = self.path(name)
+        fo = open(fn, 'w')
+        fo.write(text)
+        fo.close()
+        return fn
+
+    def test_gen_listed(self):
+        """
+        items are split correctly, even across the blocks read
+        """
+        text = 'one\r\ntwo\n\nthree with blanks\nfour'
+        for bufsize in (1, 2, 3, 5, 1<<16):
+            self.assertEqual(list(_gen_listed(StringIO(text), None,
+                                              bufsize)),
+                             ['one', 'two', 'three with blanks', 'four'])
+            self.assertEqual(list(_gen_listed(StringIO('a\0b c\nd\0\0'),
+                                              True, bufsize)),
+                             ['a', 'b c\nd'])
+        # the delimiter is chosen by looking at the first block:
+        self.assertEqual(list(_gen_listed(StringIO('a\0b c\nd\0\0'))),
+                         ['a', 'b c\nd'])
+        self.assertEqual(list(_gen_listed(StringIO('a\nb\0c'), False)),
+                         ['a', 'b\0c'])
+        self.assertEqual(list(_gen_listed(StringIO('a\nb\0c'), True)),
+                         ['a\nb', 'c'])
+        self.assertEqual(list(_gen_listed(StringIO(''))), [])
+
+    def test_listfile(self):
+        """
+        '@name' is replaced by the specs listed in the file
+        """
+        lst = self.write('list', '%s\n%s\n'
+                         % (self.path('a.txt'), self.path('*.bin')))
+        self.assertEqual(list(GlobFileGenerator('@' + lst, argfiles=True)),
+                         [self.path('a.txt'), self.path('c.bin')])
+        self.assertEqual(list(FilenameGenerator('@' + lst, '@',
+                                                argfiles=True)),
+                         [self.path('a.txt'), self.path('*.bin'), '@'])
+        # without the option, the argument is taken literally:
+        self.assertEqual(list(FilenameGenerator('@' + lst)), ['@' + lst])
+
+    def test_stdin(self):
+        """
+        '@-' reads the specs from standard input
+        """
+        stdin = sys.stdin
+        sys.stdin = StringIO('%s\0%s\0' % (self.path('b.txt'),
+                                             self.path('a.txt')))
+        try:
+            self.assertEqual(list(FilenameGenerator('@-', argfiles=True)),
+                             [self.path('b.txt'), self.path('a.txt')])
+        finally:
+            sys.stdin = stdin
+
+    def test_unique(self):
+        """
+        duplicates are removed, also from the lists and in normalized form
+        """
+        a = self.path('a.txt')
+        a2 = join(self.root, '.', 'a.txt')
+        lst = self.write('list', '%s\n%s\n%s\n' % (a, a2, self.path('b.txt')))
+        self.assertEqual(list(FilenameGenerator(a, '@' + lst,
+                                                argfiles=True)),
+                         [a, self.path('b.txt')])
+        self.assertEqual(list(FilenameGenerator(a, a2)), [a])
+        self.assertEqual(list(FilenameGenerator(a, a2, unique_specs=False)),
+                         [a, a2])
+
+    def test_unique_window(self):
+        """
+        for streamed specs, a limited number of names is remembered
+        """
+        a, b, c = [self.path(name) for name in ('a.txt', 'b.txt', 'c.txt')]
+        lst = self.write('list', '\n'.join([a, b, a, c, a, b, c, a]))
+        self.assertEqual(list(FilenameGenerator('@' + lst, argfiles=True,
+                                                unique_window=2)),
+                         [a, b, c, b, c, a])
+        self.assertEqual(list(FilenameGenerator('@' + lst, argfiles=True,
+                                                unique_window=None)),
+                         [a, b, c])
+
+    def test_batches(self):
+        """
+        streamed specs are globbed in batches; nothing is lost or repeated
+        """
+        names = ['f%03d' % i for i in range(25)]
+        for name in names:
+            self.touch(name)
+        lst = self.write('list', '\n'.join([self.path(name)
+                                            for name in names]
+                                           + [self.path('*.bin')]))
+        saved = thebops.shtools._SPECS_PER_BATCH
+        thebops.shtools._SPECS_PER_BATCH = 7
+        try:
+            res = list(GlobFileGenerator('@' + lst, argfiles=True))
+        finally:
+            thebops.shtools._SPECS_PER_BATCH = saved
+        self.assertEqual(res, [self.path(name) for name in names]
+                              + [self.path('c.bin')])
+
+class TestOrder(TreeTestCase):
+    """
+    Tests for the order option ('disk', 'extent')
+    """
+    files = ('m.dat', 'z.dat', 'a.dat', 'sub/b.dat', 'sub/y.dat')
+
+    def inode(self, fn):
+        return os.stat(fn).st_ino
+
+    def test_disk(self):
+        """
+        the files are sorted by inode number, without losses
+        """
+        res = list(GlobFileGenerator(self.path('*.dat'),
+                                     self.path('sub', '*.dat'),
+                                     order='disk'))
+        self.assertEqual(sorted(res), self.glob('*.dat', 'sub/*.dat'))
+        self.assertEqual([self.inode(fn) for fn in res],
+                         sorted([self.inode(fn) for fn in res]))
+
+    def test_window(self):
+        """
+        the stream is sorted window by window
+        """
+        res = list(GlobFileGenerator(self.path('*.dat'),
+                                     self.path('sub', '*.dat'),
+                                     order='disk', window=2))
+        self.assertEqual(sorted(res), self.glob('*.dat', 'sub/*.dat'))
+        for i in range(0, len(res), 2):
+            chunk = [self.inode(fn) for fn in res[i:i+2]]
+            self.assertEqual(chunk, sorted(chunk))
+
+    def test_records(self):
+        """
+        with records=True, FileRecord objects are generated; unmatched
+        patterns (yielded as strings) keep their positions
+        """
+        res = list(GlobFileGenerator(self.path('no*'), self.path('*.dat'),
+                                     self.path('nix*'),
+                                     self.path('sub', '*.dat'),
+                                     order='disk', records=True,
+                                     notfound=YIELD_PATTERN))
+        files = self.glob('*.dat')
+        subfiles = self.glob('sub/*.dat')
+        self.assertEqual(res[0], self.path('no*'))
+        self.assertEqual(res[len(files) + 1], self.path('nix*'))
+        for pos in (0, len(files) + 1):
+            self.assertFalse(isinstance(res[pos], FileRecord))
+        for rec in res[1:len(files) + 1] + res[len(files) + 2:]:
+            self.assertTrue(isinstance(rec, FileRecord))
+        self.assertEqual(sorted(res[1:len(files) + 1], key=str), files)
+        self.assertEqual(sorted(res[len(files) + 2:], key=str), subfiles)
+
+    def test_extent(self):
+        """
+        the 'extent' order generates the same files
+        """
+        self.assertEqual(self.glob('*.dat', 'sub/*.dat', order='extent'),
+                         self.glob('*.dat', 'sub/*.dat'))
+
+    def test_notfound(self):
+        """
+        if the stream ends with NotFound, the files found before are
+        generated first
+        """
+        def gen():
+            yield 3
+            yield 1
+            raise NotFound('x*')
+        res = []
+        try:
+            for item in _gen_ordered(gen(), int, 10):
+                res.append(item)
+        except NotFound:
+            pass
+        else:
+            self.fail('NotFound not raised')
+        self.assertEqual(res, [1, 3])
+
+    def test_passthrough(self):
+        """
+        the passthrough items keep their positions
+        """
+        items = [3, 1, 'x', 2, 'y', 'z', 5, 4]
+        self.assertEqual(list(_gen_ordered(items, int, 10,
+                                           lambda item: isinstance(item,
+                                                                   str))),
+                         [1, 3, 'x', 2, 'y', 'z', 4, 5])
+
+class TestWatch(TreeTestCase):
+    """
+    Tests for GlobFileGenerator.watch
+    """
+    files = ('in/a.csv', 'in/b.csv')
+    OLD = 1000000000
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        for name in self.files:
+            self.age(name)
+
+    def age(self, name, stamp=None):
+        """
+        set the modification time into the past (thus, the file is settled)
+        """
+        if stamp is None:
+            stamp = self.OLD
+        os.utime(self.path(*name.split('/')), (stamp, stamp))
+
+    def watch(self, **kwargs):
+        kwargs.setdefault('interval', 0)
+        kwargs.setdefault('rounds', 1)
+        return GlobFileGenerator(self.path('in', '*.csv'),
+                                 notfound=SILENT).watch(**kwargs)
+
+    def test_snapshot(self):
+        """
+        with a snapshot, only new and changed files are generated again
+        """
+        snapshot = {}
+        self.assertEqual(sorted(self.watch(snapshot=snapshot)),
+                         [self.path('in', 'a.csv'), self.path('in', 'b.csv')])
+        self.assertEqual(list(self.watch(snapshot=snapshot)), [])
+        fo = open(self.path('in', 'b.csv'), 'w')
+        fo.write('changed')
+        fo.close()
+        self.age('in/b.csv')
+        self.touch('in', 'c.csv')
+        self.age('in/c.csv')
+        self.assertEqual(sorted(self.watch(snapshot=snapshot)),
+                         [self.path('in', 'b.csv'), self.path('in', 'c.csv')])
+
+    def test_existing(self):
+        """
+        existing=False: only the files which appear later are generated
+        """
+        snapshot = {}
+        self.assertEqual(list(self.watch(snapshot=snapshot, existing=False)),
+                         [])
+        self.assertEqual(list(self.watch(snapshot=snapshot)), [])
+
+    def test_settle(self):
+        """
+        files which have been modified recently are not generated yet
+        """
+        self.touch('in', 'young.csv')
+        self.assertEqual(sorted(self.watch(settle=3600)),
+                         [self.path('in', 'a.csv'), self.path('in', 'b.csv')])
+
+    def test_rounds(self):
+        """
+        files which appear between the rounds are generated
+        """
+        gen = self.watch(rounds=2, settle=0)
+        first = sorted([next(gen), next(gen)])  # the 1st round is read
+        self.assertEqual(first, [self.path('in', 'a.csv'),
+                                 self.path('in', 'b.csv')])
+        self.touch('in', 'c.csv')
+        self.age('in/c.csv')
+        self.age('in', self.OLD + 10)   # make sure the change is noticed
+        self.assertEqual(list(gen), [self.path('in', 'c.csv')])
+
+    def test_vanished(self):
+        """
+        files which vanish are removed from the snapshot
+        """
+        snapshot = {}
+        list(self.watch(snapshot=snapshot))
+        os.remove(self.path('in', 'a.csv'))
+        self.age('in', self.OLD + 10)
+        list(self.watch(snapshot=snapshot))
+        self.assertEqual(sorted(list(snapshot.values())[0]), ['b.csv'])
+
+    def test_literal(self):
+        """
+        literally specified files (also below wildcard directories) are
+        generated when they appear or change
+        """
+        os.mkdir(self.path('lit'))
+        x, y = self.path('lit', 'x.txt'), self.path('lit', 'y.txt')
+        gen = GlobFileGenerator(x, self.path('l*', 'y.txt'),
+                                notfound=SILENT)
+        snapshot = {}
+        def watch():
+            return sorted(gen.watch(interval=0, rounds=1,
+                                    snapshot=snapshot))
+        self.assertEqual(watch(), [])
+        self.touch('lit', 'x.txt')
+        self.touch('lit', 'y.txt')
+        self.age('lit/x.txt')
+        self.age('lit/y.txt')
+        self.assertEqual(watch(), [x, y])
+        self.assertEqual(watch(), [])
+        fo = open(y, 'w')
+        fo.write('changed')
+        fo.close()
+        self.age('lit/y.txt')
+        self.assertEqual(watch(), [y])
+
+class TestOptionCascade(TreeTestCase):
+    """
+    Tests for OptionCascade (without the user and system files)
+    """
+    name = 'tc_shtools-cascade.ini'
+
+    def setUp(self):
+        TreeTestCase.setUp(self)
+        self.write(('proj', 'sub'), '[DEFAULT]\n'
+                                    'color = red\n'
+                                    '[main]\n'
+                                    'size = 10\n')
+        self.write(('proj',), '[main]\n'
+                              'size = 20\n'
+                              'ratio = 0.5\n'
+                              'verbose = Yes\n'
+                              '[other]\n'
+                              'color = blue\n'
+                              'mode = fast\n')
+        self.start = self.path('proj', 'sub')
+
+    def write(self, dirs, text):
+        fn = self.touch(*(dirs + (self.name,)))
+        fo = open(fn, 'w')
+        fo.write(text)
+        fo.close()
+        return fn
+
+    def cascade(self, **kwargs):
+        kwargs.setdefault('start', self.start)
+        kwargs.setdefault('cache', False)
+        return OptionCascade(self.name, user=False, system=False, **kwargs)
+
+    def test_precedence(self):
+        """
+        the most specific file which provides an option wins
+        """
+        oc = self.cascade()
+        self.assertEqual(oc.files(), [self.path('proj', 'sub', self.name),
+                                      self.path('proj', self.name)])
+        self.assertEqual(oc.get('main', 'size'), '10')
+        self.assertEqual(oc.get('main', 'Ratio'), '0.5')
+        self.assertEqual(oc.get('other', 'color'), 'red')   # DEFAULT
+        self.assertEqual(oc.get('other', 'nothing', 'x'), 'x')
+        self.assertEqual(oc.where('main', 'ratio'), self.path('proj',
+                                                              self.name))
+        self.assertEqual(oc.where('main', 'nothing'), None)
+        self.assertTrue(oc.has_option('other', 'mode'))
+        self.assertEqual(oc.sections(), ['main', 'other'])
+        self.assertEqual(oc.items('other'), [('color', 'red'),
+                                             ('mode', 'fast')])
+
+    def test_parents(self):
+        """
+        parents=False: only the start directory is checked
+        """
+        oc = self.cascade(parents=False)
+        self.assertEqual(oc.files(), [self.path('proj', 'sub', self.name)])
+        self.assertEqual(oc.get('main', 'ratio'), None)
+
+    def test_types(self):
+        """
+        the getint, getfloat and getboolean methods
+        """
+        oc = self.cascade()
+        self.assertEqual(oc.getint('main', 'size'), 10)
+        self.assertEqual(oc.getfloat('main', 'ratio'), 0.5)
+        self.assertEqual(oc.getboolean('main', 'verbose'), True)
+        self.assertEqual(oc.getint('main', 'nothing', 3), 3)
+        self.assertRaises(ValueError, oc.getboolean, 'other', 'mode')
+
+    def test_refresh(self):
+        """
+        changed files are parsed again after refresh
+        """
+        oc = self.cascade()
+        self.assertEqual(oc.get('main', 'size'), '10')
+        self.write(('proj', 'sub'), '[main]\nsize = 100\n')
+        self.assertEqual(oc.get('main', 'size'), '10')
+        oc.refresh()
+        self.assertEqual(oc.get('main', 'size'), '100')
+
+    def test_cache(self):
+        """
+        the parsed contents are taken from the given cache
+        """
+        cache = {}
+        self.assertEqual(self.cascade(cache=cache).get('main', 'size'), '10')
+        self.assertEqual(len(cache), 2)
+        for key in cache:
+            if key[0] == self.path('proj', 'sub', self.name):
+                cache[key] = {'DEFAULT': {}, 'main': {'size': 'cached'}}
+        thebops.shtools._INI_PARSED.clear()
+        self.assertEqual(self.cascade(cache=cache).get('main', 'size'),
+                         'cached')
+
+class TestSleep(unittest.TestCase):
+    """
+    Tests for the sleeping engine (sleep_until) and sleep
+    """
+    def test_plain(self):
+        """
+        without a render function, sleep until the deadline
+        """
+        deadline = _monotonic() + 0.1
+        self.assertTrue(sleep_until(deadline) >= deadline)
+
+    def test_frames(self):
+        """
+        the frames are written to the device; None means: no output
+        """
+        frames = []
+        def render(now):
+            frames.append(now)
+            if len(frames) % 2:
+                return '%d\r' % len(frames)
+        device = StringIO()
+        start = _monotonic()
+        sleep_until(start + 0.25, 0.1, render, device)
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(device.getvalue(), '1\r3\r')
+
+    def test_skipped(self):
+        """
+        frames which are late are skipped rather than drawn in a hurry
+        """
+        frames = []
+        def render(now):
+            frames.append(now)
+            if len(frames) == 1:
+                time.sleep(0.35)    # as if the process was suspended
+        start = _monotonic()
+        sleep_until(start + 0.5, 0.1, render, StringIO())
+        # without skipping, there would be 5 frames:
+        self.assertTrue(len(frames) <= 3, frames)
+        for i in range(1, len(frames)):
+            self.assertTrue(frames[i] - frames[i-1] >= 0.09, frames)
+
+    def test_event(self):
+        """
+        a set event ends the sleep early
+        """
+        event = Event()
+        event.set()
+        start = _monotonic()
+        sleep_until(start + 10, 1, event=event)
+        self.assertTrue(_monotonic() - start < 5)
+
+    def test_sleep(self):
+        """
+        sleep returns the seconds slept and adds them to slept()
+        """
+        self.assertEqual(sleep(0), 0)
+        before = slept()
+        secs = sleep(0.1, animate=False)
+        self.assertTrue(secs >= 0.1)
+        self.assertTrue(abs(slept() - before - secs) < 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
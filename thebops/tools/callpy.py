@@ -13,8 +13,10 @@ py2.py doesn't query the registry; it looks for directories where Python would
 be typically installed (see thebops.likeix.PythonVDirs).
 
 Linux systems look different: 'python' (typically /usr/bin/python) is a
-symbolical link to pythonX.Y.  Thus, a search on Linux could check the location
-of those link targets for python*.* entries; this is not yet implemented.
+symbolical link to pythonX.Y, and the directory names don't tell the version.
+In such cases, the interpreters are asked for their versions (see
+thebops.likeix.python_version); the answers are cached, so this happens only
+once per interpreter.
 
 To put it short:  On Windows systems (or any system which provides the
 Windows-style environment variables SystemDrive etc.), this script should call
@@ -32,7 +34,8 @@ __version__ = '.'.join(map(str, VERSION))
 
 from sys import argv, executable, version_info, stderr
 from subprocess import Popen
-from thebops.likeix import find_python, get_best, _check_version
+from thebops.likeix import find_python, get_best, _check_version, \
+        python_version
 from thebops.anyos import ProgramNotFound, \
         VersionsUnknown, VersionConstrained
 from thebops.errors import info, warn, fatal
@@ -45,7 +48,8 @@ VTUPLE = (3, 0)
 def callpy(**kwargs):
     PYTHON = None
     try:
-        PYTHON = get_best(find_python, **kwargs)
+        PYTHON = get_best(find_python, version_func=python_version,
+                          **kwargs)
     except VersionsUnknown, e:
         warn(e)
     except VersionConstrained, e: